@@ -8,18 +8,34 @@ and fraud detection using IBM Granite models on watsonx.ai platform.
 """
 
 import os
+import io
+import hmac
+import json
+import time
 import yaml
+import queue
+import shutil
 import logging
+import tempfile
+import threading
+import zipfile
 from datetime import datetime
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Request, Response, render_template, request, redirect, url_for, flash, send_file, jsonify
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge
 
-# Import our custom modules
-from src.document_processing import DocumentProcessor
+# Import our custom modules; modules pulling in pandas, pdfplumber or the report
+# renderers are imported on first use so the app (and each worker) starts fast
 from src.compliance_checker import ComplianceChecker
 from src.fraud_detector import FraudDetector
-from src.reporting import ReportGenerator
+from src.model_client import get_model_client
+from src.rules import RuleEngine
+from src.orchestrator import AnalysisOrchestrator
+from src.result_cache import ResultCache
+from src.jobs import JobQueue, QueueFullError
+from src.metrics import REGISTRY, reset_shared
+from src.tracing import tracer
 
 # Configure logging
 logging.basicConfig(
@@ -28,57 +44,151 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class SpooledRequest(Request):
+    """Keeps uploads up to spool_size bytes in memory; larger ones roll over to an anonymous temp file"""
+    spool_size = 4 * 1024 * 1024
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=self.spool_size, mode="rb+")
+
 # Initialize Flask app
 app = Flask(__name__)
+app.request_class = SpooledRequest
 app.secret_key = os.environ.get('SECRET_KEY', 'graniteguard-hackathon-2025')
 
 # Load configuration
-def load_config():
-    """Load configuration from YAML file"""
+def load_config(config_path=None):
+    """Load configuration from YAML file (GRANITEGUARD_CONFIG overrides the default path)"""
+    config_path = config_path or os.environ.get('GRANITEGUARD_CONFIG', 'config/config.yaml')
     try:
-        with open('config/config.yaml', 'r') as file:
+        with open(config_path, 'r') as file:
             return yaml.safe_load(file)
     except FileNotFoundError:
-        logger.error("Configuration file not found. Please create config/config.yaml")
+        logger.error(f"Configuration file not found. Please create {config_path}")
         return None
     except yaml.YAMLError as e:
         logger.error(f"Error parsing configuration: {e}")
         return None
 
-config = load_config()
+# Set by create_app(); AI components are per process and built on first use
+config = None
+rule_engine = None
+startup_timings = {}
+document_processor = None
+compliance_checker = None
+fraud_detector = None
+orchestrator = None
+pipeline = None
+job_queue = None
+stream_executor = None
+stream_slots = None
+_components_pid = None
+_components_lock = threading.Lock()
 
-if config:
-    # Configure Flask app from config
-    app.config['MAX_CONTENT_LENGTH'] = config['app']['max_file_size'] * 1024 * 1024  # Convert MB to bytes
-    app.config['UPLOAD_FOLDER'] = config['app']['upload_folder']
-    app.config['REPORT_FOLDER'] = config['app']['report_folder']
+def create_app(config_path=None):
+    """
+    Application factory: load config and build the read-only shared structures once
+    
+    Under gunicorn with preload_app this runs once in the master process, so the
+    config and compiled rule tables are shared copy-on-write by every worker.
+    Model clients, thread pools and the job queue do not survive a fork; each
+    process builds its own in ensure_ai_components().
+    
+    Args:
+        config_path: YAML config to load, defaults to GRANITEGUARD_CONFIG or config/config.yaml
+    
+    Returns:
+        The configured Flask app
+    """
+    global config, rule_engine
+    started = time.perf_counter()
+    config = load_config(config_path)
+    
+    if config:
+        # Configure Flask app from config
+        app.config['MAX_CONTENT_LENGTH'] = config['app']['max_file_size'] * 1024 * 1024  # Convert MB to bytes
+        app.config['UPLOAD_FOLDER'] = config['app']['upload_folder']
+        app.config['REPORT_FOLDER'] = config['app']['report_folder']
+        SpooledRequest.spool_size = int(config['app'].get('upload_spool_mb', 4) * 1024 * 1024)
+        
+        # Ensure directories exist
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        os.makedirs(app.config['REPORT_FOLDER'], exist_ok=True)
+        
+        # Compiled keyword rules are plain data, safe to build before forking
+        rule_engine = RuleEngine.from_config(config)
+        
+        observability = config.get('observability', {})
+        tracer.configure(observability.get('trace_sample_rate', 0.0), observability.get('trace_max_chars', 200))
     
-    # Ensure directories exist
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    os.makedirs(app.config['REPORT_FOLDER'], exist_ok=True)
+    startup_timings['create_app'] = round(time.perf_counter() - started, 3)
+    logger.info(f"Application created in {startup_timings['create_app']:.3f}s (pid {os.getpid()})")
+    return app
 
-# Initialize AI components
-document_processor = DocumentProcessor()
-compliance_checker = None
-fraud_detector = None
+def ensure_ai_components():
+    """Build the AI components in this process unless it already did (forked workers build their own)"""
+    global _components_pid
+    if _components_pid == os.getpid():
+        return
+    with _components_lock:
+        if _components_pid == os.getpid():
+            return
+        if config is None:
+            create_app()
+        # Metrics and trace settings are per process; share them with the other workers
+        observability = (config or {}).get('observability', {})
+        if observability.get('shared_dir'):
+            REGISTRY.share(observability['shared_dir'], observability.get('metrics_flush_seconds', 5))
+            tracer.share(os.path.join(observability['shared_dir'], "trace.json"))
+        started = time.perf_counter()
+        initialize_ai_components()
+        startup_timings['ai_components'] = round(time.perf_counter() - started, 3)
+        logger.info(f"AI components built in {startup_timings['ai_components']:.3f}s (pid {os.getpid()})")
+        # Recorded even after a failure, so a misconfigured worker does not retry on every request
+        _components_pid = os.getpid()
 
 def initialize_ai_components():
     """Initialize AI components with IBM watsonx.ai credentials"""
-    global compliance_checker, fraud_detector
+    global document_processor, compliance_checker, fraud_detector, orchestrator, pipeline, job_queue
+    global stream_executor, stream_slots
     
     if not config:
         logger.error("Configuration not loaded. Cannot initialize AI components.")
         return False
     
+    # Deferred imports: pandas and the document parsers load here, not at startup
+    from src.document_processing import DocumentProcessor
+    from src.pipeline import AnalysisPipeline
+    from src.tabular_analysis import TabularFraudAnalyzer
+    document_processor = DocumentProcessor()
+    
     try:
-        # Check if credentials are configured
-        if (config['watsonx']['api_key'] == 'your_api_key_here' or 
-            config['watsonx']['project_id'] == 'your_project_id_here'):
+        # Check if credentials are configured (the offline fake backend needs none)
+        if (config['model'].get('backend', 'watsonx') == 'watsonx' and
+            (config['watsonx']['api_key'] == 'your_api_key_here' or 
+             config['watsonx']['project_id'] == 'your_project_id_here')):
             logger.warning("IBM watsonx.ai credentials not configured. Please update config/config.yaml")
             return False
         
-        compliance_checker = ComplianceChecker()
-        fraud_detector = FraudDetector()
+        # Both analyzers share one authenticated, connection-pooled model client
+        model_client = get_model_client(config)
+        rules = rule_engine if rule_engine is not None else RuleEngine.from_config(config)
+        compliance_checker = ComplianceChecker(config=config, model_client=model_client, rule_engine=rules)
+        fraud_detector = FraudDetector(config=config, model_client=model_client, rule_engine=rules)
+        orchestrator = AnalysisOrchestrator.from_config(config, compliance_checker, fraud_detector)
+        pipeline = AnalysisPipeline(config, document_processor, orchestrator,
+                                    result_cache=ResultCache.from_config(config),
+                                    tabular_analyzer=TabularFraudAnalyzer.from_config(config))
+        
+        # Background job queue for /upload; resumes jobs whose process died (lease expired)
+        job_queue = JobQueue.from_config(config, run_upload_job)
+        if job_queue:
+            job_queue.start()
+        
+        # /upload/stream analyses run on a bounded pool; uploads beyond max_streams are refused
+        max_streams = config['app'].get('max_streams', 4)
+        stream_slots = threading.BoundedSemaphore(max_streams)
+        stream_executor = ThreadPoolExecutor(max_workers=max_streams, thread_name_prefix="stream")
         logger.info("AI components initialized successfully")
         return True
         
@@ -86,6 +196,12 @@ def initialize_ai_components():
         logger.error(f"Failed to initialize AI components: {e}")
         return False
 
+@app.before_request
+def lazy_initialize():
+    """Build this process's AI components before its first real request"""
+    if request.endpoint not in ('health_check', 'metrics', 'config_status', 'static'):
+        ensure_ai_components()
+
 def allowed_file(filename):
     """Check if uploaded file has allowed extension"""
     if not config:
@@ -105,6 +221,118 @@ def index():
                          config=config,
                          allowed_extensions=config['app']['allowed_extensions'] if config else [])
 
+def analyze_and_report(filepath, filename, progress=None, on_finding=None, document_id=None):
+    """
+    Run extraction, analysis and report generation for an upload
+
+    Args:
+        filepath: Path of the saved upload, or the upload's stream; a file is removed
+            and a stream closed once processing finishes
+        filename: Original (sanitized) file name used in the report
+        progress: Optional callback taking (fraction, stage) for job status updates
+        on_finding: Optional callback receiving partial findings while the analysis streams
+        document_id: Client-supplied id shared by the versions of one document, if any
+
+    Returns:
+        JSON-serializable response body for the upload
+    """
+    from src.reporting import ReportGenerator
+    progress = progress or (lambda fraction, stage: None)
+    try:
+        # Extract and analyze (served from the result cache for repeated documents)
+        progress(0.1, 'analyzing')
+        results = pipeline.analyze_file(filepath, on_finding, filename, document_id)
+        compliance_results = results['compliance_results']
+        fraud_results = results['fraud_results']
+        
+        logger.info("AI analysis completed successfully")
+        
+        # Generate PDF report
+        progress(0.8, 'generating report')
+        try:
+            report_path = ReportGenerator.generate_pdf_report(
+                document_name=filename,
+                compliance_results=compliance_results,
+                fraud_results=fraud_results,
+                output_dir=app.config['REPORT_FOLDER'],
+                backend=config.get('reporting', {}).get('backend', 'builtin')
+            )
+            return {
+                'success': True,
+                'message': 'Analysis completed successfully',
+                'report_path': os.path.basename(report_path),
+                'report_type': 'PDF' if report_path.endswith('.pdf') else 'HTML',
+                'cache_hit': results['cache_hit'],
+                'changes': results.get('changes'),
+                'compliance_results': compliance_results,
+                'fraud_results': fraud_results
+            }
+            
+        except Exception as report_error:
+            logger.error(f"Error during report generation: {report_error}")
+            # Still return analysis results even if report generation fails
+            return {
+                'success': True,
+                'message': 'Analysis completed successfully (report generation failed)',
+                'report_error': str(report_error),
+                'cache_hit': results['cache_hit'],
+                'changes': results.get('changes'),
+                'compliance_results': compliance_results,
+                'fraud_results': fraud_results
+            }
+    finally:
+        # Clean up uploaded file
+        if not isinstance(filepath, str):
+            filepath.close()
+        elif os.path.exists(filepath):
+            os.remove(filepath)
+
+def detach_upload(file):
+    """
+    Take over an upload's spooled stream so it outlives the request
+    
+    Werkzeug closes request files when the request ends, which would cut off
+    analyses still reading them in a background thread.
+    """
+    stream = file.stream
+    file.stream = io.BytesIO()
+    return stream
+
+def run_bulk_analysis(source, batch_id, progress=None):
+    """Analyze a saved batch of uploads, then remove them; results go to the batch's report folder"""
+    from src.bulk import BulkAnalyzer
+    output_dir = os.path.join(app.config['REPORT_FOLDER'], batch_id)
+    try:
+        summary = BulkAnalyzer.from_config(config, orchestrator, output_dir).run(source, progress)
+    finally:
+        shutil.rmtree(os.path.join(app.config['UPLOAD_FOLDER'], batch_id), ignore_errors=True)
+    summary['results_url'] = f"/bulk/{batch_id}/results"
+    return summary
+
+def run_upload_job(payload, progress):
+    """Job queue handler for queued single and bulk uploads"""
+    if payload.get('kind') == 'bulk':
+        return run_bulk_analysis(payload['source'], payload['batch_id'], progress)
+    return analyze_and_report(payload['filepath'], payload['filename'], progress,
+                              document_id=payload.get('document_id'))
+
+def submit_job(payload):
+    """Queue a job; returns (response, 202) with polling URLs, or (response, 429) when the queue is full"""
+    try:
+        job_id = job_queue.submit(payload)
+    except QueueFullError as e:
+        response = jsonify({'success': False, 'error': str(e)})
+        response.headers['Retry-After'] = str(config['jobs'].get('retry_after', 30))
+        return response, 429
+    
+    return jsonify({
+        'success': True,
+        'message': 'Queued for analysis',
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id),
+        'result_url': url_for('job_result', job_id=job_id)
+    }), 202
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and analysis"""
@@ -123,64 +351,36 @@ def upload_file():
         return redirect(request.url)
     
     try:
-        # Save uploaded file
         filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        safe_filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], safe_filename)
-        file.save(filepath)
-        
-        logger.info(f"File uploaded: {safe_filename}")
         
         # Check if AI components are ready
         if not compliance_checker or not fraud_detector:
             flash('AI components not initialized. Please check your IBM watsonx.ai configuration.', 'error')
             return redirect(url_for('index'))
         
-        # Process document
-        try:
-            document_text = document_processor.extract_text(filepath)
-            logger.info(f"Document text extracted: {len(document_text)} characters")
-            
-            # Perform AI analysis
-            compliance_results = compliance_checker.check_compliance(document_text)
-            fraud_results = fraud_detector.detect_fraud_indicators(document_text)
-            
-            logger.info("AI analysis completed successfully")
-            
-            # Generate PDF report
-            try:
-                report_path = ReportGenerator.generate_pdf_report(
-                    document_name=filename,
-                    compliance_results=compliance_results,
-                    fraud_results=fraud_results,
-                    output_dir=app.config['REPORT_FOLDER']
-                )
-                
-                # Clean up uploaded file
+        # Queue the analysis and return immediately; clients poll the job status.
+        # Queued jobs outlive the request (and a restart), so they are saved to disk
+        if job_queue:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            safe_filename = f"{timestamp}_{filename}"
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], safe_filename)
+            file.save(filepath)
+            logger.info(f"File uploaded: {safe_filename}")
+            response, status = submit_job({'filepath': filepath, 'filename': filename,
+                                           'document_id': request.form.get('document_id')})
+            if status == 429:
                 os.remove(filepath)
-                
-                flash('Document analyzed successfully!', 'success')
-                return jsonify({
-                    'success': True,
-                    'message': 'Analysis completed successfully',
-                    'report_path': os.path.basename(report_path),
-                    'report_type': 'PDF' if report_path.endswith('.pdf') else 'HTML',
-                    'compliance_results': compliance_results,
-                    'fraud_results': fraud_results
-                })
-                
-            except Exception as report_error:
-                logger.error(f"Error during report generation: {report_error}")
-                # Still return analysis results even if report generation fails
+            return response, status
+        
+        # Process document straight from the spooled upload, without writing it to the upload folder
+        logger.info(f"File uploaded: {filename}")
+        try:
+            result = analyze_and_report(file.stream, filename, document_id=request.form.get('document_id'))
+            if 'report_error' in result:
                 flash('Analysis completed but report generation failed. Results displayed below.', 'warning')
-                return jsonify({
-                    'success': True,
-                    'message': 'Analysis completed successfully (report generation failed)',
-                    'report_error': str(report_error),
-                    'compliance_results': compliance_results,
-                    'fraud_results': fraud_results
-                })
+            else:
+                flash('Document analyzed successfully!', 'success')
+            return jsonify(result)
             
         except Exception as e:
             logger.error(f"Error during document analysis: {e}")
@@ -195,6 +395,186 @@ def upload_file():
         flash(f'Error uploading file: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/upload/stream', methods=['POST'])
+def upload_stream():
+    """
+    Analyze an upload, streaming findings to the client as server-sent events
+    
+    Events:
+        compliance_finding / fraud_finding: a partial finding, as soon as the model writes it
+        progress: stage changes; "generating report" follows once both analyses completed
+        done: the same body /upload returns, including the report path
+        error: analysis failed
+    
+    Answers 429 with Retry-After while app.max_streams analyses are already running in this process.
+    """
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        return jsonify({'success': False, 'error': 'No file selected'}), 400
+    if not allowed_file(file.filename):
+        return jsonify({'success': False, 'error': 'File type not allowed'}), 400
+    if not compliance_checker or not fraud_detector:
+        return jsonify({'success': False, 'error': 'AI components not initialized'}), 503
+    
+    if not stream_slots.acquire(blocking=False):
+        response = jsonify({'success': False, 'error': 'Too many streaming analyses in progress. Try again later.'})
+        response.headers['Retry-After'] = str(config['app'].get('stream_retry_after', 30))
+        return response, 429
+    
+    filename = secure_filename(file.filename)
+    document_id = request.form.get('document_id')
+    try:
+        source = detach_upload(file)
+    except Exception:
+        stream_slots.release()
+        raise
+    logger.info(f"File uploaded for streaming analysis: {filename}")
+    
+    events = queue.Queue()
+    
+    def on_finding(finding):
+        events.put((f"{finding.analyzer}_finding", finding.to_dict()))
+    
+    def run():
+        try:
+            result = analyze_and_report(source, filename,
+                                        lambda fraction, stage: events.put(('progress', {'progress': fraction, 'stage': stage})),
+                                        on_finding, document_id)
+            events.put(('done', result))
+        except Exception as e:
+            logger.error(f"Error during streaming analysis: {e}")
+            events.put(('error', {'success': False, 'error': str(e)}))
+        finally:
+            stream_slots.release()
+    
+    # The analysis runs to completion even if the client disconnects, so the report is still written
+    stream_executor.submit(run)
+    heartbeat = config['app'].get('sse_heartbeat', 15)
+    
+    def stream():
+        while True:
+            try:
+                event, data = events.get(timeout=heartbeat)
+            except queue.Empty:
+                # Comment line; keeps proxies from closing an idle connection
+                yield ": keep-alive\n\n"
+                continue
+            yield sse_event(event, data)
+            if event in ('done', 'error'):
+                return
+    
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/bulk', methods=['POST'])
+def bulk_upload():
+    """Analyze several files, or a zip archive of documents, in one request"""
+    files = [f for f in request.files.getlist('files') if f.filename]
+    if not files:
+        return jsonify({'success': False, 'error': 'No files selected'}), 400
+    
+    if not compliance_checker or not fraud_detector:
+        return jsonify({'success': False, 'error': 'AI components not initialized'}), 503
+    
+    batch_id = f"bulk_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+    batch_dir = os.path.join(app.config['UPLOAD_FOLDER'], batch_id)
+    os.makedirs(batch_dir, exist_ok=True)
+    try:
+        # A single zip is analyzed as an archive, anything else as a directory of files
+        saved = save_batch(files, batch_dir)
+        source = batch_dir
+        documents = len(saved)
+        if len(saved) == 1 and saved[0].lower().endswith('.zip'):
+            source = os.path.join(batch_dir, saved[0])
+            documents = count_archive_documents(source)
+        if not documents:
+            return jsonify({'success': False, 'error': 'No supported files in the upload'}), 400
+        logger.info(f"Bulk upload {batch_id}: {documents} documents")
+        
+        if job_queue:
+            response, status = submit_job({'kind': 'bulk', 'source': source, 'batch_id': batch_id})
+            if status == 202:
+                # The job owns the batch folder from here on and removes it when finished
+                batch_dir = None
+            return response, status
+        
+        # Without the queue the batch runs inside this request, so only small batches are accepted
+        max_sync = config.get('bulk', {}).get('max_sync_documents', 20)
+        if documents > max_sync:
+            return jsonify({'success': False, 'error': f'Batches of more than {max_sync} documents need the '
+                                                       'job queue (jobs.enabled in config.yaml)'}), 413
+        
+        try:
+            return jsonify(dict(run_bulk_analysis(source, batch_id), success=True))
+        except Exception as e:
+            logger.error(f"Error during bulk analysis: {e}")
+            return jsonify({'success': False, 'error': str(e)})
+    finally:
+        if batch_dir:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+
+def save_batch(files, batch_dir):
+    """Save the supported files (and zip archives) of a bulk upload under unique names; returns the names"""
+    saved = []
+    for file in files:
+        filename = secure_filename(file.filename)
+        if not filename or not (filename.lower().endswith('.zip') or allowed_file(filename)):
+            continue
+        # "a/x.pdf" and "b/x.pdf" both sanitize to "x.pdf"; later ones get a numbered name
+        stem, extension = os.path.splitext(filename)
+        counter = 1
+        while os.path.exists(os.path.join(batch_dir, filename)):
+            counter += 1
+            filename = f"{stem}_{counter}{extension}"
+        file.save(os.path.join(batch_dir, filename))
+        saved.append(filename)
+    return saved
+
+def count_archive_documents(path):
+    """Supported documents inside a zip archive (0 if it is not a valid archive)"""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            return sum(1 for name in archive.namelist() if allowed_file(os.path.basename(name)))
+    except zipfile.BadZipFile:
+        return 0
+
+@app.route('/bulk/<batch_id>/results')
+def bulk_results(batch_id):
+    """Download the consolidated JSONL results of a bulk run"""
+    results_path = os.path.join(app.config['REPORT_FOLDER'], secure_filename(batch_id), 'results.jsonl')
+    if not os.path.exists(results_path):
+        return jsonify({'success': False, 'error': 'Unknown batch id'}), 404
+    return send_file(results_path, as_attachment=True, download_name=f"{batch_id}_results.jsonl")
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Report the state and progress of a queued analysis"""
+    job = job_queue.get(job_id) if job_queue else None
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job id'}), 404
+    
+    job.pop('result')
+    job['queue_depth'] = job_queue.depth()
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    """Return the final result of a queued analysis"""
+    job = job_queue.get(job_id) if job_queue else None
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job id'}), 404
+    
+    if job['state'] == 'failed':
+        return jsonify({'success': False, 'error': job['error']})
+    if job['state'] != 'completed':
+        # Not finished yet: 202 tells the client to keep polling
+        return jsonify({'success': False, 'state': job['state'], 'progress': job['progress']}), 202
+    return jsonify(job['result'])
+
 @app.route('/download/<filename>')
 def download_report(filename):
     """Download generated PDF report"""
@@ -215,9 +595,36 @@ def health_check():
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'ai_ready': compliance_checker is not None and fraud_detector is not None,
-        'config_loaded': config is not None
+        'config_loaded': config is not None,
+        'pid': os.getpid(),
+        'startup_seconds': startup_timings,
+        'semantic_cache': compliance_checker.semantic_cache.stats()
+        if compliance_checker is not None and compliance_checker.semantic_cache else None,
+        'entity_index': fraud_detector.entity_index.stats()
+        if fraud_detector is not None and fraud_detector.entity_index else None
     })
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics, summed over all worker processes when observability.shared_dir is set"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/trace', methods=['GET', 'POST'])
+def debug_trace():
+    """Show or change payload trace sampling at runtime; requires the X-Admin-Token header"""
+    expected = os.environ.get('GRANITEGUARD_ADMIN_TOKEN') or (config or {}).get('observability', {}).get('admin_token')
+    if not expected:
+        return jsonify({'error': 'Trace control is disabled; set observability.admin_token'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), str(expected)):
+        return jsonify({'error': 'Invalid admin token'}), 403
+    if request.method == 'POST':
+        settings = request.get_json(silent=True) or {}
+        try:
+            tracer.configure(settings.get('sample_rate'), settings.get('max_chars'))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'sample_rate and max_chars must be numbers'}), 400
+    return jsonify(dict(tracer.shared_settings(), pid=os.getpid()))
+
 @app.route('/config-status')
 def config_status():
     """Check configuration status"""
@@ -259,17 +666,23 @@ def internal_error(e):
     return redirect(url_for('index'))
 
 if __name__ == '__main__':
-    # Initialize AI components
-    ai_ready = initialize_ai_components()
+    create_app()
     
-    if not ai_ready:
-        logger.warning("AI components not initialized. The application will run but AI features will be disabled.")
+    # Start from zero, once per run (the debug reloader's serving process restarts on code changes)
+    if config and not os.environ.get('WERKZEUG_RUN_MAIN'):
+        reset_shared(config.get('observability', {}).get('shared_dir'))
     
     # Start Flask application
     host = config['app']['host'] if config else '0.0.0.0'
     port = config['app']['port'] if config else 5000
     debug = config['app']['debug'] if config else True
     
+    # Initialize AI components up front, except in the debug reloader's watcher process
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN'):
+        ensure_ai_components()
+        if compliance_checker is None:
+            logger.warning("AI components not initialized. The application will run but AI features will be disabled.")
+    
     logger.info(f"Starting GraniteGuard AI application on {host}:{port}")
     logger.info("Access the application at: http://localhost:5000")
     
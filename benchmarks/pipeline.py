@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+GraniteGuard AI - End-to-End Pipeline Benchmark
+
+Runs extract -> analyze -> report over a generated corpus of PDF, DOCX, XLSX
+and CSV files at several sizes, against a local fake watsonx.ai server, so
+no IBM Cloud credentials are needed and runs are reproducible. Prints
+p50/p95/p99 latency, throughput and peak RSS per stage.
+
+Baselines are JSON files: save one on a known-good commit, then compare later
+runs against it. --compare exits non-zero when a stage's p95 is more than
+--tolerance slower than the baseline.
+
+Usage:
+    python benchmarks/pipeline.py --sizes small medium --repeat 3
+    python benchmarks/pipeline.py --latency 0.2 --jitter 0.1 --slow-rate 0.05 --slow-latency 2
+    python benchmarks/pipeline.py --save benchmarks/baseline.json
+    python benchmarks/pipeline.py --compare benchmarks/baseline.json --tolerance 0.2
+"""
+
+import argparse
+import copy
+import csv
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import yaml
+from src.compliance_checker import ComplianceChecker
+from src.document_processing import DocumentProcessor
+from src.fake_watsonx import FakeWatsonxServer
+from src.fraud_detector import FraudDetector
+from src.model_client import get_model_client
+from src.orchestrator import AnalysisOrchestrator
+from src.pdf_renderer import PDFRenderer
+from src.pipeline import AnalysisPipeline
+from src.reporting import ReportGenerator
+from src.rules import RuleEngine
+from src.tabular_analysis import TabularFraudAnalyzer
+
+FORMATS = ("pdf", "docx", "xlsx", "csv")
+
+# Paragraphs (PDF/DOCX) or transaction rows / 10 (XLSX/CSV) per document
+SIZES = {"small": 20, "medium": 200, "large": 1000}
+
+PARAGRAPHS = [
+    "Payment of 9,950.00 USD was released to Northwind Holdings before the KYC review was completed.",
+    "The quarterly reconciliation was signed off by the same employee who approved the vendor change.",
+    "Customer funds were transferred to an offshore account without documented beneficial ownership.",
+    "All invoices were matched to purchase orders and approved within the delegated authority limits.",
+]
+
+# Canned model reply in the FINDING line format the analyzers parse
+DEFAULT_REPLY = (
+    'FINDING | HIGH | AML/KYC | "released to Northwind Holdings before the KYC review" | '
+    'Funds were released before customer due diligence was completed. | 0.9\n'
+    'FINDING | MEDIUM | SOX 404 | "signed off by the same employee" | '
+    'Approval and reconciliation duties are not segregated. | 0.7'
+)
+
+
+def _rss_bytes():
+    """Current resident set size, or None where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _max_rss_bytes() -> int:
+    """Process high-water RSS (ru_maxrss is KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+class StageRecorder:
+    """
+    Collects per-stage latencies and the peak RSS seen while each stage was running
+
+    A sampler thread reads the process RSS every `interval` seconds and charges it
+    to every stage active at that moment, so with concurrent documents a stage's
+    peak is the process high-water mark while any document was in that stage.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.latencies = {}
+        self.peak_rss = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+
+    def __enter__(self):
+        self._sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._sampler.join()
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = _rss_bytes()
+            if rss is None:
+                return
+            self._charge(rss)
+
+    def _charge(self, rss: int, stages=None):
+        with self._lock:
+            for stage in stages or [stage for stage, count in self._active.items() if count]:
+                self.peak_rss[stage] = max(self.peak_rss.get(stage, 0), rss)
+
+    def measure(self, stage: str, call):
+        """Run call() as one sample of `stage` and return its result"""
+        with self._lock:
+            self._active[stage] = self._active.get(stage, 0) + 1
+        start = time.perf_counter()
+        try:
+            return call()
+        finally:
+            elapsed = time.perf_counter() - start
+            rss = _rss_bytes()
+            # Short stages can finish between samples; without /proc fall back to the process peak
+            self._charge(rss if rss is not None else _max_rss_bytes(), [stage])
+            with self._lock:
+                self._active[stage] -= 1
+                self.latencies.setdefault(stage, []).append(elapsed)
+
+
+def generate_corpus(directory: str, sizes: list, copies: int = 1) -> list:
+    """Write `copies` documents of every format at every size; returns their paths"""
+    import docx
+    import openpyxl
+
+    paths = []
+    for size in sizes:
+        units = SIZES[size]
+        paragraphs = [PARAGRAPHS[i % len(PARAGRAPHS)] for i in range(units)]
+        rows = [(f"2024-{(i % 12) + 1:02d}-{(i % 28) + 1:02d}", f"Vendor {i % 17}",
+                 round(9950 if i % 23 == 0 else 120 + (i * 37) % 4000, 2), f"INV-{i:06d}")
+                for i in range(units * 10)]
+        for copy_index in range(copies):
+            base = os.path.join(directory, f"{size}_{copy_index}")
+
+            PDFRenderer().render(f"{size} statement", [("Statement", [("low", text) for text in paragraphs])],
+                                 base + ".pdf")
+
+            document = docx.Document()
+            for text in paragraphs:
+                document.add_paragraph(text)
+            document.save(base + ".docx")
+
+            workbook = openpyxl.Workbook()
+            sheet = workbook.active
+            sheet.append(["date", "counterparty", "amount", "invoice"])
+            for row in rows:
+                sheet.append(row)
+            workbook.save(base + ".xlsx")
+
+            with open(base + ".csv", "w", newline="", encoding="utf-8") as handle:
+                writer = csv.writer(handle)
+                writer.writerow(["date", "counterparty", "amount", "invoice"])
+                writer.writerows(rows)
+
+            paths.extend(f"{base}.{fmt}" for fmt in FORMATS)
+    return paths
+
+
+def build_pipeline(config: dict) -> AnalysisPipeline:
+    """The same components the Flask app builds, without the result cache"""
+    model_client = get_model_client(config)
+    rules = RuleEngine.from_config(config)
+    orchestrator = AnalysisOrchestrator.from_config(
+        config,
+        ComplianceChecker(config=config, model_client=model_client, rule_engine=rules),
+        FraudDetector(config=config, model_client=model_client, rule_engine=rules)
+    )
+    return AnalysisPipeline(config, DocumentProcessor(), orchestrator,
+                            result_cache=None, tabular_analyzer=TabularFraudAnalyzer.from_config(config))
+
+
+def run_document(pipeline: AnalysisPipeline, recorder: StageRecorder, path: str, report_dir: str,
+                 report_backend: str):
+    """extract -> analyze -> report for one document, timing each stage"""
+    def run():
+        name = os.path.basename(path)
+        fmt = name.rsplit(".", 1)[-1]
+        tabular = pipeline.tabular_analyzer
+        if tabular and tabular.supports(name):
+            recorder.measure("tabular", lambda: tabular.analyze_file(path))
+        text = recorder.measure(f"extract:{fmt}", lambda: pipeline.extract(path))
+        compliance_results, fraud_results = recorder.measure(
+            "analyze", lambda: pipeline.orchestrator.analyze(text))
+        recorder.measure("report", lambda: ReportGenerator.generate_pdf_report(
+            name, compliance_results, fraud_results, output_dir=report_dir, backend=report_backend))
+    recorder.measure("total", run)
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = fraction * (len(sorted_values) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(recorder: StageRecorder, wall_seconds: float) -> dict:
+    stages = {}
+    for stage, values in recorder.latencies.items():
+        values = sorted(values)
+        busy = sum(values)
+        stages[stage] = {
+            "count": len(values),
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+            "mean_ms": statistics.fmean(values) * 1000,
+            # Items per second of time spent in the stage; "total" uses wall time instead
+            "throughput": len(values) / (wall_seconds if stage == "total" else busy) if busy else 0.0,
+            "peak_rss_mb": recorder.peak_rss.get(stage, 0) / (1024 * 1024)
+        }
+    return stages
+
+
+def print_table(stages: dict, baseline: dict = None):
+    header = f"{'stage':<14} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'items/s':>9} {'peak RSS':>10}"
+    if baseline:
+        header += f" {'p95 vs base':>12}"
+    print(header)
+    for stage in sorted(stages, key=lambda name: (name == "total", name)):
+        row = stages[stage]
+        line = (f"{stage:<14} {row['count']:>5} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} "
+                f"{row['throughput']:>9.2f} {row['peak_rss_mb']:>7.1f} MB")
+        if baseline:
+            before = baseline.get(stage)
+            line += f" {(row['p95_ms'] / before['p95_ms'] - 1) * 100:>+11.1f}%" if before and before['p95_ms'] else \
+                f" {'new':>12}"
+        print(line)
+
+
+def regressions(stages: dict, baseline: dict, tolerance: float) -> list:
+    """Stages whose p95 latency grew by more than `tolerance` (a fraction) over the baseline"""
+    slower = []
+    for stage, row in stages.items():
+        before = baseline.get(stage)
+        if before and before['p95_ms'] and row['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            slower.append(f"{stage}: p95 {before['p95_ms']:.1f} -> {row['p95_ms']:.1f} ms")
+    return slower
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_config(path: str) -> dict:
+    try:
+        with open(path) as handle:
+            return yaml.safe_load(handle)
+    except FileNotFoundError:
+        # Fall back to the config.yaml shipped next to the sources
+        with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config.yaml")) as handle:
+            return yaml.safe_load(handle)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark extract -> analyze -> report against a fake watsonx.ai")
+    parser.add_argument("--config", default=os.environ.get('GRANITEGUARD_CONFIG', 'config/config.yaml'))
+    parser.add_argument("--sizes", nargs="+", choices=sorted(SIZES), default=["small", "medium"])
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=list(FORMATS))
+    parser.add_argument("--copies", type=int, default=2, help="Documents per format and size")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the corpus")
+    parser.add_argument("--concurrency", type=int, default=1, help="Documents processed at the same time")
+    parser.add_argument("--report-backend", default="builtin", choices=["builtin", "pdfkit", "html"])
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per model call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Max extra random seconds per call")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of calls that are slow")
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="Seconds per slow call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls failing with 503")
+    parser.add_argument("--response", default=DEFAULT_REPLY, help="Canned model reply")
+    parser.add_argument("--rate-limit", type=float, help="Override resilience.rate_limit.requests_per_second")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--save", help="Write the results to this baseline file")
+    parser.add_argument("--compare", help="Baseline file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed p95 slowdown before failing")
+    args = parser.parse_args()
+
+    config = copy.deepcopy(load_config(args.config))
+    work_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    server = FakeWatsonxServer(response=args.response, latency=args.latency, jitter=args.jitter,
+                               slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                               error_rate=args.error_rate, seed=args.seed).start()
+    try:
+        config['model']['backend'] = 'watsonx'
+        config['watsonx'] = server.config(timeout=config.get('watsonx', {}).get('timeout', 60))
+        if config.get('entity_index', {}).get('enabled'):
+            # Measured like the app, but against a fresh index
+            config['entity_index']['path'] = os.path.join(work_dir, "entities.sqlite3")
+        rate_limit = config.setdefault('resilience', {}).setdefault('rate_limit', {})
+        if args.rate_limit is not None:
+            rate_limit['requests_per_second'] = args.rate_limit
+        if rate_limit.get('shared_path'):
+            rate_limit['shared_path'] = os.path.join(work_dir, "rate_limit.sqlite3")
+
+        corpus_dir = os.path.join(work_dir, "corpus")
+        report_dir = os.path.join(work_dir, "reports")
+        os.makedirs(corpus_dir)
+        paths = [path for path in generate_corpus(corpus_dir, args.sizes, args.copies)
+                 if path.rsplit(".", 1)[-1] in args.formats]
+        pipeline = build_pipeline(config)
+
+        # Warm up imports, the token cache and the render pool outside the measured runs
+        for path in {path.rsplit(".", 1)[-1]: path for path in paths}.values():
+            run_document(pipeline, StageRecorder(), path, report_dir, args.report_backend)
+
+        print(f"{len(paths)} documents x {args.repeat} passes, concurrency {args.concurrency}, "
+              f"model latency {args.latency}s (+{args.jitter}s jitter, {args.slow_rate:.0%} at {args.slow_latency}s)")
+        with StageRecorder() as recorder:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                for future in [executor.submit(run_document, pipeline, recorder, path, report_dir, args.report_backend)
+                               for _ in range(args.repeat) for path in paths]:
+                    future.result()
+            wall_seconds = time.perf_counter() - start
+        stages = summarize(recorder, wall_seconds)
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as handle:
+            baseline = json.load(handle)
+        print(f"baseline: commit {baseline.get('commit')} from {baseline.get('created')}")
+        changed = sorted(name for name, value in baseline.get('settings', {}).items()
+                         if name not in ("tolerance", "config") and getattr(args, name, value) != value)
+        if changed:
+            print(f"warning: settings differ from the baseline ({', '.join(changed)}); numbers are not comparable")
+    print_table(stages, baseline and baseline['stages'])
+    print(f"model calls: {server.requests}, wall time {wall_seconds:.2f}s")
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump({"commit": git_commit(), "created": datetime.now().isoformat(timespec="seconds"),
+                       "python": platform.python_version(), "cpus": os.cpu_count(),
+                       "settings": {name: value for name, value in vars(args).items()
+                                    if name not in ("save", "compare", "response")},
+                       "stages": stages}, handle, indent=2)
+        print(f"Baseline written to {args.save}")
+
+    if baseline:
+        slower = regressions(stages, baseline['stages'], args.tolerance)
+        if slower:
+            print(f"Regressions beyond {args.tolerance:.0%}:")
+            for line in slower:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
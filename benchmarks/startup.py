@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+GraniteGuard AI - Startup Benchmark
+
+Imports each module in a fresh interpreter and prints the median wall time,
+so regressions in cold start (a heavy dependency imported at module load)
+show up. The dependencies document extraction loads on first use are timed
+the same way, to show what the first document of each format pays.
+
+Usage:
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 9 --max-ms 100
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+# Modules loaded when a server process starts
+STARTUP_MODULES = [
+    "src.document_processing",
+    "src.compliance_checker",
+    "src.fraud_detector",
+    "src.app",
+]
+
+# Imported lazily by the format handlers, on the first document of their format
+FIRST_USE_MODULES = [
+    "pdfplumber",
+    "docx",
+    "openpyxl",
+    "pandas",
+]
+
+_TIMER = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+
+
+def import_ms(module: str, runs: int) -> float:
+    """Median milliseconds to import `module` into a fresh interpreter"""
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", _TIMER.format(module=module)],
+                                capture_output=True, text=True, check=True)
+        timings.append(float(result.stdout.strip().splitlines()[-1]) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time of the server modules")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per module")
+    parser.add_argument("--max-ms", type=float, help="Exit non-zero if src.document_processing imports slower")
+    args = parser.parse_args()
+
+    print(f"{'module':<28} {'median import':>14}")
+    results = {}
+    for module in STARTUP_MODULES:
+        results[module] = import_ms(module, args.runs)
+        print(f"{module:<28} {results[module]:11.1f} ms")
+    print("first use (lazy):")
+    for module in FIRST_USE_MODULES:
+        try:
+            print(f"  {module:<26} {import_ms(module, args.runs):11.1f} ms")
+        except subprocess.CalledProcessError:
+            print(f"  {module:<26}     not installed")
+
+    if args.max_ms is not None and results["src.document_processing"] > args.max_ms:
+        print(f"src.document_processing imports in {results['src.document_processing']:.1f} ms, "
+              f"over the {args.max_ms} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import logging
+import zipfile
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from src.document_processing import DocumentProcessor
+from src.findings import FIELDS, findings_to_columns, findings_frame
+from src.reporting import ReportGenerator
+from src.result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FILE = "results.jsonl"
+
+
+def _extract_document(file_path: str, limits: dict, tabular_analyzer=None) -> tuple:
+    """Extract one document and run tabular checks on it; runs inside a pool worker process"""
+    tabular_findings = []
+    if tabular_analyzer and tabular_analyzer.supports(file_path):
+        try:
+            tabular_findings = tabular_analyzer.analyze_file(file_path)
+        except Exception as e:
+            # Supplementary stage: the document is still extracted and analyzed without it
+            logger.error(f"Tabular checks failed for {file_path}: {e}")
+    text = DocumentProcessor.extract_text(file_path, **limits)
+    return text, tabular_findings
+
+
+class BulkAnalyzer:
+    def __init__(self, orchestrator, output_dir: str,
+                 allowed_extensions=(".pdf", ".docx", ".xlsx", ".xls", ".csv"),
+                 extract_workers: int = None,
+                 model_concurrency: int = 4,
+                 generate_reports: bool = True,
+                 limits: dict = None,
+                 tabular_analyzer=None,
+                 report_backend: str = "builtin"):
+        """
+        Analyze directories or zip archives of documents in bulk
+
+        Args:
+            orchestrator: AnalysisOrchestrator running both analyzers
+            output_dir: Directory receiving results.jsonl and per-document reports
+            allowed_extensions: File types picked up from the source
+            extract_workers: Processes used for text extraction (default: CPU count)
+            model_concurrency: Documents analyzed by the model at the same time
+            generate_reports: Write a report per document alongside the JSONL results
+            limits: Per-document extraction budget (max_pages, max_chars, max_rows, max_cells)
+            tabular_analyzer: Optional TabularFraudAnalyzer for CSV/XLSX transaction files
+            report_backend: ReportGenerator backend ("builtin", "pdfkit" or "html")
+        """
+        self.orchestrator = orchestrator
+        self.output_dir = output_dir
+        self.allowed_extensions = tuple(ext.lower() for ext in allowed_extensions)
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        self.model_concurrency = model_concurrency
+        self.generate_reports = generate_reports
+        self.limits = limits or {}
+        self.tabular_analyzer = tabular_analyzer
+        self.report_backend = report_backend
+        self.results_path = os.path.join(output_dir, RESULTS_FILE)
+
+    @classmethod
+    def from_config(cls, config: dict, orchestrator, output_dir: str) -> "BulkAnalyzer":
+        """Build a bulk analyzer from the `bulk`, `extraction` and `reporting` sections of config.yaml"""
+        from src.tabular_analysis import TabularFraudAnalyzer
+
+        bulk = config.get('bulk', {})
+        extraction = config.get('extraction', {})
+        return cls(orchestrator, output_dir,
+                   allowed_extensions=config['app']['allowed_extensions'],
+                   extract_workers=bulk.get('extract_workers'),
+                   model_concurrency=bulk.get('model_concurrency', 4),
+                   generate_reports=bulk.get('generate_reports', True),
+                   limits={key: extraction.get(key) for key in ('max_pages', 'max_chars', 'max_rows', 'max_cells')},
+                   tabular_analyzer=TabularFraudAnalyzer.from_config(config),
+                   report_backend=config.get('reporting', {}).get('backend', 'builtin'))
+
+    def run(self, source: str, progress=None) -> dict:
+        """
+        Analyze every supported document under a directory or inside a zip archive
+
+        Documents already recorded as completed in results.jsonl (same relative
+        path and same bytes) are skipped, so an interrupted run can simply be
+        started again with the same source and output directory.
+
+        Args:
+            source: Directory or .zip archive
+            progress: Optional callback taking (fraction, stage)
+
+        Returns:
+            Summary with counts and the path of the JSONL results file
+        """
+        progress = progress or (lambda fraction, stage: None)
+        os.makedirs(self.output_dir, exist_ok=True)
+        root = self._unpack(source) if zipfile.is_zipfile(source) else source
+
+        finished = self._load_finished()
+        documents = []
+        skipped = 0
+        for relpath, path in self._walk(root):
+            sha256 = ResultCache.hash_file(path)
+            if (relpath, sha256) in finished:
+                skipped += 1
+                continue
+            documents.append((relpath, path, sha256))
+        logger.info(f"Bulk run: {len(documents)} documents to analyze, {skipped} already finished")
+
+        started = time.monotonic()
+        completed = failed = 0
+        with open(self.results_path, 'a', encoding='utf-8') as results_file:
+            for record in self._process(documents):
+                results_file.write(json.dumps(record, default=str) + "\n")
+                # Flush every record so an interruption loses at most in-flight documents
+                results_file.flush()
+                os.fsync(results_file.fileno())
+                if record['status'] == 'completed':
+                    completed += 1
+                else:
+                    failed += 1
+                progress((completed + failed) / max(len(documents), 1), 'analyzing')
+
+        summary = {
+            "total": len(documents) + skipped,
+            "completed": completed,
+            "failed": failed,
+            "skipped": skipped,
+            "elapsed_seconds": round(time.monotonic() - started, 2),
+            "results_path": self.results_path
+        }
+        logger.info(f"Bulk run finished: {summary}")
+        return summary
+
+    def _process(self, documents):
+        """Yield one result record per document, extracting in processes and analyzing in threads"""
+        documents = iter(documents)
+        with ProcessPoolExecutor(max_workers=self.extract_workers) as extract_pool, \
+                ThreadPoolExecutor(max_workers=self.model_concurrency, thread_name_prefix="bulk") as analyze_pool:
+            extracting = {}
+            analyzing = set()
+
+            def fill():
+                # Keep a small extraction backlog so extracted text never piles up in memory
+                while len(extracting) < self.extract_workers * 2 and len(analyzing) < self.model_concurrency * 2:
+                    document = next(documents, None)
+                    if document is None:
+                        return
+                    future = extract_pool.submit(_extract_document, document[1], self.limits, self.tabular_analyzer)
+                    extracting[future] = document
+
+            fill()
+            while extracting or analyzing:
+                done, _ = wait(list(extracting) + list(analyzing), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in extracting:
+                        relpath, path, sha256 = extracting.pop(future)
+                        try:
+                            text, tabular_findings = future.result()
+                        except Exception as e:
+                            logger.error(f"Extraction failed for {relpath}: {e}")
+                            yield self._record(relpath, sha256, error=f"Extraction failed: {e}")
+                            continue
+                        analyzing.add(analyze_pool.submit(self._analyze, relpath, sha256, text, tabular_findings))
+                    else:
+                        analyzing.discard(future)
+                        yield future.result()
+                fill()
+
+    def _analyze(self, relpath: str, sha256: str, text: str, tabular_findings: list) -> dict:
+        try:
+            compliance_results, fraud_results = self.orchestrator.analyze(text)
+            if tabular_findings:
+                # Only a configured TabularFraudAnalyzer finds any, so its module is already loaded
+                from src.tabular_analysis import add_tabular_findings
+                fraud_results = add_tabular_findings(fraud_results, tabular_findings)
+            report_path = None
+            if self.generate_reports:
+                report_path = ReportGenerator.generate_pdf_report(
+                    document_name=relpath.replace(os.sep, "_"),
+                    compliance_results=compliance_results,
+                    fraud_results=fraud_results,
+                    output_dir=os.path.join(self.output_dir, "reports"),
+                    backend=self.report_backend
+                )
+            return self._record(relpath, sha256,
+                                compliance_results=compliance_results,
+                                fraud_results=fraud_results,
+                                report_path=report_path,
+                                document_length=len(text))
+        except Exception as e:
+            logger.error(f"Analysis failed for {relpath}: {e}")
+            return self._record(relpath, sha256, error=f"Analysis failed: {e}")
+
+    @staticmethod
+    def _record(relpath: str, sha256: str, error: str = None, **fields) -> dict:
+        record = {
+            "document": relpath,
+            "sha256": sha256,
+            "status": "failed" if error else "completed",
+            "timestamp": str(datetime.now())
+        }
+        if error:
+            record["error"] = error
+        record.update(fields)
+        return record
+
+    def findings_frame(self) -> "pd.DataFrame":
+        """
+        Structured findings of every completed document as one DataFrame
+
+        results.jsonl is streamed into per-field columns, so millions of
+        findings can be sorted and aggregated without a Python object each.
+
+        Returns:
+            DataFrame with a categorical `document` column plus one column per Finding field
+        """
+        import pandas as pd
+
+        columns = {name: [] for name in FIELDS}
+        documents = []
+        for record in self._iter_records():
+            if record.get('status') != 'completed':
+                continue
+            for key in ('compliance_results', 'fraud_results'):
+                findings = record.get(key, {}).get('findings', [])
+                findings_to_columns(findings, columns)
+                documents.extend([record['document']] * len(findings))
+        df = findings_frame(columns)
+        df.insert(0, 'document', pd.Categorical(documents))
+        return df
+
+    def _iter_records(self):
+        if not os.path.exists(self.results_path):
+            return
+        with open(self.results_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Last line of a run killed mid-write
+                    continue
+
+    def _load_finished(self) -> set:
+        """(relative path, sha256) of documents completed by earlier runs"""
+        return {(record['document'], record['sha256'])
+                for record in self._iter_records() if record.get('status') == 'completed'}
+
+    def _walk(self, root: str):
+        for directory, _, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                if filename.lower().endswith(self.allowed_extensions):
+                    path = os.path.join(directory, filename)
+                    yield os.path.relpath(path, root), path
+
+    def _unpack(self, archive: str) -> str:
+        """Extract supported members of a zip archive under the output directory"""
+        name = os.path.splitext(os.path.basename(archive))[0]
+        target = os.path.join(self.output_dir, "_archive", name)
+        with zipfile.ZipFile(archive) as zf:
+            for member in zf.infolist():
+                if member.is_dir() or not member.filename.lower().endswith(self.allowed_extensions):
+                    continue
+                # ZipFile.extract strips absolute paths and ".." components
+                if not os.path.exists(os.path.join(target, member.filename)):
+                    zf.extract(member, target)
+        return target
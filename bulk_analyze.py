@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+GraniteGuard AI - Bulk Analysis CLI
+IBM TechXchange Dev Day Hackathon Project
+
+Analyzes every supported document in a directory or zip archive and writes a
+consolidated results.jsonl plus one report per document. Re-running with the
+same output directory resumes an interrupted run.
+
+Usage:
+    python bulk_analyze.py month_end_dump/ --output reports/bulk_2025_01
+    python bulk_analyze.py statements.zip --concurrency 8 --no-reports
+"""
+
+import argparse
+import logging
+import sys
+import yaml
+from src.compliance_checker import ComplianceChecker
+from src.fraud_detector import FraudDetector
+from src.model_client import get_model_client
+from src.rules import RuleEngine
+from src.orchestrator import AnalysisOrchestrator
+from src.bulk import BulkAnalyzer
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Bulk compliance and fraud analysis with IBM Granite")
+    parser.add_argument("source", help="Directory or .zip archive of documents")
+    parser.add_argument("--output", default="reports/bulk", help="Output directory (reuse it to resume)")
+    parser.add_argument("--config", default="config/config.yaml", help="Path to config.yaml")
+    parser.add_argument("--workers", type=int, help="Extraction processes (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, help="Documents analyzed by the model at once")
+    parser.add_argument("--no-reports", action="store_true", help="Only write results.jsonl")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    with open(args.config) as f:
+        config = yaml.safe_load(f)
+    
+    model_client = get_model_client(config)
+    rule_engine = RuleEngine.from_config(config)
+    orchestrator = AnalysisOrchestrator.from_config(
+        config,
+        ComplianceChecker(config=config, model_client=model_client, rule_engine=rule_engine),
+        FraudDetector(config=config, model_client=model_client, rule_engine=rule_engine)
+    )
+    
+    bulk = BulkAnalyzer.from_config(config, orchestrator, args.output)
+    if args.workers:
+        bulk.extract_workers = args.workers
+    if args.concurrency:
+        bulk.model_concurrency = args.concurrency
+    if args.no_reports:
+        bulk.generate_reports = False
+    
+    summary = bulk.run(args.source)
+    orchestrator.shutdown()
+    
+    print(f"✅ Completed: {summary['completed']}  ❌ Failed: {summary['failed']}  ⏭️ Skipped: {summary['skipped']}")
+    print(f"📄 Results: {summary['results_path']}")
+    return 0 if summary['failed'] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import logging
+from datetime import datetime
+from functools import partial
+from src.chunking import run_chunks
+from src.generation import UsageLog, STOP_MAX_TOKENS
+from src.findings import Finding, FindingStream, parse_model_findings, assign_pages
+from src.rules import prescreen_chunks
+from src.pii import restore
+from src.incremental import chunk_digests
+from src.tracing import trace
+
+logger = logging.getLogger(__name__)
+
+NO_ANALYSIS = "No substantive analysis returned by the model. Try a simpler document or a different model."
+
+
+class ChunkedAnalysis:
+    def __init__(self, analyzer, name: str, document_text: str, clean_replies,
+                 on_finding=None, previous=None, pii_matches=None,
+                 report_pii: bool = False, min_free_text: int = 0):
+        """
+        Run one analyzer's prompt over the chunks of a document
+
+        Rule hits, personal data, findings carried over from a previous version
+        and the model's findings for the remaining chunks are collected in
+        `findings`, in that order; they are not deduplicated yet.
+
+        Args:
+            analyzer: ComplianceChecker or FraudDetector providing the model, chunker,
+                generation profile and budget, rule engine, semantic cache and PII scanner
+            name: "compliance" or "fraud"
+            document_text: Text of the document
+            clean_replies: Upper-case replies that mean "nothing found"
+            on_finding: Optional callback receiving each Finding as soon as it is known
+            previous: Optional PreviousVersion of this document
+            pii_matches: PII matches of document_text from an earlier scan; scanned here when None
+            report_pii: Add a finding per type of personal data found
+            min_free_text: Free-text replies (no "FINDING |" lines) shorter than this carry
+                no usable finding
+
+        Raises:
+            Exception: The error of the first chunk, when every chunk sent to the model failed
+        """
+        self.analyzer = analyzer
+        self.name = name
+        self.document_text = document_text
+        self.clean_replies = clean_replies
+        self.min_free_text = min_free_text
+        rule_engine = analyzer.rule_engine
+        self.rule_findings = rule_engine.scan(document_text, name) if rule_engine else []
+        plan = previous.plan(name, analyzer.chunker) if previous is not None else None
+        self.all_chunks = plan.chunks if plan else analyzer.chunker.split(document_text)
+        self.reused = plan.reused if plan else {}
+        self.fresh_chunks = [chunk for chunk in self.all_chunks if chunk.index not in self.reused]
+        self.chunks = prescreen_chunks(rule_engine, analyzer.prescreen_mode, document_text, self.fresh_chunks, name)
+        findings = [Finding.from_rule(f) for f in self.rule_findings]
+        # Personal data is found locally in one pass and redacted from every prompt
+        if not analyzer.pii_scanner:
+            pii_matches = []
+        elif pii_matches is None:
+            pii_matches = analyzer.pii_scanner.scan(document_text)
+        self.pii_matches = pii_matches
+        if report_pii and analyzer.pii_scanner:
+            findings.extend(analyzer.pii_scanner.findings(pii_matches))
+        carried = [finding for chunk_findings in self.reused.values() for finding in chunk_findings]
+        self.publish = None
+        if on_finding:
+            def publish(finding):
+                on_finding(assign_pages([finding], document_text)[0])
+            self.publish = publish
+            for finding in findings + carried:
+                publish(finding)
+
+        self.usage = UsageLog()
+        self.responses, self.errors = run_chunks(self.analyze_chunk, self.chunks, analyzer.max_concurrency)
+        if self.chunks and len(self.errors) == len(self.chunks):
+            raise self.errors[0][1]
+        self.findings = findings + carried
+        self.findings.extend(finding for response in self.responses if response for finding in response)
+        self.section_errors = [f"Error during analysis of section {index + 1}: {str(e)}"
+                               for index, e in self.errors]
+
+    def analyze_chunk(self, chunk) -> list:
+        """Run the analyzer's prompt over a single chunk and parse the reply into findings"""
+        analyzer = self.analyzer
+        semantic_cache = analyzer.semantic_cache
+        signature = semantic_cache.signature(chunk.text) if semantic_cache else None
+        response = semantic_cache.lookup(analyzer.cache_namespace, signature) if signature else None
+        if response is not None:
+            # Reply to a near-duplicate chunk, already adapted to this chunk's dates and amounts
+            signature = None
+            self.usage.record_cached(chunk.index)
+            if self.publish is not None:
+                stream = FindingStream(self.name, chunk, self.publish)
+                stream.feed(response)
+                stream.close()
+        else:
+            text, placeholders = chunk.text, {}
+            if self.pii_matches and analyzer.pii_scanner.redact_prompts:
+                # Personal data never leaves the process: the model sees placeholders, restored in its reply
+                text, placeholders = analyzer.pii_scanner.redact(chunk.text, self.pii_matches, chunk.offset)
+            prompt = analyzer._prompt(text)
+            max_new_tokens = analyzer.budget.max_new_tokens(prompt, analyzer.profile)
+            params = analyzer.profile.to_params(max_new_tokens)
+            if self.publish is None:
+                generation = analyzer.model.generate(prompt, params)
+            else:
+                # Stream the reply so each finding line reaches the caller as soon as it is complete
+                stream = FindingStream(self.name, chunk, self.publish, partial(restore, placeholders=placeholders))
+                generation = analyzer.model.generate_stream(prompt, params, stream.feed)
+                stream.close()
+            self.usage.record(chunk.index, generation, max_new_tokens)
+            trace("model_output", generation.text, analyzer=self.name, chunk=chunk.index)
+            response = restore(generation.text, placeholders)
+            if generation.stop_reason == STOP_MAX_TOKENS:
+                # Truncated replies are not worth reusing
+                signature = None
+        if response and "|" not in response and len(response.strip()) < self.min_free_text:
+            findings = [] if response.strip().rstrip(".").upper() in self.clean_replies else None
+        else:
+            # None for an empty reply, [] for "nothing found"
+            findings = parse_model_findings(response, self.name, chunk, self.clean_replies)
+        if signature and findings is not None:
+            semantic_cache.store(analyzer.cache_namespace, signature, response)
+        return findings
+
+    def messages(self, findings: list, nothing_found: str) -> list:
+        """Display lines for the final findings plus failed sections, or a single "nothing found" line"""
+        lines = [str(finding) for finding in findings] + self.section_errors
+        if not lines:
+            # Chunks skipped by pre-screening had no rule hits, so they count as clean
+            clean = any(response == [] for response in self.responses) or len(self.chunks) < len(self.all_chunks)
+            lines = [nothing_found if clean else NO_ANALYSIS]
+        return lines
+
+    def results(self, findings: list) -> dict:
+        """Result fields shared by both analyzers"""
+        analyzed = {chunk.index for chunk in self.chunks}
+        skipped = {chunk.index for chunk in self.fresh_chunks} - analyzed
+        return {
+            "findings": [finding.to_dict() for finding in findings],
+            "section_errors": self.section_errors,
+            "rule_findings": self.rule_findings,
+            "model_used": self.analyzer.config['model']['model_id'],
+            "chunks_analyzed": len(self.chunks),
+            "chunks_skipped": len(self.fresh_chunks) - len(self.chunks),
+            "chunks_reused": len(self.reused),
+            # Lets the next version of this document reuse the findings of unchanged chunks
+            "chunk_digests": chunk_digests(self.all_chunks, skipped | {index for index, _ in self.errors}),
+            "generation_profile": self.analyzer.profile.name,
+            "token_usage": self.usage.summary(),
+            "timestamp": str(datetime.now())
+        }
@@ -0,0 +1,130 @@
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Separator DocumentProcessor places between PDF pages
+PAGE_BREAK = "\f"
+
+# Page breaks first, then blank lines (sections / paragraphs), then single lines
+_BOUNDARIES = [re.compile(r"\f"), re.compile(r"\n\s*\n"), re.compile(r"\n")]
+
+
+class Chunk(NamedTuple):
+    index: int
+    offset: int  # character offset of the chunk in the source text
+    text: str
+
+
+class TextChunker:
+    def __init__(self, chunk_size: int = 4000, overlap: int = 400):
+        """
+        Split long documents into model-sized chunks on page/section boundaries
+
+        Args:
+            chunk_size: Maximum characters per chunk
+            overlap: Characters of the previous chunk repeated at the start of the next
+        """
+        if overlap * 2 >= chunk_size:
+            raise ValueError("Chunk overlap must be less than half the chunk size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    @classmethod
+    def from_config(cls, config: dict, max_chars: int = None) -> "TextChunker":
+        """
+        Build a chunker from the `analysis` section of config.yaml
+
+        Args:
+            config: Parsed config.yaml
+            max_chars: Hard cap on chunk_size, e.g. what fits the model context window
+        """
+        analysis = (config or {}).get('analysis', {})
+        chunk_size = analysis.get('chunk_size', 4000)
+        overlap = analysis.get('chunk_overlap', 400)
+        if max_chars is not None and max_chars < chunk_size:
+            logger.info(f"Chunk size lowered from {chunk_size} to {max_chars} characters to fit the context window")
+            chunk_size = max_chars
+            overlap = min(overlap, chunk_size // 4)
+        return cls(chunk_size=chunk_size, overlap=overlap)
+
+    def split(self, text: str) -> List[Chunk]:
+        """Split text into overlapping chunks, preferring the coarsest boundary that fits"""
+        if not text:
+            return []
+        if len(text) <= self.chunk_size:
+            return [Chunk(0, 0, text)]
+
+        chunks = []
+        start = 0
+        while start < len(text):
+            end = self._find_end(text, start)
+            chunks.append(Chunk(len(chunks), start, text[start:end]))
+            if end >= len(text):
+                break
+            start = self._find_overlap_start(text, start, end)
+        return chunks
+
+    def _find_end(self, text: str, start: int) -> int:
+        limit = start + self.chunk_size
+        if limit >= len(text):
+            return len(text)
+        # Never cut a chunk down to less than half its size just to land on a boundary
+        floor = start + self.chunk_size // 2
+        for boundary in _BOUNDARIES:
+            cut = None
+            for match in boundary.finditer(text, floor, limit):
+                cut = match.end()
+            if cut:
+                return cut
+        space = text.rfind(" ", floor, limit)
+        return space + 1 if space > 0 else limit
+
+    def _find_overlap_start(self, text: str, start: int, end: int) -> int:
+        if not self.overlap:
+            return end
+        target = max(end - self.overlap, start + 1)
+        # Start the overlap at a word boundary so terms are not split
+        space = text.find(" ", target, end)
+        return space + 1 if space != -1 else target
+
+
+def run_chunks(analyze_chunk: Callable[[Chunk], Any],
+               chunks: List[Chunk],
+               max_workers: int = 4) -> tuple:
+    """
+    Run an analysis function over chunks with a bounded thread pool
+
+    Args:
+        analyze_chunk: Function called with each Chunk, returning its parsed model response
+        chunks: Chunks to analyze
+        max_workers: Maximum concurrent model calls
+
+    Returns:
+        Tuple of (responses, errors) in chunk order; a failed chunk contributes
+        None to responses and an (index, exception) pair to errors
+    """
+    if len(chunks) <= 1 or max_workers <= 1:
+        outcomes = [_call(analyze_chunk, chunk) for chunk in chunks]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+            outcomes = list(pool.map(partial(_call, analyze_chunk), chunks))
+
+    responses, errors = [], []
+    for chunk, (response, error) in zip(chunks, outcomes):
+        responses.append(response)
+        if error is not None:
+            logger.error(f"Analysis of chunk {chunk.index + 1}/{len(chunks)} failed: {error}")
+            errors.append((chunk.index, error))
+    return responses, errors
+
+
+def _call(analyze_chunk, chunk):
+    try:
+        return analyze_chunk(chunk), None
+    except Exception as e:
+        return None, e
+
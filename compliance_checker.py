@@ -1,27 +1,63 @@
-from ibm_watson_machine_learning.foundation_models import Model
 import yaml
 import os
 import logging
-from datetime import datetime
+from src.chunking import TextChunker
+from src.chunk_analysis import ChunkedAnalysis
+from src.generation import GenerationProfile, TokenBudget
+from src.findings import dedupe_findings, assign_pages
+from src.model_client import get_model_client
+from src.rules import RuleEngine
+from src.semantic_cache import get_semantic_cache
+from src.pii import PIIScanner
 
 logger = logging.getLogger(__name__)
 
+NO_ISSUES_FOUND = "✅ No compliance issues found in this document."
+CLEAN_REPLIES = ("NO COMPLIANCE ISSUES FOUND",)
+
 class ComplianceChecker:
-    def __init__(self, config_path: str = "config/config.yaml"):
-        """Initialize IBM Granite-powered compliance checker"""
+    # Bump whenever the prompt or response post-processing changes; part of the result cache key
+    PROMPT_VERSION = "3"
+
+    def __init__(self, config_path: str = "config/config.yaml", config: dict = None,
+                 model_client=None, rule_engine=None, semantic_cache=None, pii_scanner=None):
+        """
+        Initialize IBM Granite-powered compliance checker
+
+        Args:
+            config_path: Path to config.yaml, read only when `config` is not given
+            config: Already parsed configuration
+            model_client: Shared model client; defaults to the pooled client for model.model_id
+            rule_engine: Shared pre-screening RuleEngine; defaults to one built from `prescreen`
+            semantic_cache: Shared SemanticCache for near-duplicate chunks; defaults to the
+                process-wide one configured under `semantic_cache` (None when disabled)
+            pii_scanner: PIIScanner redacting personal data from prompts; defaults to one built
+                from `pii` (None when disabled)
+        """
         try:
-            with open(config_path) as f:
-                self.config = yaml.safe_load(f)
+            if config is None:
+                with open(config_path) as f:
+                    config = yaml.safe_load(f)
+            self.config = config
             
-            # Initialize IBM Granite model
-            self.model = Model(
-                model_id=self.config['model']['model_id'],
-                credentials={
-                    "url": self.config['watsonx']['url'],
-                    "apikey": self.config['watsonx']['api_key']
-                },
-                project_id=self.config['watsonx']['project_id']
-            )
+            # Shared IBM Granite client (one authenticated session per model_id)
+            self.model = model_client or get_model_client(self.config)
+            
+            # Named generation parameters; chunks are capped so prompt plus answer fit the context window
+            self.profile = GenerationProfile.from_config(self.config, 'compliance')
+            self.budget = TokenBudget.from_config(self.config)
+            self.chunker = TextChunker.from_config(
+                self.config, max_chars=self.budget.max_input_chars(self._prompt(""), self.profile))
+            self.max_concurrency = self.config.get('analysis', {}).get('max_concurrency', 4)
+            
+            # Keyword rules run before the model and can skip it for clean documents/chunks
+            self.rule_engine = rule_engine if rule_engine is not None else RuleEngine.from_config(self.config)
+            self.prescreen_mode = self.config.get('prescreen', {}).get('mode', 'annotate')
+            
+            # Replies to near-duplicate chunks (templated documents) are reused instead of regenerated
+            self.semantic_cache = semantic_cache if semantic_cache is not None else get_semantic_cache(self.config)
+            self.pii_scanner = pii_scanner if pii_scanner is not None else PIIScanner.from_config(self.config)
+            self.cache_namespace = f"compliance:{self.PROMPT_VERSION}:{self.config['model']['model_id']}:{self.profile.to_params()}"
             
             logger.info(f"Compliance checker initialized with IBM Granite model: {self.config['model']['model_id']}")
             
@@ -29,51 +65,56 @@ class ComplianceChecker:
             logger.error(f"Failed to initialize compliance checker: {e}")
             raise
 
-    def check_compliance(self, document_text: str) -> dict:
+    def check_compliance(self, document_text: str, on_finding=None, previous=None, pii_matches=None) -> dict:
         """
         Analyze financial documents for compliance violations using IBM Granite
         
         Args:
             document_text: Text content of the document to analyze
+            on_finding: Optional callback receiving each Finding as soon as it is known
+                (rule hits first, then model findings while the reply streams in);
+                previews only, the returned results are authoritative
+            previous: Optional PreviousVersion of this document; chunks unchanged since
+                then keep their earlier findings instead of going back to the model
+            pii_matches: PII matches of document_text from an earlier scan; scanned here when None
             
         Returns:
             Dictionary containing compliance analysis results
         """
         try:
-            # Improved prompt for IBM Granite model
-            prompt = f"""
+            run = ChunkedAnalysis(self, 'compliance', document_text, CLEAN_REPLIES, on_finding, previous,
+                                  pii_matches, report_pii=True)
+            findings = assign_pages(dedupe_findings(run.findings), document_text)
+            return dict(
+                run.results(findings),
+                compliance_issues=run.messages(findings, NO_ISSUES_FOUND),
+                pii=self.pii_scanner.report(run.pii_matches, document_text) if self.pii_scanner else None,
+                analysis_type="IBM Granite Compliance Check"
+            )
+            
+        except Exception as e:
+            logger.error(f"Error during compliance analysis: {e}")
+            return {
+                "compliance_issues": [f"Error during analysis: {str(e)}"],
+                "error": True,
+                "model_used": self.config['model']['model_id']
+            }
+
+    def _prompt(self, text: str) -> str:
+        """Compliance prompt for one chunk of document text"""
+        # Constrained one-line-per-finding format, parsed by parse_model_findings
+        return f"""
 You are a financial compliance expert. Carefully review the following document for any compliance or regulatory violations (such as SOX, GDPR, CCPA, etc.).
 
-If you find any issues, list each violation with:
-- The regulation or law potentially violated
-- The specific text or data from the document that is problematic
-- A brief explanation of why it is a violation
+Report each violation on its own line, in exactly this format:
+FINDING | <HIGH, MEDIUM or LOW> | <regulation or law violated> | "<short quote of the problematic text>" | <one-sentence explanation> | <confidence from 0 to 1>
 
 If the document is fully compliant and you find no issues, reply exactly with: NO COMPLIANCE ISSUES FOUND.
 
-Do NOT copy large sections of the document. Only summarize findings or state 'NO COMPLIANCE ISSUES FOUND'.
+Personal data in the document has been replaced with placeholders such as [ACCOUNT_1a2b3c4d]; quote them exactly as written.
+
+Do NOT copy large sections of the document. Keep each quote under 20 words.
 
 Document:
-{document_text[:4000]}
+{text}
 """
-            response = self.model.generate_text(prompt)
-            logger.info(f"Raw Granite model output: {repr(response)}")
-            # If response is empty, very short, or just section headers, show a warning
-            if not response or not response.strip():
-                response = "No substantive analysis returned by the model. Try a simpler document or a different model."
-            elif response.strip().upper() == "NO COMPLIANCE ISSUES FOUND":
-                response = "✅ No compliance issues found in this document."
-            return {
-                "compliance_issues": [response],
-                "model_used": self.config['model']['model_id'],
-                "analysis_type": "IBM Granite Compliance Check",
-                "timestamp": str(datetime.now())
-            }
-            
-        except Exception as e:
-            logger.error(f"Error during compliance analysis: {e}")
-            return {
-                "compliance_issues": [f"Error during analysis: {str(e)}"],
-                "error": True,
-                "model_used": self.config['model']['model_id']
-            }
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""
+Shared fixtures for the offline tests
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+import copy
+import pytest
+from src.model_client import close_model_clients
+
+# Fake model backend, so no test reaches watsonx.ai
+BASE_CONFIG = {
+    "watsonx": {"url": "http://localhost", "api_key": "key", "project_id": "project"},
+    "model": {"model_id": "ibm/granite-3-8b-instruct", "backend": "fake"},
+    "fake_backend": {"response": "NO COMPLIANCE ISSUES FOUND"},
+    "analysis": {"chunk_size": 1000, "chunk_overlap": 100, "max_concurrency": 4}
+}
+
+
+@pytest.fixture
+def config():
+    """A fresh copy of BASE_CONFIG; pooled model clients are closed before and after the test"""
+    close_model_clients()
+    yield copy.deepcopy(BASE_CONFIG)
+    close_model_clients()
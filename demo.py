@@ -13,42 +13,23 @@ import json
 from datetime import datetime
 from src.document_processing import DocumentProcessor
 from src.reporting import ReportGenerator
+from src.orchestrator import AnalysisOrchestrator
+from src.rules import RuleEngine
+from src.findings import Finding
 
 class DemoComplianceChecker:
-    """Demo compliance checker that simulates IBM Granite model responses"""
+    """Demo compliance checker that simulates IBM Granite model responses with keyword rules"""
+    
+    def __init__(self, rule_engine: RuleEngine):
+        self.rule_engine = rule_engine
     
     def check_compliance(self, document_text: str) -> dict:
         """Simulate compliance analysis with realistic responses"""
         
-        # Sample compliance issues based on common patterns
-        compliance_issues = []
-        
-        # Check for common compliance keywords
-        text_lower = document_text.lower()
-        
-        if 'confidential' in text_lower and 'public' in text_lower:
-            compliance_issues.append(
-                "⚠️ MEDIUM RISK: Potential disclosure of confidential information in public context. "
-                "Review document for proper classification and access controls."
-            )
-        
-        if 'financial' in text_lower and 'unauthorized' in text_lower:
-            compliance_issues.append(
-                "🚨 HIGH RISK: Unauthorized financial transactions detected. "
-                "Immediate review required for SOX compliance and fraud prevention."
-            )
-        
-        if 'personal data' in text_lower or 'pii' in text_lower:
-            compliance_issues.append(
-                "🔒 HIGH RISK: Personal Identifiable Information (PII) found. "
-                "Ensure GDPR/CCPA compliance and proper data handling procedures."
-            )
-        
-        if 'contract' in text_lower and 'amendment' in text_lower:
-            compliance_issues.append(
-                "📋 MEDIUM RISK: Contract amendment detected. "
-                "Verify proper approval workflow and legal review processes."
-            )
+        # Single pass over the text for all configured compliance rules
+        rule_findings = self.rule_engine.scan(document_text, 'compliance')
+        findings = [Finding.from_rule(f) for f in rule_findings]
+        compliance_issues = [str(f) for f in findings]
         
         if not compliance_issues:
             compliance_issues.append(
@@ -56,43 +37,23 @@ class DemoComplianceChecker:
                 "Document appears to follow standard business practices."
             )
         
-        return {"compliance_issues": compliance_issues}
+        return {"compliance_issues": compliance_issues,
+                "findings": [f.to_dict() for f in findings],
+                "rule_findings": rule_findings}
 
 class DemoFraudDetector:
-    """Demo fraud detector that simulates IBM Granite model responses"""
+    """Demo fraud detector that simulates IBM Granite model responses with keyword rules"""
+    
+    def __init__(self, rule_engine: RuleEngine):
+        self.rule_engine = rule_engine
     
     def detect_fraud_indicators(self, document_text: str) -> dict:
         """Simulate fraud detection with realistic responses"""
         
-        # Sample fraud indicators based on common patterns
-        fraud_indicators = []
-        
-        # Check for common fraud keywords
-        text_lower = document_text.lower()
-        
-        if 'urgent' in text_lower and 'payment' in text_lower:
-            fraud_indicators.append(
-                "🚨 HIGH RISK: Urgent payment request detected. "
-                "Verify authenticity and follow proper verification procedures."
-            )
-        
-        if 'wire transfer' in text_lower and 'immediate' in text_lower:
-            fraud_indicators.append(
-                "⚠️ MEDIUM RISK: Immediate wire transfer request. "
-                "Review for potential business email compromise (BEC) fraud."
-            )
-        
-        if 'account number' in text_lower and 'routing' in text_lower:
-            fraud_indicators.append(
-                "🔍 MEDIUM RISK: Banking information in document. "
-                "Ensure proper security controls and access restrictions."
-            )
-        
-        if 'invoice' in text_lower and 'duplicate' in text_lower:
-            fraud_indicators.append(
-                "📊 LOW RISK: Potential duplicate invoice detected. "
-                "Review for billing accuracy and prevent overpayment."
-            )
+        # Single pass over the text for all configured fraud rules
+        rule_findings = self.rule_engine.scan(document_text, 'fraud')
+        findings = [Finding.from_rule(f) for f in rule_findings]
+        fraud_indicators = [str(f) for f in findings]
         
         if not fraud_indicators:
             fraud_indicators.append(
@@ -100,7 +61,15 @@ class DemoFraudDetector:
                 "Document appears to follow standard business practices."
             )
         
-        return {"fraud_indicators": fraud_indicators}
+        return {"fraud_indicators": fraud_indicators,
+                "findings": [f.to_dict() for f in findings],
+                "rule_findings": rule_findings}
+
+def load_demo_rules(config_path: str = "config/config.yaml") -> RuleEngine:
+    """Build the keyword rule engine from the pre-screening rules in config.yaml"""
+    with open(config_path) as f:
+        config = yaml.safe_load(f)
+    return RuleEngine(config.get('prescreen', {}).get('rules', []))
 
 def create_sample_document():
     """Create a sample document for testing"""
@@ -160,8 +129,11 @@ def run_demo():
     # Initialize components
     print("🔧 Initializing demo components...")
     processor = DocumentProcessor()
-    compliance_checker = DemoComplianceChecker()
-    fraud_detector = DemoFraudDetector()
+    rule_engine = load_demo_rules()
+    compliance_checker = DemoComplianceChecker(rule_engine)
+    fraud_detector = DemoFraudDetector(rule_engine)
+    orchestrator = AnalysisOrchestrator(compliance_checker, fraud_detector,
+                                        compliance_timeout=30, fraud_timeout=30)
     
     # Process document
     print("📖 Extracting text from document...")
@@ -175,11 +147,9 @@ def run_demo():
         print(f"✅ Read {len(document_text)} characters from text file")
     
     # Perform analysis
-    print("\n🔍 Running compliance analysis...")
-    compliance_results = compliance_checker.check_compliance(document_text)
-    
-    print("🚨 Running fraud detection...")
-    fraud_results = fraud_detector.detect_fraud_indicators(document_text)
+    print("\n🔍 Running compliance analysis and fraud detection concurrently...")
+    compliance_results, fraud_results = orchestrator.analyze(document_text)
+    orchestrator.shutdown()
     
     # Generate report
     print("\n📊 Generating PDF report...")
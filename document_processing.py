@@ -1,34 +1,395 @@
+import io
 import os
-import pdfplumber
-from openpyxl import load_workbook
-import docx
-import pandas as pd
+import mmap
+import shutil
+import tempfile
+import threading
+from collections import deque
+from contextlib import ExitStack, contextmanager
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Callable, NamedTuple
 import logging
+from src.chunking import PAGE_BREAK
+from src.metrics import ERRORS, EXTRACTION_SECONDS
+from src.tracing import trace
 
 logger = logging.getLogger(__name__)
 
+# Bytes read from the start of a file to recognize its format
+SNIFF_BYTES = 8
+
+# Files at least this large are memory-mapped for parsers that read through a buffer (PDF, CSV)
+MMAP_MIN_BYTES = 4 * 1024 * 1024
+
+# Rows parsed per batch when a CSV is rendered as text
+CSV_BATCH_ROWS = 10000
+
+# Shared process pools for page-parallel PDF extraction by worker count, created on first use
+_pdf_pools = {}
+_pdf_pools_lock = threading.Lock()
+
+
+def _get_pdf_pool(workers: int):
+    """Return the shared PDF extraction pool for this worker count"""
+    # multiprocessing is only imported by deployments that extract PDFs in parallel
+    from concurrent.futures import ProcessPoolExecutor
+    # A pool is never shut down to resize it: another request may still be submitting page ranges to it
+    with _pdf_pools_lock:
+        pool = _pdf_pools.get(workers)
+        if pool is None:
+            pool = _pdf_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+        return pool
+
+
+def _extract_page(page) -> str:
+    """Extract a single pdfplumber page exactly once and release its cached objects"""
+    text = page.extract_text() or ""
+    if hasattr(page, "close"):
+        page.close()
+    return text
+
+
+def _extract_pdf_range(file_path: str, start: int, stop: int) -> list:
+    """Extract pages [start, stop) of a PDF; runs inside a pool worker process"""
+    import pdfplumber
+    with pdfplumber.open(file_path) as pdf:
+        return [_extract_page(pdf.pages[i]) for i in range(start, stop)]
+
+
+def is_path(source) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+
+def as_source(source):
+    """
+    Normalize a document source for extraction
+
+    Paths are returned unchanged. bytes (wrapped without copying), bytearray and
+    memoryview objects become BytesIO streams; binary file-like objects such as
+    upload spools are used in place, or read into memory if they cannot seek.
+    """
+    if is_path(source):
+        return source
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if not source.seekable():
+        return io.BytesIO(source.read())
+    return source
+
+
+def rewind(source):
+    """Seek a stream source back to its start (parsers read it from the beginning)"""
+    if not is_path(source):
+        source.seek(0)
+    return source
+
+
+def source_size(source) -> int:
+    if is_path(source):
+        return os.path.getsize(source)
+    size = rewind(source).seek(0, os.SEEK_END)
+    rewind(source)
+    return size
+
+
+def _read_head(source, size: int) -> bytes:
+    if is_path(source):
+        with open(source, 'rb') as f:
+            return f.read(size)
+    head = rewind(source).read(size)
+    rewind(source)
+    return head
+
+
+@contextmanager
+def _mapped(source):
+    """A large file on disk as a read-only mmap; anything else unchanged"""
+    if not is_path(source) or os.path.getsize(source) < MMAP_MIN_BYTES:
+        yield rewind(source)
+        return
+    with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        yield mapped
+
+
+@contextmanager
+def _spilled(stream, suffix: str):
+    """Copy a stream to a temp file for consumers that need a path; removed afterwards"""
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        shutil.copyfileobj(rewind(stream), f, 1024 * 1024)
+    try:
+        yield f.name
+    finally:
+        os.remove(f.name)
+
+
+class FormatHandler(NamedTuple):
+    """
+    Text extractor for one document format
+
+    Attributes:
+        name: Format name, e.g. "pdf"
+        extensions: Lower-case file extensions, with the dot
+        extract: Called as extract(source, **limits) -> text, where source is a path or a
+            seekable binary stream positioned at its start; limits are the keyword
+            arguments of DocumentProcessor.extract_text, so extractors should accept **limits.
+            Import heavy dependencies inside it, so they load on first use.
+        magic: Byte prefixes identifying the format regardless of the file name
+    """
+    name: str
+    extensions: tuple
+    extract: Callable
+    magic: tuple = ()
+
+
+_FORMATS = {}
+_EXTENSIONS = {}
+
+# Office Open XML files are zip archives; the first matching member names the format
+_ZIP_MAGIC = b"PK\x03\x04"
+_OOXML_MEMBERS = (("word/document.xml", "docx"), ("xl/workbook.xml", "xlsx"))
+
+
+def register_format(name: str, extensions, extract: Callable, magic=()) -> FormatHandler:
+    """
+    Register (or replace) the extractor for a document format
+
+    Args:
+        name: Format name
+        extensions: File extensions handled, e.g. (".txt", ".text")
+        extract: Function called as extract(source, **limits) returning the text
+        magic: Byte prefixes (at most SNIFF_BYTES long) that identify the format by content
+
+    Returns:
+        The registered handler
+    """
+    handler = FormatHandler(name, tuple(ext.lower() for ext in extensions), extract, tuple(magic))
+    previous = _FORMATS.get(name)
+    if previous:
+        for ext in previous.extensions:
+            _EXTENSIONS.pop(ext, None)
+    _FORMATS[name] = handler
+    for ext in handler.extensions:
+        _EXTENSIONS[ext] = name
+    return handler
+
+
+def sniff_format(source):
+    """Name of the registered format the content of a path or stream identifies, or None"""
+    try:
+        head = _read_head(source, SNIFF_BYTES)
+    except OSError:
+        return None
+    for handler in _FORMATS.values():
+        if any(head.startswith(prefix) for prefix in handler.magic):
+            return handler.name
+    if head.startswith(_ZIP_MAGIC):
+        import zipfile
+        try:
+            with zipfile.ZipFile(rewind(source)) as archive:
+                names = set(archive.namelist())
+        except zipfile.BadZipFile:
+            return None
+        finally:
+            rewind(source)
+        for member, name in _OOXML_MEMBERS:
+            if member in names and name in _FORMATS:
+                return name
+    return None
+
+
+def handler_for(source, name: str = None) -> FormatHandler:
+    """
+    Handler for a document: recognized content wins over the extension, so a PDF
+    saved as .docx (or without an extension) is still read as a PDF
+
+    Args:
+        source: Path, or seekable binary stream (see as_source)
+        name: File name whose extension is used when the content is not recognized;
+            defaults to the path
+
+    Raises:
+        ValueError: If neither the content nor the extension is a registered format
+    """
+    name = name or (os.fspath(source) if is_path(source) else getattr(source, 'name', None))
+    extension = os.path.splitext(name)[1].lower() if isinstance(name, str) else ""
+    format_name = sniff_format(source) or _EXTENSIONS.get(extension)
+    if format_name is None:
+        raise ValueError(f"Unsupported file format: {name or 'unnamed upload'}")
+    return _FORMATS[format_name]
+
+
 class DocumentProcessor:
     @staticmethod
-    def extract_text(file_path: str) -> str:
-        text = ""
-        if file_path.endswith('.pdf'):
-            with pdfplumber.open(file_path) as pdf:
-                text = "\n".join(page.extract_text() for page in pdf.pages if page.extract_text())
-        elif file_path.endswith(('.xlsx', '.xls')):
-            wb = load_workbook(filename=file_path)
-            text = "\n".join(
-                " ".join(str(cell) for cell in row if cell is not None)
-                for sheet in wb.sheetnames
-                for row in wb[sheet].iter_rows(values_only=True)
-            )
-        elif file_path.endswith('.docx'):
-            text = "\n".join(p.text for p in docx.Document(file_path).paragraphs)
-        elif file_path.endswith('.csv'):
-            text = pd.read_csv(file_path).to_string()
-        else:
-            raise ValueError(f"Unsupported file format: {file_path}")
-        logger.info(f"Extracted text (first 500 chars): {repr(text[:500])}")
+    def iter_pdf_pages(source,
+                       max_pages: int = None,
+                       max_chars: int = None,
+                       workers: int = 1,
+                       pages_per_task: int = 25):
+        """
+        Stream the text of a PDF page by page as it is extracted
+
+        Args:
+            source: Path to the PDF file, or a seekable binary stream; large files
+                on disk are memory-mapped
+            max_pages: Stop after this many pages have been read
+            max_chars: Stop once this many characters have been yielded
+            workers: Number of processes to fan page ranges out to (1 = serial)
+            pages_per_task: Number of pages handed to a worker per task
+
+        Yields:
+            Text of each non-empty page, in document order
+        """
+        import pdfplumber
+        with ExitStack() as stack:
+            pdf = stack.enter_context(pdfplumber.open(stack.enter_context(_mapped(source))))
+            page_count = len(pdf.pages)
+            if max_pages:
+                page_count = min(page_count, max_pages)
+
+            if workers > 1 and page_count > pages_per_task:
+                # Worker processes reopen the PDF by path, so a stream is spilled to a temp file first
+                path = source if is_path(source) else stack.enter_context(_spilled(source, ".pdf"))
+                pages = DocumentProcessor._iter_pdf_ranges(path, page_count, workers, pages_per_task)
+            else:
+                pages = (_extract_page(pdf.pages[i]) for i in range(page_count))
+
+            chars = 0
+            try:
+                for text in pages:
+                    if not text:
+                        continue
+                    yield text
+                    chars += len(text)
+                    if max_chars and chars >= max_chars:
+                        logger.info(f"Character budget of {max_chars} reached, stopping PDF extraction early")
+                        return
+            finally:
+                pages.close()
+
+    @staticmethod
+    def _iter_pdf_ranges(file_path: str, page_count: int, workers: int, pages_per_task: int):
+        """Yield page texts in order while keeping at most 2x`workers` page ranges in flight"""
+        pool = _get_pdf_pool(workers)
+        ranges = ((start, min(start + pages_per_task, page_count))
+                  for start in range(0, page_count, pages_per_task))
+        pending = deque(pool.submit(_extract_pdf_range, file_path, start, stop)
+                        for start, stop in islice(ranges, workers * 2))
+        try:
+            while pending:
+                texts = pending.popleft().result()
+                next_range = next(ranges, None)
+                if next_range:
+                    pending.append(pool.submit(_extract_pdf_range, file_path, *next_range))
+                yield from texts
+        finally:
+            # Budget reached or consumer stopped: drop work that has not started yet
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def extract_text(source,
+                     max_pages: int = None,
+                     max_chars: int = None,
+                     workers: int = 1,
+                     pages_per_task: int = 25,
+                     max_rows: int = None,
+                     max_cells: int = None,
+                     name: str = None) -> str:
+        """
+        Extract the text of a document with the handler registered for its format
+
+        Args:
+            source: Path, bytes-like object or binary file-like object (e.g. an upload's
+                spooled stream), so uploads need not be written to disk first
+            max_pages: PDF page budget
+            max_chars: PDF character budget
+            workers: Processes for page-parallel PDF extraction
+            pages_per_task: PDF pages per worker task
+            max_rows: Spreadsheet row budget
+            max_cells: Spreadsheet cell budget
+            name: Original file name, used for the extension when source is not a path
+
+        Returns:
+            Extracted text, or "" when the document has none
+
+        Raises:
+            ValueError: If the format is not registered
+        """
+        source = as_source(source)
+        handler = handler_for(source, name)
+        try:
+            with EXTRACTION_SECONDS.time(format=handler.name):
+                text = handler.extract(
+                    rewind(source),
+                    max_pages=max_pages,
+                    max_chars=max_chars,
+                    workers=workers,
+                    pages_per_task=pages_per_task,
+                    max_rows=max_rows,
+                    max_cells=max_cells
+                )
+        except Exception:
+            ERRORS.inc(stage="extraction")
+            raise
+        trace("extracted_text", text, format=handler.name)
         if not text or not text.strip():
-            logger.warning(f"No text extracted from file: {file_path}")
+            logger.warning(f"No text extracted from file: {name or source}")
             return ""
-        return text
\ No newline at end of file
+        return text
+
+
+def _extract_pdf(source, max_pages: int = None, max_chars: int = None,
+                 workers: int = 1, pages_per_task: int = 25, **limits) -> str:
+    return PAGE_BREAK.join(DocumentProcessor.iter_pdf_pages(
+        source,
+        max_pages=max_pages,
+        max_chars=max_chars,
+        workers=workers,
+        pages_per_task=pages_per_task
+    ))
+
+
+def _extract_spreadsheet(source, max_rows: int = None, max_cells: int = None, **limits) -> str:
+    from src.spreadsheet_reader import SpreadsheetReader
+    # Rows are streamed lazily; sheets are separated like PDF pages
+    rows = SpreadsheetReader(max_rows=max_rows, max_cells=max_cells).iter_rows(source)
+    return PAGE_BREAK.join(
+        "\n".join(" ".join(str(cell) for cell in row if cell is not None) for _, row in sheet_rows)
+        for _, sheet_rows in groupby(rows, key=itemgetter(0))
+    )
+
+
+def _extract_docx(source, **limits) -> str:
+    import docx
+    return "\n".join(p.text for p in docx.Document(source).paragraphs)
+
+
+def _extract_csv(source, max_rows: int = None, max_cells: int = None, **limits) -> str:
+    import pandas as pd
+    # Read as text in batches and rendered like spreadsheet rows, under the same row and cell caps;
+    # the tabular checks work on the full table, so the model only needs a bounded text form
+    batches = pd.read_csv(source, dtype=str, keep_default_na=False, nrows=max_rows, chunksize=CSV_BATCH_ROWS,
+                          memory_map=is_path(source) and source_size(source) >= MMAP_MIN_BYTES)
+    lines = []
+    cells = 0
+    with batches:
+        for batch in batches:
+            if not lines:
+                lines.append(" ".join(str(column) for column in batch.columns))
+            for row in batch.itertuples(index=False, name=None):
+                if max_cells and cells >= max_cells:
+                    logger.info(f"Cell cap of {max_cells} reached, stopping CSV read early")
+                    return "\n".join(lines)
+                values = [value for value in row if value]
+                cells += len(values)
+                lines.append(" ".join(values))
+    return "\n".join(lines)
+
+
+register_format("pdf", (".pdf",), _extract_pdf, magic=(b"%PDF-",))
+register_format("xlsx", (".xlsx",), _extract_spreadsheet)
+# No magic for .xls: its OLE2 header is shared with .doc, .msg and other legacy Office files
+register_format("xls", (".xls",), _extract_spreadsheet)
+register_format("docx", (".docx",), _extract_docx)
+register_format("csv", (".csv",), _extract_csv)
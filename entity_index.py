@@ -0,0 +1,328 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import NamedTuple
+from src.findings import Finding
+from src.pii import PIIScanner, mask
+
+logger = logging.getLogger(__name__)
+
+# Kinds of indexed values, stored as small integers
+INVOICE = 1
+INVOICE_AMOUNT = 2
+ACCOUNT = 3
+ACCOUNT_VENDOR = 4
+VENDOR_AMOUNT = 5
+
+# PII types indexed as payee accounts
+ACCOUNT_TYPES = frozenset({"iban", "account"})
+
+# "Invoice no. 4521", "Bill #A-778" or a bare "INV-2024-0042"; values must contain a digit
+_INVOICE = re.compile(
+    r"\b(?:invoice|bill)\b[ \t]*(?:no\.?|number|num|#)?[ \t:#.]*"
+    r"(?P<value>(?!INV[-/ ]?\d)[A-Z0-9][A-Z0-9/\-]{2,30})\b"
+    r"|\b(?P<bare>INV[-/ ]?\d(?:[A-Z0-9/\-]| (?=\d)){0,28})\b",
+    re.IGNORECASE
+)
+# Currency amounts with a symbol or code: "$9,950.00", "1,234.50 EUR"
+_AMOUNT = re.compile(
+    r"[$€£][ \t]?(?P<symbol>\d{1,3}(?:,\d{3})+(?:\.\d{2})?|\d+(?:\.\d{2})?)\b"
+    r"|\b(?P<code>\d{1,3}(?:,\d{3})+(?:\.\d{2})?|\d+\.\d{2})[ \t]?(?:USD|EUR|GBP|CHF|CAD)\b"
+)
+_VENDOR = re.compile(
+    r"\b(?:vendor|supplier|payee|beneficiary|billed? from|remit to|pay to)(?:[ \t]+name)?[ \t]*:[ \t]*"
+    r"(?P<value>[^\n,;:]{2,60})",
+    re.IGNORECASE
+)
+_LEGAL_SUFFIX = re.compile(r"\b(?:inc|incorporated|ltd|limited|llc|llp|corp|corporation|co|company|gmbh|plc|sa|ag|bv)\b")
+_NON_WORD = re.compile(r"[^\w]+")
+_SEPARATORS = re.compile(r"[\s/\-]+")
+
+
+class Entity(NamedTuple):
+    """One value extracted from a document, with where it was found"""
+    kind: int
+    value: str
+    display: str
+    start: int = None
+    end: int = None
+
+
+def normalize_vendor(name: str) -> str:
+    """Comparable vendor name: lowercase words without punctuation or legal form ("ACME Corp." -> "acme")"""
+    words = _NON_WORD.sub(" ", name.lower())
+    return " ".join(_LEGAL_SUFFIX.sub(" ", words).split())
+
+
+def extract_entities(document_text: str, scanner: PIIScanner = None, limit: int = 200, accounts=None) -> list:
+    """
+    Invoice numbers, payee accounts and their combinations with the vendor and document total
+
+    Amounts alone repeat too often across unrelated documents to index, so the
+    largest amount (the invoice or statement total) is only indexed together
+    with an invoice number or vendor.
+
+    Args:
+        document_text: Text of the document
+        scanner: PIIScanner finding the accounts, unless `accounts` is given
+        limit: Maximum number of entities returned
+        accounts: IBAN and account PIIMatches of the text from an earlier scan
+    """
+    invoices = {}
+    for match in _INVOICE.finditer(document_text):
+        group = "value" if match.group("value") else "bare"
+        value = _SEPARATORS.sub("", match.group(group)).upper()
+        if any(char.isdigit() for char in value):
+            invoices.setdefault(value, (match.group(group), match.span(group)))
+    vendors = {}
+    for match in _VENDOR.finditer(document_text):
+        value = normalize_vendor(match.group("value"))
+        if value:
+            vendors.setdefault(value, match)
+    if accounts is None:
+        accounts = (scanner or PIIScanner(types=ACCOUNT_TYPES)).scan(document_text)
+    by_value = {}
+    for match in accounts:
+        by_value.setdefault(_SEPARATORS.sub("", match.value).upper(), match)
+    amounts = [(float((match.group("symbol") or match.group("code")).replace(",", "")), match)
+               for match in _AMOUNT.finditer(document_text)]
+    total = max(amounts, key=lambda amount: amount[0]) if amounts else None
+
+    entities = []
+    for value, (display, span) in invoices.items():
+        entities.append(Entity(INVOICE, value, display, *span))
+        if total:
+            entities.append(Entity(INVOICE_AMOUNT, f"{value}|{total[0]:.2f}", total[1].group(0).strip(), *span))
+    for value, match in by_value.items():
+        entities.append(Entity(ACCOUNT, value, mask(match.value), match.start, match.end))
+        for vendor in vendors:
+            entities.append(Entity(ACCOUNT_VENDOR, f"{value}|{vendor}", mask(match.value), match.start, match.end))
+    if total:
+        for vendor, match in vendors.items():
+            entities.append(Entity(VENDOR_AMOUNT, f"{vendor}|{total[0]:.2f}", match.group("value").strip(),
+                                   *match.span("value")))
+    return entities[:limit]
+
+
+class EntityIndex:
+    def __init__(self, path: str = "cache/entities.sqlite3",
+                 retention_days: float = 730,
+                 max_documents: int = 10_000_000,
+                 cache_mb: float = 16,
+                 max_entities: int = 200,
+                 prune_every: int = 1000):
+        """
+        Persistent cross-document index of invoice numbers, payee accounts, vendors and amounts
+
+        Each analyzed document adds its entities (see extract_entities) and a
+        fingerprint of its text. Lookups go through B-tree indexes, so checking
+        a document costs O(log n) per entity however many documents are indexed,
+        and memory stays at the SQLite page cache; the index itself lives on disk.
+        Values are stored as salted 64-bit hashes, never in clear.
+
+        Args:
+            path: SQLite database file; shared by all worker processes
+            retention_days: Documents older than this are dropped from the index
+            max_documents: Oldest documents are dropped above this count
+            cache_mb: SQLite page cache per connection
+            max_entities: Entities indexed per document
+            prune_every: Documents recorded between retention passes
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.retention_seconds = retention_days * 86400
+        self.max_documents = max_documents
+        self.max_entities = max_entities
+        self.prune_every = prune_every
+        self._scanner = PIIScanner(types=ACCOUNT_TYPES)
+        self._recorded = 0
+        self._lock = threading.Lock()
+        # Transactions are managed explicitly: a check and the record that follows it are one unit
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA cache_size=-{int(cache_mb * 1024)}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " id INTEGER PRIMARY KEY,"
+            " fingerprint INTEGER NOT NULL,"
+            " analyzed_at REAL NOT NULL,"
+            " lineage INTEGER)"
+        )
+        if "lineage" not in {row[1] for row in self._conn.execute("PRAGMA table_info(documents)")}:
+            # Indexes created before versions were tracked
+            self._conn.execute("ALTER TABLE documents ADD COLUMN lineage INTEGER")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_fingerprint ON documents (fingerprint)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_analyzed ON documents (analyzed_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entities ("
+            " kind INTEGER NOT NULL,"
+            " key INTEGER NOT NULL,"
+            " document INTEGER NOT NULL,"
+            " PRIMARY KEY (kind, key, document)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entities_document ON entities (document)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value BLOB NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('salt', ?)", (os.urandom(16),))
+        self._salt = self._conn.execute("SELECT value FROM meta WHERE name = 'salt'").fetchone()[0]
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """Build the index from the `entity_index` section of config.yaml, or None if disabled"""
+        settings = (config or {}).get('entity_index', {})
+        if not settings.get('enabled', False):
+            return None
+        return cls(path=settings.get('path', "cache/entities.sqlite3"),
+                   retention_days=settings.get('retention_days', 730),
+                   max_documents=settings.get('max_documents', 10_000_000),
+                   cache_mb=settings.get('cache_mb', 16),
+                   max_entities=settings.get('max_entities', 200))
+
+    def _hash(self, kind: int, value: str) -> int:
+        digest = hashlib.blake2b(f"{kind}:{value}".encode("utf-8"), digest_size=8, key=self._salt).digest()
+        return int.from_bytes(digest, "big", signed=True)
+
+    def check_and_record(self, document_text: str, accounts=None, document_id: str = None) -> list:
+        """
+        "Seen before" fraud findings for a document, then add it to the index
+
+        Earlier copies of the identical text are reported once, as a duplicate
+        submission, and are not counted again for each of their entities.
+
+        Args:
+            document_text: Text of the document
+            accounts: IBAN and account PIIMatches of the text, if already scanned
+            document_id: Client-supplied id shared by the versions of one document;
+                earlier versions are not reported (an amended invoice repeats its number)
+
+        Returns:
+            Findings with source "index", strongest first
+        """
+        fingerprint = self._hash(0, " ".join(document_text.lower().split()))
+        lineage = self._hash(0, f"document:{document_id}") if document_id else None
+        entities = extract_entities(document_text, self._scanner, self.max_entities, accounts)
+        keys = [self._hash(entity.kind, entity.value) for entity in entities]
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Versions of the same document (same lineage) are not "other" documents
+                copies = self._conn.execute(
+                    "SELECT COUNT(*), MIN(analyzed_at) FROM documents"
+                    " WHERE fingerprint = ? AND (? IS NULL OR lineage IS NOT ?)", (fingerprint, lineage, lineage)
+                ).fetchone()
+                indexed = copies[0] or self._conn.execute(
+                    "SELECT 1 FROM documents WHERE fingerprint = ? LIMIT 1", (fingerprint,)).fetchone()
+                seen = {}
+                for entity, key in zip(entities, keys):
+                    rows = self._conn.execute(
+                        "SELECT d.analyzed_at FROM entities e JOIN documents d ON d.id = e.document"
+                        " WHERE e.kind = ? AND e.key = ? AND d.fingerprint != ? AND (? IS NULL OR d.lineage IS NOT ?)"
+                        " ORDER BY e.document LIMIT 100",
+                        (entity.kind, key, fingerprint, lineage, lineage)
+                    ).fetchall()
+                    if rows:
+                        seen[entity] = (len(rows), rows[0][0])
+                cursor = self._conn.execute(
+                    "INSERT INTO documents (fingerprint, analyzed_at, lineage) VALUES (?, ?, ?)",
+                    (fingerprint, now, lineage))
+                if not indexed:
+                    # Copies of a known text add nothing new; their entities are already indexed
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO entities (kind, key, document) VALUES (?, ?, ?)",
+                        {(entity.kind, key, cursor.lastrowid) for entity, key in zip(entities, keys)}
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._recorded += 1
+            if self._recorded % self.prune_every == 0:
+                self._prune(now)
+        return self._findings(copies, entities, seen)
+
+    @staticmethod
+    def _findings(copies: tuple, entities: list, seen: dict) -> list:
+        def when(timestamp):
+            return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+        def earlier(count):
+            return f"{count}{'+' if count >= 100 else ''} earlier document{'s' if count > 1 else ''}"
+
+        findings = []
+        if copies[0]:
+            findings.append(Finding(
+                message=f"Identical document content was already analyzed {copies[0]} "
+                        f"time{'s' if copies[0] > 1 else ''}, first on {when(copies[1])}",
+                severity="medium", analyzer="fraud", source="index", regulation="Duplicate submission",
+                confidence=1.0))
+        repeated = {entity.value.split("|")[0] for entity in seen if entity.kind == INVOICE_AMOUNT}
+        vendors = {entity.value.split("|")[1] for entity in entities if entity.kind == ACCOUNT_VENDOR}
+        known_pairs = {entity.value.split("|")[0] for entity in seen if entity.kind == ACCOUNT_VENDOR}
+        invoice_seen = False
+        for entity, (count, first) in seen.items():
+            if entity.kind == INVOICE:
+                invoice_seen = True
+                if entity.value in repeated:
+                    message = (f"Invoice {entity.display} was already submitted with the same total in "
+                               f"{earlier(count)}, first on {when(first)}")
+                    severity = "high"
+                else:
+                    message = (f"Invoice number {entity.display} already appeared in {earlier(count)} "
+                               f"with a different total, first on {when(first)}")
+                    severity = "medium"
+                regulation = "Duplicate invoice"
+            elif entity.kind == ACCOUNT and vendors and entity.value not in known_pairs:
+                message = (f"Payee account {entity.display} was already used in {earlier(count)} that did not "
+                           f"name this vendor, first on {when(first)}")
+                severity, regulation = "high", "Beneficiary account reuse"
+            else:
+                continue
+            findings.append(Finding(message=message, severity=severity, analyzer="fraud", source="index",
+                                    regulation=regulation, evidence=entity.display, start=entity.start,
+                                    end=entity.end, confidence=1.0))
+        if not invoice_seen:
+            # Same vendor and total without a matching invoice number: a possible re-billed payment
+            for entity, (count, first) in seen.items():
+                if entity.kind == VENDOR_AMOUNT:
+                    findings.append(Finding(
+                        message=f"{entity.display} billed the same total in {earlier(count)}, first on {when(first)}",
+                        severity="low", analyzer="fraud", source="index", regulation="Duplicate payment",
+                        evidence=entity.display, start=entity.start, end=entity.end, confidence=1.0))
+        return findings
+
+    def _prune(self, now: float):
+        """Drop documents past retention_days or beyond max_documents, with their entities"""
+        cutoff = self._conn.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM documents WHERE analyzed_at < ?", (now - self.retention_seconds,)
+        ).fetchone()[0]
+        overflow = self._conn.execute(
+            "SELECT id FROM documents ORDER BY id DESC LIMIT 1 OFFSET ?", (self.max_documents,)
+        ).fetchone()
+        cutoff = max(cutoff, overflow[0] if overflow else 0)
+        if not cutoff:
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("DELETE FROM entities WHERE document <= ?", (cutoff,))
+            removed = self._conn.execute("DELETE FROM documents WHERE id <= ?", (cutoff,)).rowcount
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Entity index dropped {removed} documents past retention")
+
+    def stats(self) -> dict:
+        with self._lock:
+            documents = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        return {"documents": documents}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+GraniteGuard AI - Local fake watsonx.ai server
+IBM TechXchange Dev Day Hackathon Project
+
+Serves the IAM token, text generation and streaming text generation
+endpoints used by WatsonxBackend,
+with injectable latency and errors, so retries, rate limiting and circuit
+breaking can be exercised without IBM Cloud credentials.
+
+Usage:
+    python fake_watsonx.py --port 8099 --latency 0.2 --jitter 0.1 --error-rate 0.1 --error-status 429 --token-delay 0.02
+
+Then point config.yaml at it:
+    watsonx:
+      url: "http://127.0.0.1:8099"
+      iam_url: "http://127.0.0.1:8099/identity/token"
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from src.generation import estimate_tokens, stream_pieces, DEFAULT_CHARS_PER_TOKEN
+
+
+class FakeWatsonxServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 response: str = "NO COMPLIANCE ISSUES FOUND",
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 slow_rate: float = 0.0,
+                 slow_latency: float = 0.0,
+                 error_rate: float = 0.0,
+                 error_status: int = 503,
+                 retry_after: float = None,
+                 token_delay: float = 0.0,
+                 responder=None,
+                 seed: int = None):
+        """
+        Threaded HTTP server imitating watsonx.ai
+
+        Args:
+            host: Interface to bind
+            port: Port to bind; 0 picks a free one (see .url)
+            response: generated_text returned by every successful call
+            latency: Seconds added to every generation call
+            jitter: Up to this many extra seconds, uniformly distributed, added to each call
+            slow_rate: Fraction of calls that take slow_latency instead (tail latency)
+            slow_latency: Latency of the slow calls
+            error_rate: Fraction of calls failing with error_status
+            error_status: HTTP status of injected errors
+            retry_after: Retry-After header (seconds) sent with injected errors
+            token_delay: Seconds between the pieces of a streamed reply
+            responder: Optional function(prompt, parameters) -> generated_text
+            seed: Seed for the random error/latency injection
+        """
+        self.response = response
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.token_delay = token_delay
+        self.responder = responder
+        self.requests = 0
+        self.token_requests = 0
+        self._scripted = deque()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def config(self, **watsonx) -> dict:
+        """watsonx config section pointing at this server"""
+        return dict({"url": self.url, "iam_url": f"{self.url}/identity/token",
+                     "api_key": "fake-key", "project_id": "fake-project"}, **watsonx)
+
+    def fail_next(self, count: int, status: int = None, retry_after: float = None):
+        """Fail the next `count` generation calls, regardless of error_rate"""
+        with self._lock:
+            self._scripted.extend([(status or self.error_status, retry_after)] * count)
+
+    def start(self) -> "FakeWatsonxServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _plan(self):
+        """(latency, error status, retry_after) for the next generation call"""
+        with self._lock:
+            self.requests += 1
+            latency = self.slow_latency if self.slow_rate and self._rng.random() < self.slow_rate else self.latency
+            if self.jitter:
+                latency += self._rng.uniform(0, self.jitter)
+            if self._scripted:
+                status, retry_after = self._scripted.popleft()
+                return latency, status, retry_after
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return latency, self.error_status, self.retry_after
+            return latency, None, None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if self.path.startswith("/identity/token"):
+                    with server._lock:
+                        server.token_requests += 1
+                    return self._reply(200, {"access_token": "fake-token", "expires_in": 3600})
+                if not self.path.startswith("/ml/v1/text/generation"):
+                    return self._reply(404, {"errors": [{"message": "not found"}]})
+
+                latency, status, retry_after = server._plan()
+                if latency:
+                    time.sleep(latency)
+                if status:
+                    headers = {"Retry-After": str(retry_after)} if retry_after is not None else {}
+                    return self._reply(status, {"errors": [{"message": "injected failure"}]}, headers)
+                request = json.loads(body or b"{}")
+                text = (server.responder(request.get("input", ""), request.get("parameters", {}))
+                        if server.responder else server.response)
+                # Token counts are estimates; truncation honors max_new_tokens like the real service
+                max_new_tokens = request.get("parameters", {}).get("max_new_tokens")
+                generated = estimate_tokens(text)
+                stop_reason = "eos_token"
+                if max_new_tokens and generated > max_new_tokens:
+                    text = text[:int(max_new_tokens * DEFAULT_CHARS_PER_TOKEN)]
+                    generated, stop_reason = max_new_tokens, "max_tokens"
+                input_tokens = estimate_tokens(request.get("input", ""))
+                if self.path.startswith("/ml/v1/text/generation_stream"):
+                    return self._stream(request.get("model_id"), text, input_tokens, stop_reason)
+                self._reply(200, {"model_id": request.get("model_id"),
+                                  "results": [{"generated_text": text,
+                                               "generated_token_count": generated,
+                                               "input_token_count": input_tokens,
+                                               "stop_reason": stop_reason}]})
+
+            def _stream(self, model_id: str, text: str, input_tokens: int, stop_reason: str):
+                """Server-sent events, one per piece, sent as HTTP chunks like the real service"""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                pieces = stream_pieces(text) or [""]
+                generated = 0
+                for index, piece in enumerate(pieces):
+                    if index and server.token_delay:
+                        time.sleep(server.token_delay)
+                    generated += estimate_tokens(piece)
+                    result = {"generated_text": piece, "generated_token_count": generated,
+                              "input_token_count": input_tokens,
+                              "stop_reason": stop_reason if index == len(pieces) - 1 else "not_finished"}
+                    event = json.dumps({"model_id": model_id, "results": [result]})
+                    data = f"id: {index + 1}\nevent: message\ndata: {event}\n\n".encode("utf-8")
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _reply(self, status: int, payload: dict, headers: dict = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake watsonx.ai server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--response", default="NO COMPLIANCE ISSUES FOUND")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per generation call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Max extra random seconds per call")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of calls that are slow")
+    parser.add_argument("--slow-latency", type=float, default=0.0, help="Seconds per slow call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with errors")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed pieces")
+    args = parser.parse_args()
+
+    server = FakeWatsonxServer(args.host, args.port, args.response, args.latency, args.jitter, args.slow_rate,
+                               args.slow_latency, args.error_rate, args.error_status, args.retry_after,
+                               args.token_delay)
+    print(f"Fake watsonx.ai listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
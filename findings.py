@@ -0,0 +1,327 @@
+import re
+import json
+import bisect
+import logging
+from dataclasses import dataclass, fields
+from src.chunking import PAGE_BREAK
+from src.rules import SEVERITIES
+
+logger = logging.getLogger(__name__)
+
+SOURCES = ("model", "rules", "tabular", "pii", "index")
+ANALYZERS = ("compliance", "fraud")
+
+# Model output lines look like: FINDING | HIGH | GDPR | "quoted text" | explanation | 0.8
+_LINE_PREFIX = re.compile(r"^\s*(?:[-*•]+|\d+[.)])?\s*(?:\**finding\**\s*[:|]?\s*)?", re.IGNORECASE)
+_SEVERITY_WORD = re.compile(r"\b(high|medium|moderate|low)\b", re.IGNORECASE)
+_SEVERITY_LABEL = re.compile(r"\s*(HIGH|MEDIUM|LOW) RISK\b\s*:?\s*", re.IGNORECASE)
+_CONFIDENCE = re.compile(r"^(?:confidence\s*[:=]?\s*)?(\d*\.?\d+)\s*(%?)$", re.IGNORECASE)
+_QUOTES = "\"'“”‘’*` "
+_WHITESPACE = re.compile(r"\s+")
+_HEADER_WORDS = {"finding", "severity", "risk", "regulation", "law", "type", "evidence", "quote",
+                 "explanation", "description", "confidence"}
+
+
+@dataclass(slots=True)
+class Finding:
+    """
+    One compliance issue or fraud indicator
+
+    Attributes:
+        message: Explanation of the issue
+        severity: "high", "medium" or "low"
+        analyzer: "compliance" or "fraud"
+        source: "model", "rules", "tabular", "pii" or "index"
+        regulation: Regulation or law (compliance) or fraud scheme (fraud), if named
+        evidence: Short quote from the document supporting the finding
+        start: Character offset of the evidence in the document text
+        end: End offset of the evidence in the document text
+        chunk: Index of the chunk the finding came from
+        page: 1-based page of the evidence (documents with page breaks only)
+        confidence: Model-reported confidence between 0 and 1
+    """
+    message: str
+    severity: str = "medium"
+    analyzer: str = "compliance"
+    source: str = "model"
+    regulation: str = None
+    evidence: str = None
+    start: int = None
+    end: int = None
+    chunk: int = None
+    page: int = None
+    confidence: float = None
+
+    def __str__(self) -> str:
+        """Display form, in the "SEVERITY RISK: ..." style used throughout the UI and reports"""
+        text = f"{self.severity.upper()} RISK: "
+        if self.regulation:
+            text += f"{self.regulation} - "
+        text += self.message
+        if self.evidence:
+            text += f' (Evidence: "{self.evidence}")'
+        return text
+
+    def to_dict(self) -> dict:
+        """JSON-ready dict; unset fields are omitted to keep serialized findings small"""
+        return {name: value for name in FIELDS if (value := getattr(self, name)) is not None}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Finding":
+        return cls(**{name: data[name] for name in FIELDS if name in data})
+
+    @classmethod
+    def from_rule(cls, rule_finding: dict) -> "Finding":
+        """Convert a RuleEngine.scan finding; the span points at the first matched term"""
+        evidence = rule_finding.get('evidence') or [{}]
+        return cls(message=rule_finding['message'],
+                   severity=rule_finding['severity'],
+                   analyzer=rule_finding['analyzer'],
+                   source="rules",
+                   start=evidence[0].get('start'),
+                   end=evidence[0].get('end'),
+                   confidence=1.0)
+
+    @classmethod
+    def from_tabular(cls, tabular_finding: dict) -> "Finding":
+        """Convert a TabularFraudAnalyzer finding"""
+        return cls(message=tabular_finding['message'],
+                   severity=tabular_finding['severity'],
+                   analyzer="fraud",
+                   source="tabular",
+                   confidence=1.0)
+
+
+FIELDS = tuple(f.name for f in fields(Finding))
+
+
+def parse_model_findings(response: str, analyzer: str, chunk=None, clean_markers=()) -> list:
+    """
+    Parse a model response into findings, tolerating loose formatting
+
+    Lines in the requested "FINDING | severity | regulation | quote | explanation | confidence"
+    format become one finding each; bullets, numbering, missing fields and
+    extra whitespace are accepted. A response with no such lines is kept as a
+    single free-text finding, as before structured output was requested.
+
+    Args:
+        response: Raw model output
+        analyzer: "compliance" or "fraud"
+        chunk: Chunk the response was generated for, used to locate evidence spans
+        clean_markers: Upper-case replies that mean "nothing found"
+
+    Returns:
+        List of findings, [] for a "nothing found" reply, or None for an empty response
+    """
+    if not response or not response.strip():
+        return None
+    findings = []
+    for line in response.splitlines():
+        if "|" not in line:
+            continue
+        finding = _parse_line(line, analyzer, chunk)
+        if finding is not None:
+            findings.append(finding)
+    if findings:
+        return findings
+
+    text = response.strip()
+    if text.rstrip(".").upper() in clean_markers:
+        return []
+    severity = "medium"
+    label = _SEVERITY_LABEL.match(text)
+    if label:
+        severity = label.group(1).lower()
+        text = text[label.end():]
+    return [Finding(message=text, severity=severity, analyzer=analyzer,
+                    chunk=chunk.index if chunk is not None else None)]
+
+
+class FindingStream:
+    def __init__(self, analyzer: str, chunk=None, on_finding=None, transform=None):
+        """
+        Incremental parser for streamed model output
+
+        Pass `feed` as the on_text callback of a streaming model call: every
+        "FINDING | ..." line is parsed as soon as its newline arrives and handed
+        to on_finding. The complete reply is still parsed by parse_model_findings
+        afterwards; streamed findings are previews of it.
+
+        Args:
+            analyzer: "compliance" or "fraud"
+            chunk: Chunk being analyzed, used to locate evidence spans
+            on_finding: Called with each Finding as its line completes
+            transform: Optional function applied to each complete line before parsing
+        """
+        self.analyzer = analyzer
+        self.chunk = chunk
+        self.on_finding = on_finding
+        self.transform = transform
+        self._pending = ""
+
+    def feed(self, text: str):
+        *lines, self._pending = (self._pending + text).split("\n")
+        for line in lines:
+            self._emit(line)
+
+    def close(self):
+        """Parse the last line, which has no trailing newline"""
+        line, self._pending = self._pending, ""
+        self._emit(line)
+
+    def _emit(self, line: str):
+        if self.transform:
+            line = self.transform(line)
+        finding = _parse_line(line, self.analyzer, self.chunk) if "|" in line else None
+        if finding is not None and self.on_finding:
+            self.on_finding(finding)
+
+
+def _parse_line(line: str, analyzer: str, chunk):
+    fields_ = [field.strip(_QUOTES) for field in _LINE_PREFIX.sub("", line).split("|")]
+    # Markdown table rules ("|---|:--|") leave fields of dashes and colons
+    fields_ = [field for field in fields_ if field.strip("-: ")]
+    if not fields_ or all(field.lower() in _HEADER_WORDS for field in fields_):
+        return None
+
+    severity = "medium"
+    for i, field in enumerate(fields_[:2]):
+        match = _SEVERITY_WORD.match(field) if len(field) < 20 else None
+        if match:
+            severity = "medium" if match.group(1).lower() == "moderate" else match.group(1).lower()
+            del fields_[i]
+            break
+
+    confidence = None
+    if len(fields_) > 1:
+        match = _CONFIDENCE.match(fields_[-1])
+        if match:
+            value = float(match.group(1)) / (100 if match.group(2) or float(match.group(1)) > 1 else 1)
+            if 0 <= value <= 1:
+                confidence = value
+                fields_.pop()
+
+    # Remaining fields, in order: regulation, evidence, explanation (trailing fields optional)
+    if not fields_:
+        return None
+    if len(fields_) == 1:
+        regulation, evidence, message = None, None, fields_[0]
+    elif len(fields_) == 2:
+        regulation, evidence, message = fields_[0], None, fields_[1]
+    else:
+        regulation, evidence, message = fields_[0], fields_[1], " | ".join(fields_[2:])
+    if regulation and regulation.strip().lower() in ("n/a", "none", "-", "unknown"):
+        regulation = None
+
+    finding = Finding(message=message, severity=severity, analyzer=analyzer, regulation=regulation,
+                      evidence=evidence, confidence=confidence,
+                      chunk=chunk.index if chunk is not None else None)
+    if evidence and chunk is not None:
+        _locate(finding, chunk)
+    return finding
+
+
+def _locate(finding: Finding, chunk):
+    """Set the document-level span of the evidence quote if it appears in the chunk"""
+    index = chunk.text.find(finding.evidence)
+    if index < 0:
+        # Models often change case and whitespace when quoting
+        pattern = r"\s+".join(re.escape(word) for word in finding.evidence.split())
+        match = re.search(pattern, chunk.text, re.IGNORECASE) if pattern else None
+        if match is None:
+            return
+        index, length = match.start(), match.end() - match.start()
+    else:
+        length = len(finding.evidence)
+    finding.start = chunk.offset + index
+    finding.end = finding.start + length
+
+
+def assign_pages(findings: list, document_text: str) -> list:
+    """Fill in the page of every finding with a span, for documents with page breaks"""
+    if PAGE_BREAK not in document_text:
+        return findings
+    breaks = [match.start() for match in re.finditer(re.escape(PAGE_BREAK), document_text)]
+    for finding in findings:
+        if finding.start is not None:
+            finding.page = bisect.bisect_right(breaks, finding.start) + 1
+    return findings
+
+
+def dedupe_findings(findings: list) -> list:
+    """
+    Drop repeats of an earlier finding, such as the same quote reported from two overlapping chunks
+
+    A finding repeats another when it has the same regulation, message and
+    evidence and its span overlaps the other's (or either span is unknown). The
+    same generic message quoting different text, or the same quote at another
+    place in the document, is a separate finding and is kept.
+    """
+    merged = []
+    spans = {}
+    for finding in findings:
+        key = (finding.analyzer,
+               _WHITESPACE.sub(" ", finding.regulation or "").strip().lower(),
+               _WHITESPACE.sub(" ", finding.message).strip().lower(),
+               _WHITESPACE.sub(" ", finding.evidence or "").strip().lower())
+        kept = spans.setdefault(key, [])
+        if any(_overlaps(finding, other) for other in kept):
+            continue
+        kept.append(finding)
+        merged.append(finding)
+    return merged
+
+
+def _overlaps(finding: Finding, other: Finding) -> bool:
+    if finding.start is None or other.start is None:
+        return True
+    return finding.start < other.end and other.start < finding.end
+
+
+def findings_to_json(findings: list) -> str:
+    """Compact JSON array of findings"""
+    return json.dumps([finding.to_dict() for finding in findings], separators=(",", ":"), ensure_ascii=False)
+
+
+def findings_from_json(data: str) -> list:
+    return [Finding.from_dict(item) for item in json.loads(data)]
+
+
+def findings_to_columns(findings, columns: dict = None) -> dict:
+    """
+    Columnar form: one list per field, so field names are not repeated per finding
+
+    Accepts Finding objects or their dicts, which lets bulk results be
+    converted without building an object per finding. Pass `columns` to
+    append to the lists of an earlier call.
+    """
+    columns = columns if columns is not None else {name: [] for name in FIELDS}
+    for finding in findings:
+        if isinstance(finding, Finding):
+            for name in FIELDS:
+                columns[name].append(getattr(finding, name))
+        else:
+            for name in FIELDS:
+                columns[name].append(finding.get(name))
+    return columns
+
+
+def findings_frame(findings) -> "pd.DataFrame":
+    """
+    Findings as a DataFrame with categorical columns
+
+    Severity is an ordered categorical (high < medium < low), so sorting and
+    grouping millions of findings works on small integer codes.
+    """
+    # Imported here so the analyzers and web app load without pandas
+    import pandas as pd
+    columns = findings if isinstance(findings, dict) else findings_to_columns(findings)
+    df = pd.DataFrame(columns, columns=list(FIELDS))
+    df['severity'] = pd.Categorical(df['severity'], categories=SEVERITIES, ordered=True)
+    df['analyzer'] = pd.Categorical(df['analyzer'], categories=ANALYZERS)
+    df['source'] = pd.Categorical(df['source'], categories=SOURCES)
+    df['regulation'] = df['regulation'].astype('category')
+    for name in ('start', 'end', 'chunk', 'page'):
+        df[name] = df[name].astype('Int64')
+    df['confidence'] = df['confidence'].astype('Float32')
+    return df
@@ -1,26 +1,69 @@
-from ibm_watson_machine_learning.foundation_models import Model
 import yaml
 import logging
-from datetime import datetime
+from src.chunking import TextChunker
+from src.chunk_analysis import ChunkedAnalysis
+from src.generation import GenerationProfile, TokenBudget
+from src.findings import Finding, dedupe_findings, assign_pages
+from src.model_client import get_model_client
+from src.rules import RuleEngine
+from src.semantic_cache import get_semantic_cache
+from src.pii import PIIScanner
+from src.entity_index import EntityIndex, ACCOUNT_TYPES
 
 logger = logging.getLogger(__name__)
 
+NO_INDICATORS_FOUND = "✅ No fraud indicators found in this document."
+CLEAN_REPLIES = ("NO FRAUD INDICATORS FOUND", "NO FRAUD INDICATORS DETECTED", "NO ISSUES DETECTED")
+
 class FraudDetector:
-    def __init__(self, config_path: str = "config/config.yaml"):
-        """Initialize IBM Granite-powered fraud detector"""
+    # Bump whenever the prompt or response post-processing changes; part of the result cache key
+    PROMPT_VERSION = "3"
+
+    def __init__(self, config_path: str = "config/config.yaml", config: dict = None,
+                 model_client=None, rule_engine=None, semantic_cache=None, pii_scanner=None,
+                 entity_index=None):
+        """
+        Initialize IBM Granite-powered fraud detector
+
+        Args:
+            config_path: Path to config.yaml, read only when `config` is not given
+            config: Already parsed configuration
+            model_client: Shared model client; defaults to the pooled client for model.model_id
+            rule_engine: Shared pre-screening RuleEngine; defaults to one built from `prescreen`
+            semantic_cache: Shared SemanticCache for near-duplicate chunks; defaults to the
+                process-wide one configured under `semantic_cache` (None when disabled)
+            pii_scanner: PIIScanner redacting personal data from prompts; defaults to one built
+                from `pii` (None when disabled)
+            entity_index: EntityIndex adding "seen before" indicators across documents; defaults
+                to one built from `entity_index` (None when disabled)
+        """
         try:
-            with open(config_path) as f:
-                self.config = yaml.safe_load(f)
-            
-            # Initialize IBM Granite model
-            self.model = Model(
-                model_id=self.config['model']['model_id'],
-                credentials={
-                    "url": self.config['watsonx']['url'],
-                    "apikey": self.config['watsonx']['api_key']
-                },
-                project_id=self.config['watsonx']['project_id']
-            )
+            if config is None:
+                with open(config_path) as f:
+                    config = yaml.safe_load(f)
+            self.config = config
+            
+            # Shared IBM Granite client (one authenticated session per model_id)
+            self.model = model_client or get_model_client(self.config)
+            
+            # Named generation parameters; chunks are capped so prompt plus answer fit the context window
+            self.profile = GenerationProfile.from_config(self.config, 'fraud')
+            self.budget = TokenBudget.from_config(self.config)
+            self.chunker = TextChunker.from_config(
+                self.config, max_chars=self.budget.max_input_chars(self._prompt(""), self.profile))
+            self.max_concurrency = self.config.get('analysis', {}).get('max_concurrency', 4)
+            
+            # Keyword rules run before the model and can skip it for clean documents/chunks
+            self.rule_engine = rule_engine if rule_engine is not None else RuleEngine.from_config(self.config)
+            self.prescreen_mode = self.config.get('prescreen', {}).get('mode', 'annotate')
+            
+            # Replies to near-duplicate chunks (templated documents) are reused instead of regenerated
+            self.semantic_cache = semantic_cache if semantic_cache is not None else get_semantic_cache(self.config)
+            self.pii_scanner = pii_scanner if pii_scanner is not None else PIIScanner.from_config(self.config)
+            
+            # Duplicate invoices and reused payee accounts only show up across documents
+            self.entity_index = entity_index if entity_index is not None else EntityIndex.from_config(self.config)
+            self.cache_namespace = f"fraud:{self.PROMPT_VERSION}:{self.config['model']['model_id']}:{self.profile.to_params()}"
             
             logger.info(f"Fraud detector initialized with IBM Granite model: {self.config['model']['model_id']}")
             
@@ -28,30 +71,39 @@ class FraudDetector:
             logger.error(f"Failed to initialize fraud detector: {e}")
             raise
 
-    def detect_fraud_indicators(self, document_text: str) -> dict:
+    def detect_fraud_indicators(self, document_text: str, on_finding=None, previous=None,
+                                pii_matches=None, document_id: str = None) -> dict:
         """
         Detect fraud indicators in financial documents using IBM Granite
         
         Args:
             document_text: Text content of the document to analyze
+            on_finding: Optional callback receiving each Finding as soon as it is known
+                (rule hits first, then model findings while the reply streams in);
+                previews only, the returned results are authoritative
+            previous: Optional PreviousVersion of this document; chunks unchanged since
+                then keep their earlier findings instead of going back to the model
+            pii_matches: PII matches of document_text from an earlier scan; scanned here when None
+            document_id: Client-supplied id of the document; the entity index does not
+                report its earlier versions as "seen before"
             
         Returns:
             Dictionary containing fraud detection results
         """
         try:
-            # Simple, direct prompt for IBM Granite model
-            prompt = f"Analyze the following financial document for signs of fraud or suspicious activity. Summarize any findings.\n\nDocument:\n{document_text[:4000]}"
-            response = self.model.generate_text(prompt)
-            logger.info(f"Raw Granite model output: {repr(response)}")
-            # If response is empty, very short, or just section headers, show a warning
-            if not response or not response.strip() or response.strip().lower() in ["no fraud indicators detected.", "no issues detected."] or len(response.strip()) < 40:
-                response = "No substantive analysis returned by the model. Try a simpler document or a different model."
-            return {
-                "fraud_indicators": [response],
-                "model_used": self.config['model']['model_id'],
-                "analysis_type": "IBM Granite Fraud Detection",
-                "timestamp": str(datetime.now())
-            }
+            # Very short free-text replies carry no usable finding
+            run = ChunkedAnalysis(self, 'fraud', document_text, CLEAN_REPLIES, on_finding, previous,
+                                  pii_matches, min_free_text=40)
+            index_findings = self.cross_document_findings(document_text, run.pii_matches, document_id)
+            if run.publish:
+                for finding in index_findings:
+                    run.publish(finding)
+            findings = assign_pages(dedupe_findings(index_findings + run.findings), document_text)
+            return dict(
+                run.results(findings),
+                fraud_indicators=run.messages(findings, NO_INDICATORS_FOUND),
+                analysis_type="IBM Granite Fraud Detection"
+            )
             
         except Exception as e:
             logger.error(f"Error during fraud detection: {e}")
@@ -59,4 +111,56 @@ class FraudDetector:
                 "fraud_indicators": [f"Error during analysis: {str(e)}"],
                 "error": True,
                 "model_used": self.config['model']['model_id']
-            }
\ No newline at end of file
+            }
+
+    def cross_document_findings(self, document_text: str, pii_matches=None, document_id: str = None) -> list:
+        """"Seen before" findings from the entity index, recording this document in it"""
+        if not self.entity_index:
+            return []
+        accounts = None
+        if pii_matches is not None and self.pii_scanner and ACCOUNT_TYPES <= self.pii_scanner.types:
+            # The analysis already scanned for accounts; the index does not scan again
+            accounts = [match for match in pii_matches if match.kind in ACCOUNT_TYPES]
+        try:
+            return self.entity_index.check_and_record(document_text, accounts, document_id)
+        except Exception as e:
+            # The index only adds context; an unavailable index must not fail the analysis
+            logger.warning(f"Entity index lookup failed: {e}")
+            return []
+
+    def refresh_cross_document_findings(self, fraud_results: dict, document_text: str,
+                                        document_id: str = None) -> dict:
+        """
+        Replace the index findings of earlier (cached) results with ones for this upload
+
+        A re-uploaded document reuses its cached analysis, but what has been seen
+        before changes with every upload, so that part is recomputed.
+        """
+        if not self.entity_index or fraud_results.get('error'):
+            return fraud_results
+        stale = [Finding.from_dict(f) for f in fraud_results.get('findings', []) if f.get('source') == "index"]
+        stale_text = {str(finding) for finding in stale}
+        fresh = assign_pages(self.cross_document_findings(document_text, document_id=document_id), document_text)
+        if not stale and not fresh:
+            return fraud_results
+        findings = [f for f in fraud_results.get('findings', []) if f.get('source') != "index"]
+        indicators = [text for text in fraud_results.get('fraud_indicators', []) if text not in stale_text]
+        if fresh and indicators == [NO_INDICATORS_FOUND]:
+            indicators = []
+        indicators = [str(finding) for finding in fresh] + indicators
+        return dict(fraud_results,
+                    findings=[finding.to_dict() for finding in fresh] + findings,
+                    fraud_indicators=indicators or [NO_INDICATORS_FOUND])
+
+    def _prompt(self, text: str) -> str:
+        """Fraud prompt for one chunk of document text"""
+        # Constrained one-line-per-finding format, parsed by parse_model_findings
+        return (
+            "Analyze the following financial document for signs of fraud or suspicious activity.\n\n"
+            "Report each indicator on its own line, in exactly this format:\n"
+            "FINDING | <HIGH, MEDIUM or LOW> | <type of fraud or suspicious activity> | "
+            "\"<short quote from the document>\" | <one-sentence explanation> | <confidence from 0 to 1>\n\n"
+            "If you find no signs of fraud, reply exactly with: NO FRAUD INDICATORS FOUND.\n\n"
+            "Personal data in the document has been replaced with placeholders such as [ACCOUNT_1a2b3c4d]; quote them exactly as written.\n\n"
+            f"Document:\n{text}"
+        )
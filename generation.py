@@ -0,0 +1,183 @@
+import re
+import math
+import logging
+import threading
+from dataclasses import dataclass, field, fields
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Average characters per token for English business text with Granite's tokenizer
+DEFAULT_CHARS_PER_TOKEN = 3.5
+
+# stop_reason reported by watsonx when max_new_tokens cut the output short
+STOP_MAX_TOKENS = "max_tokens"
+
+# Word-sized pieces, roughly the granularity at which streamed tokens arrive
+_STREAM_PIECE = re.compile(r"\s*\S+\s*|\s+")
+
+
+class Generation(NamedTuple):
+    """Text returned by one model call plus the token counts the backend reported"""
+    text: str
+    input_tokens: int = None
+    generated_tokens: int = None
+    stop_reason: str = None
+
+
+def estimate_tokens(text: str, chars_per_token: float = DEFAULT_CHARS_PER_TOKEN) -> int:
+    """Token count estimate for budgeting; deliberately rounds up"""
+    return math.ceil(len(text) / chars_per_token) if text else 0
+
+
+def stream_pieces(text: str) -> list:
+    """Split text into the word-sized pieces offline backends stream it in"""
+    return _STREAM_PIECE.findall(text)
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    """
+    Named set of generation parameters for one kind of model call
+
+    Attributes:
+        name: Profile name from config.yaml
+        max_new_tokens: Upper bound on generated tokens (lowered per call to fit the context window)
+        min_answer_tokens: Output tokens a prompt must leave room for; prompts leaving less are rejected
+        temperature: Sampling temperature; 0 selects greedy decoding
+        decoding_method: "greedy" or "sample"; derived from temperature when not set
+        top_p: Nucleus sampling cutoff (sample decoding only)
+        repetition_penalty: Penalty applied to repeated tokens
+        stop_sequences: Strings that end generation early
+    """
+    name: str
+    max_new_tokens: int = 1024
+    min_answer_tokens: int = 16
+    temperature: float = 0.0
+    decoding_method: str = None
+    top_p: float = None
+    repetition_penalty: float = None
+    stop_sequences: tuple = field(default_factory=tuple)
+
+    @classmethod
+    def from_config(cls, config: dict, analyzer: str) -> "GenerationProfile":
+        """
+        Profile for an analyzer: `generation.profiles[analysis.<analyzer>.profile]`,
+        with `analysis.<analyzer>.max_tokens` and `temperature` taking precedence
+
+        Raises:
+            ValueError: If the profile has a setting GenerationProfile does not support
+        """
+        analysis = (config or {}).get('analysis', {}).get(analyzer, {})
+        name = analysis.get('profile', analyzer)
+        profiles = (config or {}).get('generation', {}).get('profiles', {})
+        settings = dict(profiles.get(name, {}))
+        if name not in profiles:
+            logger.warning(f"Generation profile '{name}' not configured, using defaults")
+        if 'max_tokens' in analysis:
+            settings['max_new_tokens'] = analysis['max_tokens']
+        if 'temperature' in analysis:
+            settings['temperature'] = analysis['temperature']
+        settings['stop_sequences'] = tuple(settings.get('stop_sequences') or ())
+        known = {f.name for f in fields(cls)} - {'name'}
+        unknown = sorted(set(settings) - known)
+        if unknown:
+            raise ValueError(f"Unknown setting(s) in generation profile '{name}': {', '.join(unknown)}. "
+                             f"Supported: {', '.join(sorted(known))}")
+        return cls(name=name, **settings)
+
+    def to_params(self, max_new_tokens: int = None) -> dict:
+        """watsonx.ai text generation parameters"""
+        method = self.decoding_method or ("sample" if self.temperature else "greedy")
+        params = {
+            "decoding_method": method,
+            "max_new_tokens": max_new_tokens or self.max_new_tokens
+        }
+        if method == "sample":
+            params["temperature"] = self.temperature
+            if self.top_p is not None:
+                params["top_p"] = self.top_p
+        if self.repetition_penalty is not None:
+            params["repetition_penalty"] = self.repetition_penalty
+        if self.stop_sequences:
+            params["stop_sequences"] = list(self.stop_sequences)
+        return params
+
+
+class TokenBudget:
+    def __init__(self, context_window: int = 8192,
+                 chars_per_token: float = DEFAULT_CHARS_PER_TOKEN,
+                 safety_margin: float = 0.1):
+        """
+        Sizes prompts and outputs to fit the model context window
+
+        Args:
+            context_window: Input plus output tokens the model accepts
+            chars_per_token: Characters per token used by the estimator
+            safety_margin: Fraction of the window held back for estimation error
+        """
+        self.context_window = context_window
+        self.chars_per_token = chars_per_token
+        self.usable_tokens = int(context_window * (1 - safety_margin))
+
+    @classmethod
+    def from_config(cls, config: dict) -> "TokenBudget":
+        generation = (config or {}).get('generation', {})
+        return cls(context_window=(config or {}).get('model', {}).get('context_window', 8192),
+                   chars_per_token=generation.get('chars_per_token', DEFAULT_CHARS_PER_TOKEN),
+                   safety_margin=generation.get('safety_margin', 0.1))
+
+    def estimate(self, text: str) -> int:
+        return estimate_tokens(text, self.chars_per_token)
+
+    def max_input_chars(self, prompt_overhead: str, profile: GenerationProfile) -> int:
+        """Largest document chunk (characters) that still leaves room for the full answer"""
+        tokens = self.usable_tokens - self.estimate(prompt_overhead) - profile.max_new_tokens
+        if tokens <= 0:
+            raise ValueError(f"Profile '{profile.name}' max_new_tokens of {profile.max_new_tokens} leaves no room "
+                             f"for document text in a {self.context_window}-token context window")
+        return int(tokens * self.chars_per_token)
+
+    def max_new_tokens(self, prompt: str, profile: GenerationProfile) -> int:
+        """Output tokens for this prompt: the profile's limit, lowered to what fits the window"""
+        available = self.usable_tokens - self.estimate(prompt)
+        if available < profile.min_answer_tokens:
+            raise ValueError(f"Prompt of ~{self.estimate(prompt)} tokens leaves no room for an answer "
+                             f"in a {self.context_window}-token context window")
+        return min(profile.max_new_tokens, available)
+
+
+class UsageLog:
+    """Thread-safe record of the token usage of every model call made for one document"""
+
+    def __init__(self):
+        self.calls = []
+        self.cached_chunks = 0
+        self._lock = threading.Lock()
+
+    def record(self, chunk_index: int, generation: Generation, max_new_tokens: int = None):
+        with self._lock:
+            self.calls.append({
+                "chunk": chunk_index,
+                "input_tokens": generation.input_tokens,
+                "generated_tokens": generation.generated_tokens,
+                "max_new_tokens": max_new_tokens,
+                "stop_reason": generation.stop_reason
+            })
+
+    def record_cached(self, chunk_index: int):
+        """A chunk answered from the semantic cache, without a model call"""
+        with self._lock:
+            self.cached_chunks += 1
+
+    def summary(self) -> dict:
+        """Totals plus the per-call records, in chunk order"""
+        calls = sorted(self.calls, key=lambda call: call['chunk'])
+        return {
+            "calls": len(calls),
+            "input_tokens": sum(call['input_tokens'] or 0 for call in calls),
+            "generated_tokens": sum(call['generated_tokens'] or 0 for call in calls),
+            "truncated": sum(1 for call in calls if call['stop_reason'] == STOP_MAX_TOKENS),
+            "cached_chunks": self.cached_chunks,
+            "per_call": calls
+        }
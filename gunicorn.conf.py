@@ -0,0 +1,40 @@
+"""
+GraniteGuard AI - Gunicorn settings for production serving
+IBM TechXchange Dev Day Hackathon Project
+
+Usage:
+    gunicorn -c gunicorn.conf.py
+
+Worker and thread counts come from the `serving` section of the config file
+(GRANITEGUARD_CONFIG, default config/config.yaml). The app factory runs once
+in the master; every worker then builds its own model clients, thread pools
+and job queue right after it is forked, before it accepts requests.
+"""
+
+import os
+import yaml
+
+with open(os.environ.get('GRANITEGUARD_CONFIG', 'config/config.yaml')) as _file:
+    _config = yaml.safe_load(_file) or {}
+_serving = _config.get('serving', {})
+
+wsgi_app = "src.app:create_app()"
+bind = _serving.get('bind', "0.0.0.0:5000")
+workers = _serving.get('workers', 2)
+threads = _serving.get('threads', 8)
+worker_class = "gthread" if threads > 1 else "sync"
+timeout = _serving.get('timeout', 300)
+graceful_timeout = _serving.get('graceful_timeout', 30)
+preload_app = _serving.get('preload_app', True)
+
+
+def on_starting(server):
+    """Clear metrics and trace settings shared by the workers of a previous run"""
+    from src.metrics import reset_shared
+    reset_shared(_config.get('observability', {}).get('shared_dir'))
+
+
+def post_worker_init(worker):
+    """Warm the per-process AI components so the first request is not slowed by them"""
+    from src.app import ensure_ai_components
+    ensure_ai_components()
@@ -0,0 +1,200 @@
+import re
+import bisect
+import hashlib
+import logging
+from difflib import SequenceMatcher
+from typing import NamedTuple
+from src.chunking import Chunk, PAGE_BREAK
+from src.findings import Finding
+
+logger = logging.getLogger(__name__)
+
+# Findings computed over the whole document on every run rather than per chunk
+_DOCUMENT_SOURCES = ("rules", "pii", "index", "tabular")
+
+
+def chunk_digest(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def chunk_digests(chunks: list, unusable=()) -> list:
+    """
+    [offset, length, digest] of each chunk, stored with the results for the next version
+
+    Args:
+        chunks: All chunks of the document, in order
+        unusable: Indexes of chunks whose findings must not be reused (failed, or
+            skipped by pre-screening); their digest is None
+    """
+    return [[chunk.offset, len(chunk.text), None if chunk.index in unusable else chunk_digest(chunk.text)]
+            for chunk in chunks]
+
+
+class ChunkPlan(NamedTuple):
+    """Chunks of the new version, and the findings carried over for the unchanged ones"""
+    chunks: list
+    reused: dict  # new chunk index -> findings of the identical chunk in the previous version
+
+
+def _line_offsets(text: str) -> list:
+    offsets = [0]
+    for line in text.splitlines(keepends=True):
+        offsets.append(offsets[-1] + len(line))
+    return offsets
+
+
+class PreviousVersion:
+    def __init__(self, record: dict, document_text: str):
+        """
+        The stored analysis of an earlier version of a document, aligned to its new text
+
+        The two texts are matched line by line, so an edit only moves the text
+        after it rather than changing it; chunks of the previous version that lie
+        in an unchanged stretch are found at their new offset and reused.
+
+        Args:
+            record: Version record stored by AnalysisPipeline (text, per-analyzer chunk digests and findings)
+            document_text: Text of the new version
+        """
+        self.record = record
+        self.text = record["text"]
+        self.document_text = document_text
+        old_lines = self.text.splitlines(keepends=True)
+        new_lines = document_text.splitlines(keepends=True)
+        old_offsets, new_offsets = _line_offsets(self.text), _line_offsets(document_text)
+        matcher = SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+        # (old start, new start, length) in characters, ordered by position in both texts
+        self.blocks = [(old_offsets[a], new_offsets[b], old_offsets[a + size] - old_offsets[a])
+                       for a, b, size in matcher.get_matching_blocks() if size]
+        self._block_starts = [block[0] for block in self.blocks]
+
+    def _moved(self, offset: int, length: int):
+        """New offset of an old span that is unchanged in the new text, or None"""
+        position = bisect.bisect_right(self._block_starts, offset) - 1
+        if position < 0:
+            return None
+        old_start, new_start, size = self.blocks[position]
+        if offset + length > old_start + size:
+            return None
+        return new_start + offset - old_start
+
+    def plan(self, analyzer: str, chunker) -> ChunkPlan:
+        """
+        Chunks for one analyzer: unchanged chunks of the previous version as they were,
+        and fresh chunks (with the chunker's overlap as context) over everything else
+        """
+        previous = self.record.get(analyzer) or {}
+        findings_by_chunk = {}
+        for data in previous.get("findings", []):
+            if data.get("source", "model") not in _DOCUMENT_SOURCES and data.get("chunk") is not None:
+                findings_by_chunk.setdefault(data["chunk"], []).append(data)
+
+        kept = []
+        for old_index, (offset, length, digest) in enumerate(previous.get("chunks", [])):
+            new_offset = self._moved(offset, length) if digest else None
+            if new_offset is None:
+                continue
+            text = self.document_text[new_offset:new_offset + length]
+            if chunk_digest(text) != digest or (kept and new_offset < kept[-1][0]):
+                continue
+            kept.append((new_offset, text, new_offset - offset, findings_by_chunk.get(old_index, [])))
+
+        pieces = [(offset, text, (delta, findings)) for offset, text, delta, findings in kept]
+        covered = 0
+        for gap_start, gap_end in self._gaps(kept):
+            if not self.document_text[gap_start:gap_end].strip():
+                continue
+            start = max(0, gap_start - chunker.overlap)
+            end = min(len(self.document_text), gap_end + chunker.overlap)
+            for chunk in chunker.split(self.document_text[start:end]):
+                pieces.append((start + chunk.offset, chunk.text, None))
+                covered += len(chunk.text)
+        pieces.sort(key=lambda piece: piece[0])
+
+        chunks, reused = [], {}
+        for index, (offset, text, carried) in enumerate(pieces):
+            chunks.append(Chunk(index, offset, text))
+            if carried is not None:
+                delta, findings = carried
+                reused[index] = [self._moved_finding(data, index, delta) for data in findings]
+        logger.info(f"{analyzer.capitalize()}: {len(reused)} of {len(chunks)} chunks unchanged since the "
+                    f"previous version, {covered} characters to re-analyze")
+        return ChunkPlan(chunks, reused)
+
+    def _gaps(self, kept: list) -> list:
+        """Spans of the new text not covered by a reused chunk"""
+        gaps, position = [], 0
+        for offset, text, _, _ in kept:
+            if offset > position:
+                gaps.append((position, offset))
+            position = max(position, offset + len(text))
+        if position < len(self.document_text):
+            gaps.append((position, len(self.document_text)))
+        return gaps
+
+    @staticmethod
+    def _moved_finding(data: dict, index: int, delta: int) -> Finding:
+        finding = Finding.from_dict(data)
+        finding.chunk = index
+        finding.page = None
+        if finding.start is not None:
+            finding.start += delta
+            finding.end += delta
+        return finding
+
+    def changed_spans(self) -> list:
+        """(start, end) spans of the new text that differ from the previous version"""
+        spans, position = [], 0
+        for _, new_start, size in self.blocks:
+            if new_start > position:
+                spans.append((position, new_start))
+            position = new_start + size
+        if position < len(self.document_text):
+            spans.append((position, len(self.document_text)))
+        return spans
+
+    def removed_chars(self) -> int:
+        return len(self.text) - sum(size for _, _, size in self.blocks)
+
+    def finding_changes(self, analyzer: str, findings: list) -> dict:
+        """Findings new in this version, and earlier ones no longer reported, as display strings"""
+        def key(data):
+            return (data.get("severity"), data.get("regulation"), data.get("message"), data.get("evidence"))
+
+        # Cross-document findings describe upload history, not the document's content
+        before = {key(data): data for data in (self.record.get(analyzer) or {}).get("findings", [])
+                  if data.get("source") != "index"}
+        after = {key(data): data for data in findings if data.get("source") != "index"}
+        return {
+            "added": [str(Finding.from_dict(data)) for k, data in after.items() if k not in before],
+            "resolved": [str(Finding.from_dict(data)) for k, data in before.items() if k not in after]
+        }
+
+    def summary(self, results: dict) -> dict:
+        """
+        What changed since the previous version, for the analysis response
+
+        Args:
+            results: {"compliance": results, "fraud": results} of the new version
+        """
+        spans = self.changed_spans()
+        breaks = ([match.start() for match in re.finditer(PAGE_BREAK, self.document_text)]
+                  if PAGE_BREAK in self.document_text else None)
+        changed = []
+        for start, end in spans[:100]:
+            entry = {"start": start, "end": end}
+            if breaks is not None:
+                entry["page"] = bisect.bisect_right(breaks, start) + 1
+            changed.append(entry)
+        summary = {
+            "previous_analyzed_at": self.record.get("analyzed_at"),
+            "characters_added": sum(end - start for start, end in spans),
+            "characters_removed": self.removed_chars(),
+            "changed_spans": changed
+        }
+        for analyzer, analysis in results.items():
+            summary[analyzer] = dict(
+                self.finding_changes(analyzer, analysis.get("findings", [])),
+                chunks_reanalyzed=analysis.get("chunks_analyzed", 0),
+                chunks_reused=analysis.get("chunks_reused", 0))
+        return summary
@@ -0,0 +1,254 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from src.metrics import ERRORS, JOB_QUEUE_DEPTH, JOB_RUN_SECONDS, JOB_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit"""
+
+
+class JobQueue:
+    def __init__(self, handler, db_path: str = "jobs/jobs.sqlite3",
+                 workers: int = 2,
+                 max_queue_depth: int = 20,
+                 result_ttl_hours: float = 24,
+                 lease_seconds: float = 60):
+        """
+        Local background job queue with SQLite-persisted job state
+
+        Args:
+            handler: Called as handler(payload, progress) in a worker thread; `progress`
+                takes (fraction, stage) and the handler's return value is the job result
+            db_path: SQLite file holding job state; unfinished jobs resume on restart
+            workers: Number of jobs run at the same time
+            max_queue_depth: Queued plus running jobs, across all processes sharing the
+                database, allowed before submit() is refused and expired jobs stop being resumed
+            result_ttl_hours: Finished jobs older than this are purged
+            lease_seconds: Unfinished jobs not refreshed by their process for this long
+                are taken over by another process sharing the database
+        """
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.handler = handler
+        self.max_queue_depth = max_queue_depth
+        self.result_ttl_seconds = result_ttl_hours * 3600
+        self.lease_seconds = lease_seconds
+        # Ids of the jobs queued or running in this process, whose lease it keeps renewing
+        self._owned = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        # Transactions are managed explicitly: the depth check and the insert it allows are one unit
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " state TEXT NOT NULL,"
+            " stage TEXT,"
+            " progress REAL NOT NULL DEFAULT 0,"
+            " payload TEXT NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+
+    @classmethod
+    def from_config(cls, config: dict, handler):
+        """Build the queue from the `jobs` section of config.yaml, or None if disabled"""
+        settings = (config or {}).get('jobs', {})
+        if not settings.get('enabled', False):
+            return None
+        return cls(handler,
+                   db_path=settings.get('db_path', "jobs/jobs.sqlite3"),
+                   workers=settings.get('workers', 2),
+                   max_queue_depth=settings.get('max_queue_depth', 20),
+                   result_ttl_hours=settings.get('result_ttl_hours', 24),
+                   lease_seconds=settings.get('lease_seconds', 60))
+
+    def start(self):
+        """
+        Resume unfinished jobs whose lease expired, and keep renewing this process's leases
+
+        Each process sharing the database refreshes updated_at of the jobs it holds
+        every lease_seconds / 3. A queued or running job left unrefreshed for
+        lease_seconds belonged to a process that died (a crashed gunicorn worker, or
+        a previous server) and is resumed by whichever live process claims it first.
+        """
+        self._resume_expired()
+        threading.Thread(target=self._renew_leases, name="job-lease", daemon=True).start()
+
+    def _renew_leases(self):
+        while not self._stopped.wait(self.lease_seconds / 3):
+            try:
+                with self._lock:
+                    now = time.time()
+                    self._transaction(lambda: self._conn.executemany(
+                        "UPDATE jobs SET updated_at = ? WHERE id = ?", [(now, job_id) for job_id in self._owned]))
+                self._resume_expired()
+            except sqlite3.Error as e:
+                logger.error(f"Renewing job leases failed: {e}")
+
+    def _resume_expired(self):
+        resumed = 0
+        while True:
+            with self._lock:
+                job = self._transaction(self._claim_expired)
+                if job is None:
+                    break
+                self._reserve(job[0])
+            self._dispatch(*job)
+            resumed += 1
+        if resumed:
+            logger.info(f"Resumed {resumed} unfinished jobs")
+
+    def _claim_expired(self):
+        """(id, payload) of the oldest expired job, claimed for this process, or None"""
+        expired_before = time.time() - self.lease_seconds
+        row = self._conn.execute(
+            "SELECT id, payload FROM jobs WHERE state IN (?, ?) AND updated_at < ? ORDER BY created_at LIMIT 1",
+            (QUEUED, RUNNING, expired_before)
+        ).fetchone()
+        if row is None:
+            return None
+        # Jobs whose process is alive use up the depth; the rest wait for a later renewal round
+        live = self._conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state IN (?, ?) AND updated_at >= ?",
+            (QUEUED, RUNNING, expired_before)
+        ).fetchone()[0]
+        if live >= self.max_queue_depth:
+            return None
+        # Claiming renews the lease, so each expired job is resumed by one process only
+        self._conn.execute("UPDATE jobs SET state = ?, stage = ?, progress = 0, updated_at = ? WHERE id = ?",
+                           (QUEUED, "resumed", time.time(), row[0]))
+        return row[0], json.loads(row[1])
+
+    def submit(self, payload: dict) -> str:
+        """
+        Queue a job
+
+        Args:
+            payload: JSON-serializable arguments passed to the handler
+
+        Returns:
+            The new job id
+
+        Raises:
+            QueueFullError: If max_queue_depth jobs are already queued or running
+        """
+        job_id = uuid.uuid4().hex
+
+        def insert():
+            # Counted in the write transaction that inserts the job, so concurrent submits from
+            # any process cannot overshoot; jobs awaiting resumption count too
+            if self._pending() >= self.max_queue_depth:
+                raise QueueFullError(f"Job queue is full ({self.max_queue_depth} jobs pending). Try again later.")
+            now = time.time()
+            self._conn.execute(
+                "INSERT INTO jobs (id, state, stage, progress, payload, created_at, updated_at)"
+                " VALUES (?, ?, ?, 0, ?, ?, ?)",
+                (job_id, QUEUED, "queued", json.dumps(payload), now, now)
+            )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ?",
+                (COMPLETED, FAILED, now - self.result_ttl_seconds)
+            )
+
+        with self._lock:
+            self._transaction(insert)
+            self._reserve(job_id)
+        self._dispatch(job_id, payload)
+        return job_id
+
+    def get(self, job_id: str):
+        """Return a job's state, progress and (once finished) result or error, or None if unknown"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, stage, progress, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        state, stage, progress, result, error, created_at, updated_at = row
+        return {
+            "job_id": job_id,
+            "state": state,
+            "stage": stage,
+            "progress": progress,
+            "result": json.loads(result) if result else None,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": updated_at
+        }
+
+    def depth(self) -> int:
+        """Number of jobs queued or running in all processes sharing the database"""
+        with self._lock:
+            return self._pending()
+
+    def _pending(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE state IN (?, ?)", (QUEUED, RUNNING)).fetchone()[0]
+
+    def _transaction(self, work):
+        """Run work() in a write transaction, committed unless it raises; the caller holds self._lock"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work()
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def _reserve(self, job_id: str):
+        """Count a job as held by this process; the caller holds self._lock"""
+        self._owned.add(job_id)
+        JOB_QUEUE_DEPTH.set(len(self._owned))
+
+    def _dispatch(self, job_id: str, payload: dict):
+        self._executor.submit(self._run, job_id, payload, time.perf_counter())
+
+    def _run(self, job_id: str, payload: dict, queued_at: float):
+        started = time.perf_counter()
+        JOB_WAIT_SECONDS.observe(started - queued_at)
+        outcome = COMPLETED
+        self._update(job_id, state=RUNNING, stage="started")
+        try:
+            result = self.handler(payload, lambda fraction, stage: self._update(job_id, progress=fraction, stage=stage))
+            self._update(job_id, state=COMPLETED, stage="completed", progress=1.0, result=json.dumps(result, default=str))
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            outcome = FAILED
+            ERRORS.inc(stage="job")
+            self._update(job_id, state=FAILED, stage="failed", error=str(e))
+        finally:
+            JOB_RUN_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+            with self._lock:
+                self._owned.discard(job_id)
+                JOB_QUEUE_DEPTH.set(len(self._owned))
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def shutdown(self):
+        """Stop accepting work; jobs still queued are resumed elsewhere once their lease expires"""
+        self._stopped.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,274 @@
+import os
+import json
+import time
+import atexit
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans a fast cache hit up to a long multi-chunk model call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def samples(self):
+        """(suffix, label pairs, value) for every series, for the text exposition format"""
+        raise NotImplementedError
+
+    def dump(self) -> list:
+        """[label values, value] of every series, JSON-ready"""
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merged(self, dumps: list) -> "_Metric":
+        """A copy of this metric holding the sum of several processes' dump() output"""
+        total = object.__new__(type(self))
+        total.__dict__.update(self.__dict__)
+        total._values = {}
+        total._lock = threading.Lock()
+        for dump in dumps:
+            for key, value in dump:
+                total._add(tuple(key), value)
+        return total
+
+    def _add(self, key: tuple, value):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _add(self, key: tuple, value: float):
+        self._values[key] = self._values.get(key, 0.0) + value
+
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield "", list(zip(self.labels, key)), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket counts (the last is +Inf), then count and sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0, 0.0]
+            series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._values.get(self._key(labels))
+        return series[1] if series else 0
+
+    def dump(self) -> list:
+        with self._lock:
+            return [[list(key), [list(series[0]), series[1], series[2]]] for key, series in self._values.items()]
+
+    def _add(self, key: tuple, value: list):
+        series = self._values.setdefault(key, [[0] * (len(self.buckets) + 1), 0, 0.0])
+        series[0] = [a + b for a, b in zip(series[0], value[0])]
+        series[1] += value[1]
+        series[2] += value[2]
+
+    def samples(self):
+        with self._lock:
+            values = [(key, list(series[0]), series[1], series[2]) for key, series in self._values.items()]
+        for key, counts, count, total in values:
+            pairs = list(zip(self.labels, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield "_bucket", pairs + [("le", "+Inf" if bound == float("inf") else repr(bound))], cumulative
+            yield "_count", pairs, count
+            yield "_sum", pairs, total
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def reset_shared(directory: str):
+    """Remove the shared state of a previous server run; call once at server start, before workers fork"""
+    if directory and os.path.isdir(directory):
+        for entry in os.scandir(directory):
+            if entry.is_file():
+                os.remove(entry.path)
+
+
+class MetricsRegistry:
+    """Process metrics, rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._directory = None
+        self._pid = None
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def share(self, directory: str, interval: float = 5.0):
+        """
+        Aggregate metrics across processes (e.g. gunicorn workers) through a directory
+
+        This process writes its values to <directory>/metrics-<pid>.json every `interval`
+        seconds, at exit and before rendering; render() then sums the files of all
+        processes, so every worker serves the same totals. Counters and histograms of
+        exited processes are kept so totals never go backwards; gauges only include
+        live processes. Call in each process after it is forked.
+        """
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            os.makedirs(directory, exist_ok=True)
+            self._directory = directory
+            self._pid = os.getpid()
+        threading.Thread(target=self._flush_every, args=(interval,), name="metrics-flush", daemon=True).start()
+        atexit.register(self.flush)
+
+    def _flush_every(self, interval: float):
+        while True:
+            time.sleep(interval)
+            self.flush()
+
+    def flush(self):
+        """Write this process's snapshot for the other processes"""
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            metrics = list(self._metrics.values())
+        path = os.path.join(self._directory, f"metrics-{self._pid}.json")
+        try:
+            with open(path + ".tmp", "w") as f:
+                json.dump({metric.name: metric.dump() for metric in metrics}, f)
+            # Atomic: readers never see a partly written snapshot
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.error(f"Writing metrics snapshot failed: {e}")
+
+    def _merged(self, metrics: list) -> list:
+        self.flush()
+        snapshots = []
+        for name in os.listdir(self._directory):
+            if not (name.startswith("metrics-") and name.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(self._directory, name)) as f:
+                    snapshots.append((int(name[len("metrics-"):-len(".json")]), json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return [metric.merged([snapshot.get(metric.name, []) for pid, snapshot in snapshots
+                               if metric.kind != "gauge" or _alive(pid)])
+                for metric in metrics]
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        if self._pid == os.getpid():
+            metrics = self._merged(metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, pairs, value in metric.samples():
+                labels = ",".join(f'{name}="{_escape(label)}"' for name, label in pairs)
+                lines.append(f"{metric.name}{suffix}{{{labels}}} {value}" if labels else f"{metric.name}{suffix} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labels=()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labels))
+
+
+def gauge(name: str, documentation: str, labels=()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labels))
+
+
+def histogram(name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labels, buckets))
+
+
+# Hot-path instrumentation shared by the pipeline stages. Values are kept per process;
+# with observability.metrics_dir set, /metrics serves the sum over all workers.
+EXTRACTION_SECONDS = histogram("graniteguard_extraction_seconds", "Document text extraction time", ("format",))
+MODEL_CALL_SECONDS = histogram("graniteguard_model_call_seconds",
+                               "Model call latency including retries", ("mode", "outcome"))
+MODEL_FIRST_TOKEN_SECONDS = histogram("graniteguard_model_first_token_seconds",
+                                      "Time to the first streamed piece of a model reply")
+MODEL_TOKENS = counter("graniteguard_model_tokens_total", "Tokens reported by the model backend", ("direction",))
+ANALYSIS_SECONDS = histogram("graniteguard_analysis_seconds", "Concurrent compliance and fraud analysis time")
+REPORT_SECONDS = histogram("graniteguard_report_render_seconds", "Report rendering time", ("backend",))
+JOB_WAIT_SECONDS = histogram("graniteguard_job_wait_seconds", "Time jobs wait in the queue before running")
+JOB_RUN_SECONDS = histogram("graniteguard_job_run_seconds", "Job run time", ("outcome",))
+JOB_QUEUE_DEPTH = gauge("graniteguard_job_queue_depth", "Jobs queued or running")
+CACHE_LOOKUPS = counter("graniteguard_cache_lookups_total", "Result cache lookups", ("kind", "result"))
+ERRORS = counter("graniteguard_errors_total", "Errors by pipeline stage", ("stage",))
@@ -0,0 +1,335 @@
+import os
+import json
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from src.generation import Generation, estimate_tokens, stream_pieces
+from src.metrics import ERRORS, MODEL_CALL_SECONDS, MODEL_FIRST_TOKEN_SECONDS, MODEL_TOKENS
+from src.resilience import ResilientBackend
+
+logger = logging.getLogger(__name__)
+
+IAM_TOKEN_URL = "https://iam.cloud.ibm.com/identity/token"
+GENERATION_API_VERSION = "2023-05-29"
+
+
+class IAMTokenManager:
+    """Caches an IBM Cloud IAM bearer token and refreshes it before it expires"""
+
+    def __init__(self, api_key: str, session: requests.Session,
+                 iam_url: str = IAM_TOKEN_URL, refresh_margin: int = 300, clock=time.time):
+        self.api_key = api_key
+        self.session = session
+        self.iam_url = iam_url
+        self.refresh_margin = refresh_margin
+        self._clock = clock
+        self._token = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_token(self) -> str:
+        """Return a valid token, exchanging the API key only when close to expiry"""
+        if self._token and self._clock() < self._expires_at - self.refresh_margin:
+            return self._token
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._token and self._clock() < self._expires_at - self.refresh_margin:
+                return self._token
+            response = self.session.post(
+                self.iam_url,
+                data={"grant_type": "urn:ibm:params:oauth:grant-type:apikey", "apikey": self.api_key},
+                headers={"Accept": "application/json"},
+                timeout=30
+            )
+            response.raise_for_status()
+            payload = response.json()
+            self._token = payload["access_token"]
+            self._expires_at = self._clock() + payload.get("expires_in", 3600)
+            logger.info("IAM token refreshed")
+            return self._token
+
+    def invalidate(self):
+        """Force the next call to fetch a fresh token"""
+        with self._lock:
+            self._token = None
+
+
+class WatsonxBackend:
+    """Calls the watsonx.ai text generation REST API over a pooled keep-alive session"""
+
+    def __init__(self, config: dict, model_id: str):
+        watsonx = config['watsonx']
+        self.model_id = model_id
+        self.url = watsonx['url'].rstrip('/')
+        self.project_id = watsonx['project_id']
+        self.timeout = watsonx.get('timeout', 120)
+
+        pool_size = watsonx.get('pool_maxsize', 10)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.tokens = IAMTokenManager(
+            api_key=watsonx['api_key'],
+            session=self.session,
+            iam_url=watsonx.get('iam_url', IAM_TOKEN_URL),
+            refresh_margin=watsonx.get('token_refresh_margin', 300)
+        )
+
+    def generate_text(self, prompt: str, params: dict = None) -> str:
+        return self.generate(prompt, params).text
+
+    def generate(self, prompt: str, params: dict = None) -> Generation:
+        response = self._post("generation", self._body(prompt, params))
+        results = response.json().get("results", [])
+        if not results:
+            return Generation("")
+        result = results[0]
+        return Generation(result.get("generated_text", ""),
+                          result.get("input_token_count"),
+                          result.get("generated_token_count"),
+                          result.get("stop_reason"))
+
+    def generate_stream(self, prompt: str, params: dict = None, on_text=None) -> Generation:
+        """
+        Generate text over the streaming endpoint, passing each piece to on_text as it arrives
+
+        Returns:
+            The complete Generation once the stream ends
+        """
+        response = self._post("generation_stream", self._body(prompt, params), stream=True)
+        # Server-sent events are UTF-8; without a charset requests would decode them as Latin-1
+        response.encoding = "utf-8"
+        parts = []
+        input_tokens = generated_tokens = stop_reason = None
+        try:
+            # chunk_size=None hands over each HTTP chunk as it arrives instead of waiting for 512 bytes
+            for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                for result in json.loads(line[5:]).get("results", []):
+                    text = result.get("generated_text", "")
+                    if text:
+                        parts.append(text)
+                        if on_text:
+                            on_text(text)
+                    # Counts are cumulative; the last event carries the totals
+                    input_tokens = result.get("input_token_count", input_tokens)
+                    generated_tokens = result.get("generated_token_count", generated_tokens)
+                    stop_reason = result.get("stop_reason", stop_reason)
+        finally:
+            response.close()
+        return Generation("".join(parts), input_tokens, generated_tokens, stop_reason)
+
+    def _body(self, prompt: str, params: dict) -> dict:
+        return {
+            "model_id": self.model_id,
+            "input": prompt,
+            "project_id": self.project_id,
+            "parameters": params or {}
+        }
+
+    def _post(self, endpoint: str, body: dict, stream: bool = False) -> requests.Response:
+        response = self._request(endpoint, body, stream)
+        if response.status_code == 401:
+            # Token revoked or expired early; retry once with a fresh one
+            response.close()
+            self.tokens.invalidate()
+            response = self._request(endpoint, body, stream)
+        if stream and not response.ok:
+            response.close()
+        response.raise_for_status()
+        return response
+
+    def _request(self, endpoint: str, body: dict, stream: bool) -> requests.Response:
+        return self.session.post(
+            f"{self.url}/ml/v1/text/{endpoint}",
+            params={"version": GENERATION_API_VERSION},
+            json=body,
+            headers={"Authorization": f"Bearer {self.tokens.get_token()}",
+                     "Accept": "text/event-stream" if stream else "application/json"},
+            stream=stream,
+            timeout=self.timeout
+        )
+
+    def close(self):
+        self.session.close()
+
+
+class FakeBackend:
+    """Offline backend returning canned responses, for tests and demos without credentials"""
+
+    def __init__(self, config: dict, model_id: str, responder=None):
+        fake = config.get('fake_backend', {})
+        self.model_id = model_id
+        self.response = fake.get('response', "NO COMPLIANCE ISSUES FOUND")
+        self.latency = fake.get('latency', 0)
+        self.token_delay = fake.get('token_delay', 0)
+        self.responder = responder
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate_text(self, prompt: str, params: dict = None) -> str:
+        return self.generate(prompt, params).text
+
+    def generate(self, prompt: str, params: dict = None) -> Generation:
+        with self._lock:
+            self.calls.append((prompt, params))
+        if self.latency:
+            time.sleep(self.latency)
+        text = self.responder(prompt, params) if self.responder else self.response
+        # Estimated counts stand in for the tokenizer counts watsonx reports
+        return Generation(text, estimate_tokens(prompt), estimate_tokens(text), "eos_token")
+
+    def generate_stream(self, prompt: str, params: dict = None, on_text=None) -> Generation:
+        generation = self.generate(prompt, params)
+        for piece in stream_pieces(generation.text):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            if on_text:
+                on_text(piece)
+        return generation
+
+    def close(self):
+        pass
+
+
+_BACKENDS = {
+    "watsonx": WatsonxBackend,
+    "fake": FakeBackend
+}
+
+
+def register_backend(name: str, factory):
+    """Register a backend factory called as factory(config, model_id)"""
+    _BACKENDS[name] = factory
+
+
+class ModelClient:
+    """Authenticated client for one model_id, safe to share across analyzers and threads"""
+
+    def __init__(self, model_id: str, backend):
+        self.model_id = model_id
+        self.backend = backend
+        self.usage = {"calls": 0, "input_tokens": 0, "generated_tokens": 0}
+        self._usage_lock = threading.Lock()
+
+    def generate_text(self, prompt: str, params: dict = None) -> str:
+        return self.generate(prompt, params).text
+
+    def generate(self, prompt: str, params: dict = None) -> Generation:
+        """Generate text and return it with the token counts of the call"""
+        start = time.perf_counter()
+        try:
+            if hasattr(self.backend, 'generate'):
+                generation = self.backend.generate(prompt, params)
+            else:
+                # Registered backends may only implement generate_text
+                generation = Generation(self.backend.generate_text(prompt, params))
+        except Exception:
+            self._observe("generate", start, failed=True)
+            raise
+        self._observe("generate", start)
+        self._record(generation)
+        return generation
+
+    def generate_stream(self, prompt: str, params: dict = None, on_text=None) -> Generation:
+        """
+        Generate text, calling on_text with each piece as the model produces it
+
+        Backends without streaming support deliver the whole text in one piece.
+
+        Returns:
+            The complete Generation, with the token counts of the call
+        """
+        if not hasattr(self.backend, 'generate_stream'):
+            generation = self.generate(prompt, params)
+            if on_text and generation.text:
+                on_text(generation.text)
+            return generation
+        start = time.perf_counter()
+        first = []
+
+        def timed(piece):
+            if not first:
+                first.append(True)
+                MODEL_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start)
+            if on_text:
+                on_text(piece)
+
+        try:
+            generation = self.backend.generate_stream(prompt, params, timed)
+        except Exception:
+            self._observe("stream", start, failed=True)
+            raise
+        self._observe("stream", start)
+        self._record(generation)
+        return generation
+
+    def _observe(self, mode: str, start: float, failed: bool = False):
+        MODEL_CALL_SECONDS.observe(time.perf_counter() - start, mode=mode, outcome="error" if failed else "ok")
+        if failed:
+            ERRORS.inc(stage="model")
+
+    def _record(self, generation: Generation):
+        with self._usage_lock:
+            self.usage["calls"] += 1
+            self.usage["input_tokens"] += generation.input_tokens or 0
+            self.usage["generated_tokens"] += generation.generated_tokens or 0
+        MODEL_TOKENS.inc(generation.input_tokens or 0, direction="input")
+        MODEL_TOKENS.inc(generation.generated_tokens or 0, direction="generated")
+
+    def close(self):
+        self.backend.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_model_client(config: dict, model_id: str = None, backend: str = None) -> ModelClient:
+    """
+    Return the shared client for a model, creating it on first use
+
+    Args:
+        config: Parsed config.yaml
+        model_id: Model to use, defaults to model.model_id
+        backend: Backend name, defaults to model.backend ("watsonx")
+
+    Returns:
+        The ModelClient shared by every caller asking for the same backend and model
+    """
+    model_id = model_id or config['model']['model_id']
+    backend = backend or config['model'].get('backend', 'watsonx')
+    key = (backend, model_id)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            if backend not in _BACKENDS:
+                raise ValueError(f"Unknown model backend: {backend}")
+            # Rate limiter and circuit breaker live on the shared client, so every analyzer thread obeys them
+            client = ModelClient(model_id, ResilientBackend.from_config(config, _BACKENDS[backend](config, model_id)))
+            _clients[key] = client
+            logger.info(f"Created shared {backend} model client for {model_id}")
+        return client
+
+
+def _forget_clients_after_fork():
+    """Forked children must not reuse the parent's sessions or locks; they create clients on first use"""
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_clients_after_fork)
+
+
+def close_model_clients():
+    """Close and forget every shared client"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,103 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisOrchestrator:
+    def __init__(self, compliance_checker, fraud_detector,
+                 compliance_timeout: float = None,
+                 fraud_timeout: float = None,
+                 max_workers: int = 8):
+        """
+        Run compliance and fraud analysis of a document concurrently
+
+        Args:
+            compliance_checker: Object exposing check_compliance(text)
+            fraud_detector: Object exposing detect_fraud_indicators(text)
+            compliance_timeout: Seconds to wait for compliance results (None = no limit)
+            fraud_timeout: Seconds to wait for fraud results (None = no limit)
+            max_workers: Threads shared by all concurrent analyses
+        """
+        self.compliance_checker = compliance_checker
+        self.fraud_detector = fraud_detector
+        self.compliance_timeout = compliance_timeout
+        self.fraud_timeout = fraud_timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis")
+
+    @classmethod
+    def from_config(cls, config: dict, compliance_checker, fraud_detector) -> "AnalysisOrchestrator":
+        """Build an orchestrator using the timeouts in the `analysis` section of config.yaml"""
+        analysis = (config or {}).get('analysis', {})
+        return cls(
+            compliance_checker,
+            fraud_detector,
+            compliance_timeout=analysis.get('compliance', {}).get('timeout'),
+            fraud_timeout=analysis.get('fraud', {}).get('timeout'),
+            max_workers=analysis.get('orchestrator_workers', 8)
+        )
+
+    def analyze(self, document_text: str, on_finding=None, previous=None, document_id: str = None) -> tuple:
+        """
+        Analyze a document with both analyzers at once
+
+        A side that fails or exceeds its timeout is reported as an error result
+        while the other side's findings are still returned. A timed-out call keeps
+        running in the background; its result is discarded.
+
+        Args:
+            document_text: Text content of the document to analyze
+            on_finding: Optional callback receiving partial findings of both analyzers
+                as they stream in; called from the analysis threads
+            previous: Optional PreviousVersion of this document, so both analyzers only
+                send the chunks that changed since then to the model
+            document_id: Client-supplied id of the document, so the fraud detector's entity
+                index does not flag its earlier versions
+
+        Returns:
+            Tuple of (compliance_results, fraud_results)
+        """
+        started = time.monotonic()
+        kwargs = {'on_finding': on_finding} if on_finding else {}
+        if previous is not None:
+            kwargs['previous'] = previous
+        # One PII pass serves both analyzers (and the entity index) when they scan for the same types
+        scanner = getattr(self.compliance_checker, 'pii_scanner', None)
+        other = getattr(self.fraud_detector, 'pii_scanner', None)
+        if scanner and other and scanner.types == other.types:
+            kwargs['pii_matches'] = scanner.scan(document_text)
+        fraud_kwargs = dict(kwargs, document_id=document_id) if document_id else kwargs
+        compliance_future = self.executor.submit(self.compliance_checker.check_compliance, document_text, **kwargs)
+        fraud_future = self.executor.submit(self.fraud_detector.detect_fraud_indicators, document_text, **fraud_kwargs)
+
+        compliance_results = self._collect(compliance_future, self.compliance_timeout, started,
+                                           "compliance_issues", "compliance analysis")
+        fraud_results = self._collect(fraud_future, self.fraud_timeout, started,
+                                      "fraud_indicators", "fraud detection")
+        logger.info(f"Concurrent analysis finished in {time.monotonic() - started:.2f}s")
+        return compliance_results, fraud_results
+
+    @staticmethod
+    def _collect(future, timeout, started, findings_key, label):
+        # Both analyses started together, so each timeout is measured from submission
+        remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+        try:
+            return future.result(timeout=remaining)
+        except FutureTimeoutError:
+            future.cancel()
+            logger.error(f"{label.capitalize()} timed out after {timeout}s")
+            return {
+                findings_key: [f"Analysis timed out after {timeout} seconds."],
+                "error": True,
+                "timed_out": True
+            }
+        except Exception as e:
+            logger.error(f"Error during {label}: {e}")
+            return {
+                findings_key: [f"Error during analysis: {str(e)}"],
+                "error": True
+            }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
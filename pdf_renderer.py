@@ -0,0 +1,225 @@
+import zlib
+import itertools
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# A4 in points, 15mm margins (matches the wkhtmltopdf options used before)
+PAGE_WIDTH = 595.28
+PAGE_HEIGHT = 841.89
+MARGIN = 42.52
+
+# Helvetica advance widths (1/1000 em) for ASCII 32..126
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584
+]
+
+SEVERITY_COLORS = {
+    "high": ((0.906, 0.298, 0.235), (0.980, 0.859, 0.847)),
+    "medium": ((0.953, 0.612, 0.071), (0.992, 0.922, 0.816)),
+    "low": ((0.180, 0.800, 0.443), (0.835, 0.961, 0.890))
+}
+_HEADING_COLOR = (0.204, 0.596, 0.859)
+_TITLE_COLOR = (0.173, 0.243, 0.314)
+_MUTED_COLOR = (0.498, 0.549, 0.553)
+
+
+def _text_width(text: str, size: float, bold: bool = False) -> float:
+    width = sum(_HELVETICA_WIDTHS[ord(c) - 32] if 32 <= ord(c) <= 126 else 556 for c in text)
+    # Helvetica-Bold is roughly 5% wider; only used for short headings
+    return width * size / 1000 * (1.05 if bold else 1.0)
+
+
+def _pdf_string(text: str) -> str:
+    """Escape text for a PDF literal string; characters outside Latin-1 are dropped"""
+    text = text.encode('latin-1', 'ignore').decode('latin-1')
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def _wrap(text: str, size: float, max_width: float) -> list:
+    lines = []
+    for paragraph in text.encode('latin-1', 'ignore').decode('latin-1').split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if _text_width(candidate, size) <= max_width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            # Hard-break words wider than the column (URLs, account numbers)
+            while _text_width(word, size) > max_width:
+                cut = max(1, int(len(word) * max_width / _text_width(word, size)))
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+    return lines
+
+
+class _Page:
+    def __init__(self):
+        self.ops = []
+
+    def text(self, x, y, text, size, bold=False, color=(0, 0, 0)):
+        font = "F2" if bold else "F1"
+        self.ops.append(f"{color[0]:.3f} {color[1]:.3f} {color[2]:.3f} rg BT /{font} {size} Tf "
+                        f"{x:.2f} {y:.2f} Td {_pdf_string(text)} Tj ET")
+
+    def rect(self, x, y, w, h, color):
+        self.ops.append(f"{color[0]:.3f} {color[1]:.3f} {color[2]:.3f} rg {x:.2f} {y:.2f} {w:.2f} {h:.2f} re f")
+
+    def line(self, x1, y1, x2, y2, color, width=1):
+        self.ops.append(f"{color[0]:.3f} {color[1]:.3f} {color[2]:.3f} RG {width} w "
+                        f"{x1:.2f} {y1:.2f} m {x2:.2f} {y2:.2f} l S")
+
+
+class PDFRenderer:
+    """Pure-Python, in-process PDF writer for GraniteGuard reports (no wkhtmltopdf process)"""
+
+    def render(self, document_name: str, sections: list, output_path: str) -> str:
+        """
+        Render a report to a PDF file
+
+        Args:
+            document_name: Name of the analyzed document
+            sections: List of (title, findings) where findings is an iterable of
+                (severity, text) pairs and severity is "high", "medium" or "low"
+            output_path: Destination PDF path
+
+        Returns:
+            output_path
+        """
+        pages = self._layout(document_name, sections)
+        with open(output_path, 'wb') as f:
+            f.write(self._serialize(pages))
+        return output_path
+
+    def _layout(self, document_name: str, sections: list) -> list:
+        content_width = PAGE_WIDTH - 2 * MARGIN
+        pages = [_Page()]
+        y = PAGE_HEIGHT - MARGIN
+
+        def ensure(height):
+            nonlocal y
+            if y - height < MARGIN + 20:
+                pages.append(_Page())
+                y = PAGE_HEIGHT - MARGIN
+
+        page = pages[-1]
+        title = "GraniteGuard Compliance Report"
+        page.text((PAGE_WIDTH - _text_width(title, 20, True)) / 2, y - 20, title, 20, True, _TITLE_COLOR)
+        subtitle = f"Document: {document_name}"
+        page.text((PAGE_WIDTH - _text_width(subtitle, 11)) / 2, y - 42, subtitle, 11)
+        stamp = f"Generated on {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        page.text(PAGE_WIDTH - MARGIN - _text_width(stamp, 9), y - 60, stamp, 9, color=_MUTED_COLOR)
+        page.line(MARGIN, y - 68, PAGE_WIDTH - MARGIN, y - 68, _HEADING_COLOR, 2)
+        y -= 96
+
+        for title, findings in sections:
+            ensure(40)
+            page = pages[-1]
+            page.text(MARGIN, y, title, 14, True, _HEADING_COLOR)
+            page.line(MARGIN, y - 5, PAGE_WIDTH - MARGIN, y - 5, (0.933, 0.933, 0.933))
+            y -= 24
+            # findings may be a generator, so peek at the first one instead of len()
+            findings = iter(findings)
+            first = next(findings, None) or (None, "No issues detected.")
+            for severity, text in itertools.chain([first], findings):
+                lines = _wrap(text, 10, content_width - 20)
+                # Long findings continue on the next page in page-sized pieces
+                while lines:
+                    ensure(34)
+                    page = pages[-1]
+                    fit = max(1, int((y - MARGIN - 20 - 12) // 13))
+                    block, lines = lines[:fit], lines[fit:]
+                    height = len(block) * 13 + 12
+                    bar, fill = SEVERITY_COLORS.get(severity, (_HEADING_COLOR, (1, 1, 1)))
+                    page.rect(MARGIN, y - height, content_width, height, fill)
+                    page.rect(MARGIN, y - height, 4, height, bar)
+                    for i, line in enumerate(block):
+                        page.text(MARGIN + 12, y - 15 - i * 13, line, 10)
+                    y -= height + 10
+            y -= 8
+
+        ensure(30)
+        footer = "Confidential - Generated by GraniteGuard AI | IBM TechXchange Hackathon"
+        pages[-1].text((PAGE_WIDTH - _text_width(footer, 8)) / 2, y - 10, footer, 8, color=_MUTED_COLOR)
+
+        for number, page in enumerate(pages, 1):
+            label = f"{number}/{len(pages)}"
+            page.text((PAGE_WIDTH - _text_width(label, 8)) / 2, MARGIN / 2, label, 8, color=_MUTED_COLOR)
+        return pages
+
+    @staticmethod
+    def _serialize(pages: list) -> bytes:
+        # Object numbers: 1 catalog, 2 page tree, 3-4 fonts, then (page, content) pairs
+        objects = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            None,
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"
+        ]
+        kids = []
+        for page in pages:
+            stream = zlib.compress("\n".join(page.ops).encode('latin-1'))
+            page_number = len(objects) + 1
+            kids.append(f"{page_number} 0 R")
+            objects.append(
+                f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+                f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {page_number + 1} 0 R >>".encode()
+            )
+            objects.append(f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode()
+                           + stream + b"\nendstream")
+        objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+        out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(len(out))
+            out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+        xref = len(out)
+        out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+        out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+        out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+        return bytes(out)
+
+
+def _render_job(job: tuple) -> str:
+    document_name, sections, output_path = job
+    return PDFRenderer().render(document_name, sections, output_path)
+
+
+# Shared render pools by worker count; guarded so concurrent batches never shut down a pool in use
+_render_pools = {}
+_render_pools_lock = threading.Lock()
+
+
+def render_batch(jobs: list, workers: int = 1) -> list:
+    """
+    Render many reports in one call
+
+    Args:
+        jobs: List of (document_name, sections, output_path) tuples
+        workers: Processes in the shared render pool; 1 renders in this process
+
+    Returns:
+        Output paths in job order
+    """
+    if workers <= 1 or len(jobs) <= 1:
+        renderer = PDFRenderer()
+        return [renderer.render(*job) for job in jobs]
+    # Long-lived pool: worker start-up is paid once, not per batch
+    with _render_pools_lock:
+        pool = _render_pools.get(workers)
+        if pool is None:
+            pool = _render_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return list(pool.map(_render_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
@@ -0,0 +1,284 @@
+import os
+import re
+import bisect
+import hashlib
+import logging
+from typing import NamedTuple
+from src.chunking import PAGE_BREAK
+from src.findings import Finding
+
+logger = logging.getLogger(__name__)
+
+PII_TYPES = ("iban", "card", "ssn", "routing", "account", "name")
+
+# Severity and regulation of the compliance finding raised when a document carries a PII type in clear
+_TYPE_FINDINGS = {
+    "iban": ("medium", "GDPR", "IBAN"),
+    "card": ("high", "PCI DSS", "payment card number"),
+    "ssn": ("high", "GLBA/CCPA", "Social Security number"),
+    "routing": ("low", "GLBA", "bank routing number"),
+    "account": ("medium", "GLBA/GDPR", "bank account number"),
+    "name": ("low", "GDPR/CCPA", "personal name"),
+}
+
+_LABEL_GAP = r"[\s:#.\-]{0,6}(?:no\.?|number|num)?[\s:#.\-]{0,4}"
+
+# One alternation so each window is scanned in one pass; labeled types capture
+# only the value in their *_value group. Candidates are checked by _VALIDATORS.
+_PII = re.compile(
+    r"(?P<iban>\b[A-Z]{2}\d{2}(?: ?[A-Z0-9]{4}){2,7}(?: ?[A-Z0-9]{1,3})?\b)"
+    r"|(?P<ssn>\b\d{3}-\d{2}-\d{4}\b"
+    rf"|(?i:\bssn|\bsocial security){_LABEL_GAP}(?P<ssn_value>\d{{3}}-?\d{{2}}-?\d{{4}})\b)"
+    rf"|(?P<routing>(?i:\brouting|\baba|\brtn|\btransit){_LABEL_GAP}(?P<routing_value>\d{{9}})\b)"
+    rf"|(?P<account>(?i:\bacc(?:oun)?t|\bacct){_LABEL_GAP}(?P<account_value>\d{{6,17}})\b)"
+    r"|(?P<card>\b\d(?:[ -]?\d){12,18}\b)"
+    r"|(?P<name>(?i:\b(?:account holder|beneficiary|customer|payee|full name|name))\s*:[ \t]*"
+    r"(?P<name_value>[A-Z][a-z]+(?:[ \t]+[A-Z][a-z'\-]*\.?){1,3}))"
+)
+
+_VALUE_GROUPS = {kind: f"{kind}_value" for kind in PII_TYPES if f"{kind}_value" in _PII.groupindex}
+
+# Running _PII over all text is slow (every position tries every branch), so a
+# cheap pass finds anchors first: on a copy with every digit mapped to "0" and
+# A-Z lowercased (same length, so offsets carry over), each numeric PII type
+# contains one of these literals. _PII then only runs on the run of digits,
+# capitals and single separators around an anchor, widened back over a label
+# when one precedes it, and on the text after a name label and colon.
+_SHAPE = str.maketrans("123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ", "000000000abcdefghijklmnopqrstuvwxyz")
+# Spaced IBAN/card groups join with a space; dash-joined cards need three groups
+# so invoice and reference numbers ("INV-2024-0042") do not anchor windows
+_DIGIT_ANCHORS = re.compile(r"000000|0000 0000|0000-0000-0000|000-00-0000")
+_VALUE_LABELS = re.compile(r"ssn|social security|routing|aba|rtn|transit|acc(?:oun)?t")
+# Name labels only count in front of a colon ("Payee: ..."), so colons anchor them
+_NAME_LABELS = ("name", "holder", "beneficiary", "customer", "payee")
+# Farther than a label and its gap reach ahead of a value, and than a name reaches past its colon
+_LABEL_REACH = 32
+_NAME_REACH = 80
+# Digits and capitals, crossing single spaces and dashes between them; matched
+# forward from an anchor and, on the reversed text, backward from it
+_RUN = re.compile(r"(?:[ -]?[0-9A-Z])*")
+# Farther back than an anchor can sit from the start of its value (a spaced 34-character IBAN)
+_RUN_REACH = 48
+
+# Placeholders carry a keyed hash of the value, so a value repeated across chunks keeps one placeholder
+_PLACEHOLDER = re.compile(r"\[(?:IBAN|CARD|SSN|ROUTING|ACCOUNT|NAME)_[0-9a-f]{8}\]")
+
+
+def _digits(value: str) -> str:
+    # Card and SSN candidates only separate their digits with spaces or dashes
+    return value.replace(" ", "").replace("-", "")
+
+
+def valid_iban(value: str) -> bool:
+    """ISO 13616 mod-97 check"""
+    compact = value.replace(" ", "")
+    if not 15 <= len(compact) <= 34:
+        return False
+    rearranged = compact[4:] + compact[:4]
+    return int("".join(str(int(char, 36)) for char in rearranged)) % 97 == 1
+
+
+_LUHN_DOUBLED = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+
+def valid_card(value: str) -> bool:
+    """Luhn check of a 13-19 digit payment card number"""
+    digits = _digits(value)
+    if not 13 <= len(digits) <= 19 or len(set(digits)) == 1:
+        return False
+    total = sum(map(int, digits[-1::-2])) + sum(_LUHN_DOUBLED[int(char)] for char in digits[-2::-2])
+    return total % 10 == 0
+
+
+def valid_ssn(value: str) -> bool:
+    """SSA structure rules: no 000/666/9xx area, 00 group or 0000 serial"""
+    digits = _digits(value)
+    if len(digits) != 9:
+        return False
+    area, group, serial = digits[:3], digits[3:5], digits[5:]
+    return area not in ("000", "666") and area[0] != "9" and group != "00" and serial != "0000"
+
+
+def valid_routing(value: str) -> bool:
+    """ABA routing number checksum: 3-7-1 weighted digit sum divisible by 10"""
+    digits = _digits(value)
+    if len(digits) != 9 or digits == "000000000":
+        return False
+    weights = (3, 7, 1) * 3
+    return sum(int(digit) * weight for digit, weight in zip(digits, weights)) % 10 == 0
+
+
+_VALIDATORS = {"iban": valid_iban, "card": valid_card, "ssn": valid_ssn, "routing": valid_routing}
+
+
+class PIIMatch(NamedTuple):
+    kind: str
+    start: int
+    end: int
+    value: str
+
+
+def _windows(text: str) -> list:
+    """Merged (start, end) spans that can hold a PII match, widened to whole words"""
+    shape = text.translate(_SHAPE)
+    reverse = text[::-1]
+    size = len(text)
+    spans = []
+    run_end = 0
+    for anchor in _DIGIT_ANCHORS.finditer(shape):
+        if anchor.start() < run_end:
+            continue
+        limit = max(run_end, anchor.start() - _RUN_REACH)
+        start = size - _RUN.match(reverse, size - anchor.start(), size - limit).end()
+        run_end = _RUN.match(text, anchor.end()).end()
+        if _VALUE_LABELS.search(shape, max(0, start - _LABEL_REACH), start):
+            start = max(0, start - _LABEL_REACH)
+        spans.append((start, run_end))
+    position = shape.find(":")
+    while position != -1:
+        if shape[max(0, position - 16):position].rstrip().endswith(_NAME_LABELS):
+            spans.append((max(0, position - _LABEL_REACH), min(len(text), position + _NAME_REACH)))
+        position = shape.find(":", position + 1)
+    spans.sort()
+
+    windows = []
+    for start, end in spans:
+        if windows and start <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], end)
+        else:
+            windows.append([start, end])
+    for window in windows:
+        # Never cut a number or word in two: _PII would see a shorter value at the edge
+        while window[0] > 0 and text[window[0] - 1].isalnum():
+            window[0] -= 1
+        while window[1] < len(text) and text[window[1]].isalnum():
+            window[1] += 1
+    return windows
+
+
+def mask(value: str) -> str:
+    """Display form keeping only the last four characters"""
+    compact = value.replace(" ", "").replace("-", "")
+    return "*" * max(len(compact) - 4, 4) + compact[-4:] if len(compact) > 4 else "****"
+
+
+def restore(text: str, placeholders: dict) -> str:
+    """Put the original values back in place of the placeholders of a redacted text"""
+    if not placeholders or not text:
+        return text
+    return _PLACEHOLDER.sub(lambda match: placeholders.get(match.group(0), match.group(0)), text)
+
+
+class PIIScanner:
+    def __init__(self, types=PII_TYPES, redact_prompts: bool = True, max_findings: int = 200):
+        """
+        Local detector of personal and payment data in extracted document text
+
+        Args:
+            types: PII types reported and redacted (see PII_TYPES)
+            redact_prompts: Replace detected values with placeholders before text is sent to the model
+            max_findings: Individual matches listed in the results; totals are always complete
+        """
+        unknown = set(types) - set(PII_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown PII types: {sorted(unknown)}")
+        self.types = frozenset(types)
+        self.redact_prompts = redact_prompts
+        self.max_findings = max_findings
+        # Per-process key, so a placeholder cannot be matched against hashes of guessed values
+        self._key = os.urandom(16)
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """Build the scanner from the `pii` section of config.yaml, or None if disabled"""
+        settings = (config or {}).get('pii', {})
+        if not settings.get('enabled', False):
+            return None
+        return cls(types=settings.get('types', PII_TYPES),
+                   redact_prompts=settings.get('redact_prompts', True),
+                   max_findings=settings.get('max_findings', 200))
+
+    def scan(self, text: str) -> list:
+        """All validated PII in the text, in document order"""
+        matches = []
+        for start, end in _windows(text):
+            for match in _PII.finditer(text, start, end):
+                # The outer group closes last, so lastgroup is the type even when a value group matched
+                kind = match.lastgroup
+                if kind not in self.types:
+                    continue
+                group = _VALUE_GROUPS.get(kind)
+                if group is None or match.group(group) is None:
+                    group = kind
+                value = match.group(group)
+                validator = _VALIDATORS.get(kind)
+                if validator and not validator(value):
+                    continue
+                matches.append(PIIMatch(kind, match.start(group), match.end(group), value))
+        return matches
+
+    def placeholder(self, match: PIIMatch) -> str:
+        digest = hashlib.blake2b(match.value.encode("utf-8"), digest_size=4, key=self._key).hexdigest()
+        return f"[{match.kind.upper()}_{digest}]"
+
+    def redact(self, text: str, matches: list, offset: int = 0) -> tuple:
+        """
+        Replace PII in a slice of the scanned document with placeholders
+
+        Args:
+            text: The slice, e.g. a chunk's text
+            matches: scan() result for the whole document
+            offset: Character offset of the slice in the scanned document
+
+        Returns:
+            (redacted text, {placeholder: original value}) for restore()
+        """
+        end = offset + len(text)
+        # Matches are sorted and disjoint; one starting before the slice may still reach into it
+        first = max(bisect.bisect_left(matches, offset, key=lambda match: match.start) - 1, 0)
+        pieces, placeholders, position = [], {}, 0
+        for match in matches[first:]:
+            if match.start >= end:
+                break
+            if match.end <= offset:
+                continue
+            # A value cut by the slice edge is still replaced whole, never sent in part
+            placeholder = self.placeholder(match)
+            placeholders[placeholder] = match.value
+            pieces.append(text[position:max(match.start - offset, 0)])
+            pieces.append(placeholder)
+            position = min(match.end, end) - offset
+        pieces.append(text[position:])
+        return "".join(pieces), placeholders
+
+    def report(self, matches: list, document_text: str) -> dict:
+        """Structured, masked PII findings for the analysis results"""
+        breaks = ([match.start() for match in re.finditer(re.escape(PAGE_BREAK), document_text)]
+                  if PAGE_BREAK in document_text else None)
+        listed = []
+        for match in matches[:self.max_findings]:
+            entry = {"type": match.kind, "start": match.start, "end": match.end, "masked": mask(match.value),
+                     "validated": match.kind in _VALIDATORS}
+            if breaks is not None:
+                entry["page"] = bisect.bisect_right(breaks, match.start) + 1
+            listed.append(entry)
+        counts = {}
+        for match in matches:
+            counts[match.kind] = counts.get(match.kind, 0) + 1
+        return {"counts": counts, "matches": listed, "truncated": len(matches) > len(listed)}
+
+    def findings(self, matches: list) -> list:
+        """One compliance Finding per PII type present in the document, pointing at its first occurrence"""
+        first = {}
+        counts = {}
+        for match in matches:
+            first.setdefault(match.kind, match)
+            counts[match.kind] = counts.get(match.kind, 0) + 1
+        findings = []
+        for kind, match in first.items():
+            severity, regulation, label = _TYPE_FINDINGS[kind]
+            findings.append(Finding(
+                message=f"Document contains {counts[kind]} unredacted {label}{'s' if counts[kind] > 1 else ''}",
+                severity=severity, analyzer="compliance", source="pii", regulation=regulation,
+                evidence=mask(match.value), start=match.start, end=match.end, confidence=1.0))
+        return findings
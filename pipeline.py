@@ -0,0 +1,177 @@
+import os
+import logging
+from datetime import datetime
+from src.document_processing import as_source, is_path
+from src.findings import Finding
+from src.incremental import PreviousVersion
+from src.metrics import ANALYSIS_SECONDS, CACHE_LOOKUPS, ERRORS
+from src.tabular_analysis import add_tabular_findings
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisPipeline:
+    def __init__(self, config: dict, document_processor, orchestrator,
+                 result_cache=None, tabular_analyzer=None):
+        """
+        Extract and analyze a document, consulting the result cache first
+
+        Args:
+            config: Parsed config.yaml
+            document_processor: DocumentProcessor used for text extraction
+            orchestrator: AnalysisOrchestrator running both analyzers
+            result_cache: Optional ResultCache; None disables caching
+            tabular_analyzer: Optional TabularFraudAnalyzer for CSV/XLSX transaction files
+        """
+        self.config = config
+        self.document_processor = document_processor
+        self.orchestrator = orchestrator
+        self.result_cache = result_cache
+        self.tabular_analyzer = tabular_analyzer
+        self.extraction = config.get('extraction', {})
+        self.incremental = config.get('incremental', {}).get('enabled', False)
+
+    def extract(self, file_path, document_hash: str = None, name: str = None) -> str:
+        """Extract document text (from a path or stream), reusing a cached extraction of identical bytes"""
+        text_key = None
+        if self.result_cache and document_hash:
+            text_key = self.result_cache.make_key("text", document_hash, self.extraction)
+            cached = self.result_cache.get(text_key)
+            CACHE_LOOKUPS.inc(kind="text", result="miss" if cached is None else "hit")
+            if cached is not None:
+                return cached
+
+        document_text = self.document_processor.extract_text(
+            file_path,
+            max_pages=self.extraction.get('max_pages'),
+            max_chars=self.extraction.get('max_chars'),
+            workers=self.extraction.get('pdf_workers', 1),
+            pages_per_task=self.extraction.get('pages_per_task', 25),
+            max_rows=self.extraction.get('max_rows'),
+            max_cells=self.extraction.get('max_cells'),
+            name=name
+        )
+        if text_key:
+            self.result_cache.set(text_key, document_text)
+        return document_text
+
+    def analyze_file(self, file_path, on_finding=None, name: str = None, document_id: str = None) -> dict:
+        """
+        Run extraction and both analyzers on a file
+
+        Args:
+            file_path: Path to the uploaded document, or its bytes or binary stream
+                (e.g. the upload's spooled buffer, so it never touches the upload folder)
+            on_finding: Optional callback receiving partial findings while the model
+                replies stream in; not called for cached analyses
+            name: Original file name, required when file_path is not a path
+            document_id: Client-supplied id shared by the versions of one document. With
+                `incremental` enabled, a new version only sends its changed chunks to the
+                model; without an id every upload is analyzed in full
+
+        Returns:
+            Dictionary with compliance_results, fraud_results, document_length,
+            cache_hit (True when the analysis came from the cache) and, for a new
+            version of a known document, changes (see PreviousVersion.summary)
+        """
+        file_path = as_source(file_path)
+        name = name or (file_path if is_path(file_path) else getattr(file_path, 'name', None))
+        if is_path(name):
+            name = os.fspath(name)
+        document_hash = None
+        analysis_key = None
+        if self.result_cache:
+            document_hash = self.result_cache.hash_file(file_path)
+            analysis_key = self.result_cache.make_key("analysis", document_hash, self._analysis_fingerprint())
+            cached = self.result_cache.get(analysis_key)
+            CACHE_LOOKUPS.inc(kind="analysis", result="miss" if cached is None else "hit")
+            if cached is not None:
+                logger.info(f"Result cache hit for document {document_hash[:12]}")
+                fraud_detector = self.orchestrator.fraud_detector
+                if getattr(fraud_detector, 'entity_index', None):
+                    # The analysis is reused, but this upload is itself a new "seen before" occurrence
+                    document_text = self.extract(file_path, document_hash, name)
+                    cached['fraud_results'] = fraud_detector.refresh_cross_document_findings(
+                        cached['fraud_results'], document_text, document_id)
+                return dict(cached, cache_hit=True)
+
+        # Structured checks run on the table itself, before it is flattened to text
+        tabular_findings = []
+        if self.tabular_analyzer and isinstance(name, str) and self.tabular_analyzer.supports(name):
+            try:
+                tabular_findings = self.tabular_analyzer.analyze_file(file_path, name)
+            except Exception as e:
+                # Supplementary stage: the text analysis still runs without it
+                logger.error(f"Tabular checks failed for {name}: {e}")
+                ERRORS.inc(stage="tabular")
+            if on_finding:
+                for finding in tabular_findings:
+                    on_finding(Finding.from_tabular(finding))
+
+        document_text = self.extract(file_path, document_hash, name)
+        logger.info(f"Document text extracted: {len(document_text)} characters")
+
+        version_key, previous = self._previous_version(document_id, document_text)
+        with ANALYSIS_SECONDS.time():
+            compliance_results, fraud_results = self.orchestrator.analyze(document_text, on_finding, previous,
+                                                                          document_id)
+        for stage, analysis in (("compliance", compliance_results), ("fraud", fraud_results)):
+            if analysis.get('error'):
+                ERRORS.inc(stage=stage)
+        fraud_results = add_tabular_findings(fraud_results, tabular_findings)
+        results = {
+            "compliance_results": compliance_results,
+            "fraud_results": fraud_results,
+            "document_length": len(document_text)
+        }
+        # Failed, timed-out or partial (some sections errored) analyses are retried on the next
+        # upload rather than cached
+        complete = all(not analysis.get('error') and not analysis.get('section_errors')
+                       for analysis in (compliance_results, fraud_results))
+        if analysis_key and complete:
+            self.result_cache.set(analysis_key, results)
+            if version_key:
+                self.result_cache.set(version_key, {
+                    "document_hash": document_hash,
+                    "analyzed_at": str(datetime.now()),
+                    "text": document_text,
+                    "compliance": {"chunks": compliance_results.get('chunk_digests', []),
+                                   "findings": compliance_results.get('findings', [])},
+                    "fraud": {"chunks": fraud_results.get('chunk_digests', []),
+                              "findings": fraud_results.get('findings', [])}
+                })
+        if previous is not None:
+            results = dict(results, changes=previous.summary({"compliance": compliance_results,
+                                                              "fraud": fraud_results}))
+        return dict(results, cache_hit=False)
+
+    def _previous_version(self, document_id, document_text: str) -> tuple:
+        """(version key, PreviousVersion or None) of a document, when incremental analysis is on"""
+        # Only an explicit id links versions: file names such as "invoice.pdf" repeat across
+        # unrelated documents, whose findings would be carried over into each other
+        if not (self.incremental and self.result_cache and isinstance(document_id, str) and document_id):
+            return None, None
+        # The fingerprint keeps findings from another model, prompt or chunking out of the new version
+        version_key = self.result_cache.make_key("version", document_id, self._analysis_fingerprint())
+        record = self.result_cache.get(version_key)
+        CACHE_LOOKUPS.inc(kind="version", result="miss" if record is None else "hit")
+        if record is None:
+            return version_key, None
+        logger.info(f"Previous version of {document_id} found, analyzed {record.get('analyzed_at')}")
+        return version_key, PreviousVersion(record, document_text)
+
+    def _analysis_fingerprint(self) -> dict:
+        """Everything besides the document bytes that changes analysis output"""
+        return {
+            "model_id": self.config['model']['model_id'],
+            "backend": self.config['model'].get('backend', 'watsonx'),
+            "context_window": self.config['model'].get('context_window'),
+            "generation": self.config.get('generation', {}),
+            "compliance_prompt": getattr(self.orchestrator.compliance_checker, 'PROMPT_VERSION', None),
+            "fraud_prompt": getattr(self.orchestrator.fraud_detector, 'PROMPT_VERSION', None),
+            "analysis": self.config.get('analysis', {}),
+            "prescreen": self.config.get('prescreen', {}),
+            "semantic_cache": self.config.get('semantic_cache', {}),
+            "pii": self.config.get('pii', {}),
+            "tabular": self.config.get('tabular', {})
+        }
@@ -1,11 +1,42 @@
 import pdfkit
 from datetime import datetime
+from functools import lru_cache
 import os
+import re
 import platform
 import logging
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup, escape
+from src.findings import Finding
+from src.metrics import ERRORS, REPORT_SECONDS
+from src.pdf_renderer import PDFRenderer, render_batch
 
 logger = logging.getLogger(__name__)
 
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_templates")
+
+# "HIGH RISK: ..." prefix written by Finding.__str__
+_SEVERITY_PREFIX = re.compile(r"\s*(HIGH|MEDIUM|LOW) RISK\b")
+
+
+def _nl2br(text) -> Markup:
+    return Markup("<br>").join(escape(line) for line in str(text).split("\n"))
+
+
+@lru_cache(maxsize=None)
+def _report_template(name: str = "report.html"):
+    """Compiled report template; the environment is built and the template parsed once per process"""
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=select_autoescape(["html"]),
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True
+    )
+    env.filters['nl2br'] = _nl2br
+    return env.get_template(name)
+
+
 class ReportGenerator:
     @staticmethod
     def _get_wkhtmltopdf_path():
@@ -28,7 +59,8 @@ class ReportGenerator:
     def generate_pdf_report(document_name: str, 
                           compliance_results: dict, 
                           fraud_results: dict,
-                          output_dir: str = "reports") -> str:
+                          output_dir: str = "reports",
+                          backend: str = "builtin") -> str:
         """
         Generate a PDF report from analysis results
         
@@ -37,22 +69,41 @@ class ReportGenerator:
             compliance_results: Dictionary of compliance findings
             fraud_results: Dictionary of fraud indicators
             output_dir: Output directory path
+            backend: "builtin" (in-process PDF writer), "pdfkit" (wkhtmltopdf)
+                or "html" (skip PDF rendering entirely)
             
         Returns:
             Path to the generated PDF file or HTML file if PDF generation fails
         """
+        with REPORT_SECONDS.time(backend=backend):
+            return ReportGenerator._render_report(document_name, compliance_results, fraud_results,
+                                                  output_dir, backend)
+
+    @staticmethod
+    def _render_report(document_name: str, compliance_results: dict, fraud_results: dict,
+                       output_dir: str, backend: str) -> str:
         os.makedirs(output_dir, exist_ok=True)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base_path = os.path.join(output_dir, f"Compliance_Report_{document_name}_{timestamp}")
         
-        # Generate HTML content first
-        html_content = ReportGenerator._generate_html_content(document_name, compliance_results, fraud_results)
+        if backend == "builtin":
+            try:
+                pdf_path = PDFRenderer().render(
+                    document_name,
+                    ReportGenerator._sections(compliance_results, fraud_results),
+                    base_path + ".pdf"
+                )
+                logger.info(f"PDF report generated successfully: {pdf_path}")
+                return pdf_path
+            except Exception as e:
+                logger.warning(f"PDF generation failed, falling back to HTML: {str(e)}")
         
         # Try to generate PDF, fall back to HTML if wkhtmltopdf not available
-        wkhtmltopdf_path = ReportGenerator._get_wkhtmltopdf_path()
+        wkhtmltopdf_path = ReportGenerator._get_wkhtmltopdf_path() if backend == "pdfkit" else None
         
         if wkhtmltopdf_path:
             try:
-                pdf_path = os.path.join(output_dir, f"Compliance_Report_{document_name}_{timestamp}.pdf")
+                pdf_path = base_path + ".pdf"
                 
                 # Configure pdfkit
                 config = pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
@@ -70,7 +121,7 @@ class ReportGenerator:
                 }
 
                 pdfkit.from_string(
-                    html_content,
+                    ReportGenerator._generate_html_content(document_name, compliance_results, fraud_results),
                     pdf_path,
                     configuration=config,
                     options=options
@@ -82,78 +133,107 @@ class ReportGenerator:
                 logger.warning(f"PDF generation failed, falling back to HTML: {str(e)}")
         
         # Fall back to HTML generation
-        html_path = os.path.join(output_dir, f"Compliance_Report_{document_name}_{timestamp}.html")
+        html_path = base_path + ".html"
         try:
-            with open(html_path, 'w', encoding='utf-8') as f:
-                f.write(html_content)
+            ReportGenerator.write_html_report(html_path, document_name, compliance_results, fraud_results)
             logger.info(f"HTML report generated successfully: {html_path}")
             return html_path
         except Exception as e:
             logger.error(f"HTML generation failed: {str(e)}")
+            ERRORS.inc(stage="report")
             raise RuntimeError(f"Report generation failed: {str(e)}")
 
     @staticmethod
-    def _generate_html_content(document_name: str, compliance_results: dict, fraud_results: dict) -> str:
-        """Generate HTML content for the report"""
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="UTF-8">
-            <title>Compliance Report - {document_name}</title>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; margin: 0; padding: 20px; }}
-                .header {{ text-align: center; border-bottom: 2px solid #3498db; padding-bottom: 10px; }}
-                h1 {{ color: #2c3e50; }}
-                h2 {{ color: #3498db; border-bottom: 1px solid #eee; padding-bottom: 5px; }}
-                .finding {{ margin-bottom: 15px; padding: 10px; border-left: 4px solid #3498db; }}
-                .severity-high {{ border-left-color: #e74c3c; background-color: #fadbd8; }}
-                .severity-medium {{ border-left-color: #f39c12; background-color: #fdebd0; }}
-                .severity-low {{ border-left-color: #2ecc71; background-color: #d5f5e3; }}
-                .timestamp {{ color: #7f8c8d; font-size: 0.9em; text-align: right; }}
-                .footer {{ font-size: 0.8em; text-align: center; color: #7f8c8d; margin-top: 30px; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <h1>GraniteGuard Compliance Report</h1>
-                <p>Document: <strong>{document_name}</strong></p>
-                <p class="timestamp">Generated on {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}</p>
-            </div>
-            
-            <h2>Compliance Findings</h2>
-            {ReportGenerator._format_findings(compliance_results.get('compliance_issues', []))}
-            
-            <h2>Fraud Indicators</h2>
-            {ReportGenerator._format_findings(fraud_results.get('fraud_indicators', []))}
-            
-            <div class="footer">
-                <p>Confidential - Generated by GraniteGuard AI | IBM TechXchange Hackathon</p>
-            </div>
-        </body>
-        </html>
+    def write_html_report(html_path: str, document_name: str, compliance_results: dict, fraud_results: dict) -> str:
         """
+        Stream the HTML report to a file, one finding at a time
+        
+        Findings are pulled lazily from the result lists while the template
+        renders, so the report is never held in memory as a single string.
+        
+        Returns:
+            html_path
+        """
+        stream = _report_template().stream(ReportGenerator._template_context(
+            document_name, compliance_results, fraud_results))
+        # Flush to the file every few dozen template chunks
+        stream.enable_buffering(64)
+        with open(html_path, 'w', encoding='utf-8') as f:
+            stream.dump(f)
+        return html_path
 
     @staticmethod
-    def _format_findings(findings: list) -> str:
-        """Format findings list into HTML"""
-        if not findings:
-            return "<p>No issues detected.</p>"
+    def generate_reports(reports: list,
+                         output_dir: str = "reports",
+                         backend: str = "builtin",
+                         workers: int = 1) -> list:
+        """
+        Generate many reports in one call
         
-        formatted = []
-        for finding in findings:
-            # Determine severity class
-            severity_class = "severity-medium"
-            if isinstance(finding, str):
-                if "high" in finding.lower():
-                    severity_class = "severity-high"
-                elif "low" in finding.lower():
-                    severity_class = "severity-low"
+        Args:
+            reports: List of dicts with document_name, compliance_results and fraud_results
+            output_dir: Output directory path
+            backend: Same choices as generate_pdf_report
+            workers: Processes used by the builtin renderer's shared pool
             
-            formatted.append(f"""
-            <div class="finding {severity_class}">
-                {finding.replace(chr(10), '<br>') if isinstance(finding, str) else str(finding)}
-            </div>
-            """)
+        Returns:
+            Report paths in input order
+        """
+        if backend != "builtin":
+            return [ReportGenerator.generate_pdf_report(output_dir=output_dir, backend=backend, **report)
+                    for report in reports]
         
-        return "\n".join(formatted)
\ No newline at end of file
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        jobs = [
+            (report['document_name'],
+             # Materialized: jobs are pickled to the render pool
+             [(title, list(findings)) for title, findings
+              in ReportGenerator._sections(report['compliance_results'], report['fraud_results'])],
+             os.path.join(output_dir, f"Compliance_Report_{report['document_name']}_{timestamp}_{i}.pdf"))
+            for i, report in enumerate(reports)
+        ]
+        paths = render_batch(jobs, workers)
+        logger.info(f"{len(paths)} PDF reports generated in {output_dir}")
+        return paths
+
+    @staticmethod
+    def _sections(compliance_results: dict, fraud_results: dict) -> list:
+        """Report sections as (title, findings) with findings yielding (severity, text) pairs"""
+        return [
+            ("Compliance Findings", ReportGenerator._findings(compliance_results, 'compliance_issues')),
+            ("Fraud Indicators", ReportGenerator._findings(fraud_results, 'fraud_indicators'))
+        ]
+
+    @staticmethod
+    def _findings(results: dict, key: str):
+        """Lazily pair each finding with its severity, preferring structured findings"""
+        if results.get('findings'):
+            for data in results['findings']:
+                yield data.get('severity', 'medium'), str(Finding.from_dict(data))
+            for error in results.get('section_errors', []):
+                yield "medium", error
+            return
+        # Errors, timeouts, "nothing found" placeholders and results cached before structured findings
+        for finding in results.get(key, []):
+            yield ReportGenerator._severity(finding), str(finding)
+
+    @staticmethod
+    def _severity(finding) -> str:
+        """Severity of a display string from its "SEVERITY RISK:" label; medium when unlabelled"""
+        match = _SEVERITY_PREFIX.match(str(finding))
+        return match.group(1).lower() if match else "medium"
+
+    @staticmethod
+    def _template_context(document_name: str, compliance_results: dict, fraud_results: dict) -> dict:
+        return {
+            "document_name": document_name,
+            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "sections": ReportGenerator._sections(compliance_results, fraud_results)
+        }
+
+    @staticmethod
+    def _generate_html_content(document_name: str, compliance_results: dict, fraud_results: dict) -> str:
+        """Generate HTML content for the report"""
+        return _report_template().render(ReportGenerator._template_context(
+            document_name, compliance_results, fraud_results))
@@ -0,0 +1,345 @@
+import os
+import time
+import random
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import requests
+from src.generation import Generation
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the model while the circuit breaker is open"""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Thread-safe token-bucket rate limiter
+
+        Args:
+            rate: Tokens added per second
+            burst: Bucket capacity, i.e. requests allowed back to back (default: rate)
+            clock: Monotonic time source, injectable for tests
+            sleep: Sleep function, injectable for tests
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, blocking until one is available; returns the seconds waited"""
+        waited = 0.0
+        while delay := self._take():
+            self._sleep(delay)
+            waited += delay
+        return waited
+
+    def _take(self) -> float:
+        """Take one token and return 0 if one is available, otherwise the seconds until one is"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+class SharedTokenBucket(TokenBucket):
+    def __init__(self, path: str, rate: float, burst: int = None, clock=time.time, sleep=time.sleep):
+        """
+        Token bucket kept in a SQLite file, shared by every process using the same path
+
+        Gunicorn workers each build their own model clients; with a per-process
+        TokenBucket the deployment would send workers x rate requests per second.
+
+        Args:
+            path: SQLite file holding the bucket state
+            rate: Tokens added per second, across all processes
+            burst: Bucket capacity (default: rate)
+            clock: Wall-clock time source shared by the processes, injectable for tests
+            sleep: Sleep function, injectable for tests
+        """
+        super().__init__(rate, burst, clock, sleep)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS bucket ("
+                           " id INTEGER PRIMARY KEY CHECK (id = 0),"
+                           " tokens REAL NOT NULL,"
+                           " updated REAL NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO bucket VALUES (0, ?, ?)", (float(self.capacity), clock()))
+
+    def _take(self) -> float:
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so two processes cannot spend the same token
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                tokens, updated = self._conn.execute("SELECT tokens, updated FROM bucket").fetchone()
+                now = max(self._clock(), updated)
+                tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+                delay = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+                if not delay:
+                    tokens -= 1
+                self._conn.execute("UPDATE bucket SET tokens = ?, updated = ?", (tokens, now))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return delay
+
+
+class Backoff:
+    def __init__(self, base_delay: float = 0.5, max_delay: float = 20.0, rng: random.Random = None):
+        """
+        Exponential backoff with full jitter
+
+        Args:
+            base_delay: Upper bound of the first delay (seconds)
+            max_delay: Cap on any single delay (seconds)
+            rng: Random source, injectable for tests
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt: int, retry_after: float = None) -> float:
+        """Delay before retry number `attempt` (0-based); a server Retry-After takes precedence"""
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        """
+        Fail fast while the model endpoint is unhealthy
+
+        After `failure_threshold` consecutive failures the circuit opens and
+        calls are rejected for `reset_timeout` seconds. Then a single trial
+        call is let through (half-open): success closes the circuit, failure
+        opens it again.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_running = False
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            remaining = max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+            raise CircuitOpenError(f"Model endpoint circuit is open; retry in {remaining:.0f}s")
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("Model endpoint recovered, circuit closed")
+            self.state = CLOSED
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    logger.warning(f"Model endpoint unhealthy after {self._failures} failures, circuit opened")
+                self.state = OPEN
+                self._opened_at = self._clock()
+                self._trial_running = False
+
+
+def is_retryable(error: Exception, statuses=RETRY_STATUSES) -> bool:
+    """True for throttling, transient server errors, timeouts and dropped connections"""
+    if isinstance(error, requests.HTTPError):
+        return error.response is not None and error.response.status_code in statuses
+    return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def retry_after_seconds(error: Exception):
+    """Seconds from a Retry-After header on an HTTP error, if the server sent one"""
+    response = getattr(error, 'response', None)
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        # HTTP-date form; fall back to our own backoff
+        return None
+
+
+class ResilientBackend:
+    def __init__(self, backend,
+                 rate_limiter: TokenBucket = None,
+                 breaker: CircuitBreaker = None,
+                 max_retries: int = 3,
+                 backoff: Backoff = None,
+                 retry_statuses=RETRY_STATUSES,
+                 hedge_delay: float = None,
+                 hedge_workers: int = 16,
+                 sleep=time.sleep):
+        """
+        Wrap a model backend with rate limiting, retries, a circuit breaker and hedging
+
+        Args:
+            backend: Backend with generate_text(prompt, params) and close(); generate() and
+                generate_stream(prompt, params, on_text) are used when present
+            rate_limiter: Token bucket shared by every thread using this backend
+            breaker: Circuit breaker; None disables fail-fast
+            max_retries: Retries after the first attempt for retryable errors
+            backoff: Delay policy between retries
+            retry_statuses: HTTP statuses treated as transient
+            hedge_delay: Seconds to wait before sending a duplicate request; None disables hedging
+            hedge_workers: Threads available for hedged requests
+            sleep: Sleep function, injectable for tests
+        """
+        self.backend = backend
+        self.model_id = getattr(backend, 'model_id', None)
+        self.rate_limiter = rate_limiter
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.backoff = backoff or Backoff()
+        self.retry_statuses = tuple(retry_statuses)
+        self.hedge_delay = hedge_delay
+        self._sleep = sleep
+        self._hedge_pool = ThreadPoolExecutor(max_workers=hedge_workers, thread_name_prefix="hedge") if hedge_delay else None
+
+    @classmethod
+    def from_config(cls, config: dict, backend):
+        """Wrap a backend per the `resilience` section of config.yaml; returned unchanged if disabled"""
+        settings = (config or {}).get('resilience', {})
+        if not settings.get('enabled', False):
+            return backend
+        rate_limit = settings.get('rate_limit', {})
+        retry = settings.get('retry', {})
+        circuit = settings.get('circuit_breaker', {})
+        hedging = settings.get('hedging', {})
+        rate = rate_limit.get('requests_per_second')
+        rate_limiter = None
+        if rate and rate_limit.get('shared_path'):
+            rate_limiter = SharedTokenBucket(rate_limit['shared_path'], rate, rate_limit.get('burst'))
+        elif rate:
+            rate_limiter = TokenBucket(rate, rate_limit.get('burst'))
+        return cls(
+            backend,
+            rate_limiter=rate_limiter,
+            breaker=CircuitBreaker(circuit.get('failure_threshold', 5), circuit.get('reset_timeout', 30))
+            if circuit.get('enabled', True) else None,
+            max_retries=retry.get('max_retries', 3),
+            backoff=Backoff(retry.get('base_delay', 0.5), retry.get('max_delay', 20)),
+            retry_statuses=retry.get('statuses', RETRY_STATUSES),
+            hedge_delay=hedging.get('delay') if hedging.get('enabled', False) else None,
+            hedge_workers=hedging.get('max_workers', 16)
+        )
+
+    def generate_text(self, prompt: str, params: dict = None) -> str:
+        return self.generate(prompt, params).text
+
+    def generate(self, prompt: str, params: dict = None) -> Generation:
+        return self._retrying(lambda: self._hedged(prompt, params))
+
+    def generate_stream(self, prompt: str, params: dict = None, on_text=None) -> Generation:
+        """
+        Streaming generation; rate limited and circuit broken like generate()
+
+        Text already passed to on_text cannot be taken back, so a stream is
+        only retried when it fails before its first piece. Streams are never hedged.
+        """
+        received = []
+
+        def forward(text):
+            received.append(text)
+            if on_text:
+                on_text(text)
+
+        return self._retrying(lambda: self._call(prompt, params, forward), lambda: not received)
+
+    def _retrying(self, call, can_retry=lambda: True) -> Generation:
+        for attempt in range(self.max_retries + 1):
+            if self.breaker:
+                self.breaker.allow()
+            try:
+                return call()
+            except Exception as e:
+                if attempt == self.max_retries or not can_retry() or not is_retryable(e, self.retry_statuses):
+                    raise
+                delay = self.backoff.delay(attempt, retry_after_seconds(e))
+                logger.warning(f"Model call failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                self._sleep(delay)
+
+    def _hedged(self, prompt: str, params: dict) -> Generation:
+        """Send a duplicate request if the first is slower than hedge_delay; first success wins"""
+        if not self._hedge_pool:
+            return self._call(prompt, params)
+        primary = self._hedge_pool.submit(self._call, prompt, params)
+        done, _ = wait([primary], timeout=self.hedge_delay)
+        if done:
+            return primary.result()
+        logger.info(f"Model call slower than {self.hedge_delay}s, sending hedged request")
+        pending = {primary, self._hedge_pool.submit(self._call, prompt, params)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _call(self, prompt: str, params: dict, on_text=None) -> Generation:
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        try:
+            if on_text is not None and hasattr(self.backend, 'generate_stream'):
+                result = self.backend.generate_stream(prompt, params, on_text)
+            elif hasattr(self.backend, 'generate'):
+                result = self.backend.generate(prompt, params)
+            else:
+                result = Generation(self.backend.generate_text(prompt, params))
+        except Exception as e:
+            if self.breaker:
+                # A client error (bad request, auth) still means the endpoint answered
+                if is_retryable(e, self.retry_statuses):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+            raise
+        if self.breaker:
+            self.breaker.record_success()
+        if on_text is not None and not hasattr(self.backend, 'generate_stream') and result.text:
+            on_text(result.text)
+        return result
+
+    def close(self):
+        if self._hedge_pool:
+            self._hedge_pool.shutdown(wait=False)
+        self.backend.close()
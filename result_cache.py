@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from src.document_processing import is_path
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    def __init__(self, path: str = "cache/results.sqlite3",
+                 max_size_mb: float = 512,
+                 ttl_hours: float = 168):
+        """
+        Persistent content-addressed cache backed by SQLite
+
+        Args:
+            path: SQLite database file; survives restarts
+            max_size_mb: Least recently used entries are evicted above this size
+            ttl_hours: Entries older than this are treated as misses and evicted
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.ttl_seconds = ttl_hours * 3600
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """Build the cache from the `cache` section of config.yaml, or None if disabled"""
+        settings = (config or {}).get('cache', {})
+        if not settings.get('enabled', False):
+            return None
+        return cls(path=settings.get('path', "cache/results.sqlite3"),
+                   max_size_mb=settings.get('max_size_mb', 512),
+                   ttl_hours=settings.get('ttl_hours', 168))
+
+    @staticmethod
+    def hash_file(file_path) -> str:
+        """SHA-256 of a file's bytes, read in blocks; accepts a path or a seekable binary stream"""
+        digest = hashlib.sha256()
+        if not is_path(file_path):
+            file_path.seek(0)
+            for block in iter(lambda: file_path.read(1024 * 1024), b""):
+                digest.update(block)
+            file_path.seek(0)
+            return digest.hexdigest()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Stable key from JSON-serializable parts (hashes, model ids, parameters)"""
+        encoded = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss or expired entry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key: str, value):
+        """Store a JSON-serializable value, evicting old entries if over budget"""
+        encoded = json.dumps(value, default=str)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, len(encoded), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Walk entries oldest-access first until enough space is freed
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        logger.debug(f"Result cache evicted {len(victims)} least recently used entries")
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"entries": entries, "size_bytes": size, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,155 @@
+import re
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ("high", "medium", "low")
+
+# How analyzers use rule hits to avoid model calls
+PRESCREEN_MODES = (
+    "annotate",        # add rule findings, always call the model
+    "skip_clean",      # skip the model entirely when a document has no rule hits
+    "flagged_chunks"   # only send chunks with rule hits to the model
+)
+
+
+def _term_regex(term: str) -> str:
+    """Regex for a keyword/phrase: whole words, any whitespace between words"""
+    return r"\s+".join(re.escape(word) for word in term.split())
+
+
+def _normalize(term: str) -> str:
+    return " ".join(term.lower().split())
+
+
+class RuleEngine:
+    def __init__(self, rules: list):
+        """
+        Single-pass keyword rule engine for pre-screening documents
+
+        Each rule is a dict with:
+            id: Unique rule identifier
+            analyzer: "compliance" or "fraud"
+            severity: "high", "medium" or "low"
+            terms: Keywords/phrases that must all appear (case-insensitive, whole words)
+            message: Finding text reported when the rule fires
+
+        All terms of all rules are compiled into one alternation regex, so a
+        document is scanned once no matter how many rules are configured.
+        """
+        self.rules = []
+        for rule in rules:
+            severity = rule.get('severity', 'medium').lower()
+            if severity not in SEVERITIES:
+                raise ValueError(f"Rule {rule['id']} has unknown severity: {severity}")
+            self.rules.append({
+                "id": rule['id'],
+                "analyzer": rule.get('analyzer', 'compliance'),
+                "severity": severity,
+                "terms": [_normalize(term) for term in rule['terms']],
+                "message": rule['message']
+            })
+
+        self._patterns = {None: self._compile(self.rules)}
+        for analyzer in {rule['analyzer'] for rule in self.rules}:
+            self._patterns[analyzer] = self._compile([r for r in self.rules if r['analyzer'] == analyzer])
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """Build the engine from the `prescreen` section of config.yaml, or None if disabled"""
+        prescreen = (config or {}).get('prescreen', {})
+        if not prescreen.get('enabled', False):
+            return None
+        return cls(prescreen.get('rules', []))
+
+    @staticmethod
+    def _compile(rules: list):
+        """(alternation regex, {term: [(shorter term it starts with, its regex)]}), or None without terms"""
+        terms = sorted({term for rule in rules for term in rule['terms']}, key=len, reverse=True)
+        if not terms:
+            return None
+        # Longest terms first so "wire transfer" wins over "wire" at the same position
+        pattern = re.compile(r"\b(?:" + "|".join(_term_regex(term) for term in terms) + r")\b", re.IGNORECASE)
+        # ...which hides "wire" there, so it is recorded from the longer match instead
+        prefixes = {}
+        for term in terms:
+            for other in terms:
+                if other != term and (term + " ").startswith(other + " "):
+                    prefixes.setdefault(term, []).append((other, re.compile(_term_regex(other), re.IGNORECASE)))
+        return pattern, prefixes
+
+    def match_terms(self, text: str, analyzer: str = None) -> dict:
+        """Map each rule term found in the text to the span of its first occurrence"""
+        compiled = self._patterns.get(analyzer)
+        found = {}
+        if compiled is None or not text:
+            return found
+        pattern, prefixes = compiled
+        position = 0
+        while match := pattern.search(text, position):
+            term = _normalize(match.group(0))
+            found.setdefault(term, match.span())
+            for prefix, prefix_pattern in prefixes.get(term, ()):
+                if prefix not in found and (prefix_match := prefix_pattern.match(text, match.start())):
+                    found[prefix] = prefix_match.span()
+            # Resume inside the match: a term may overlap its end ("transfer fee" in "wire transfer fee")
+            position = match.start() + 1
+        return found
+
+    def has_hits(self, text: str, analyzer: str = None) -> bool:
+        """True if any rule term of the analyzer appears in the text"""
+        compiled = self._patterns.get(analyzer)
+        return bool(compiled and text and compiled[0].search(text))
+
+    def scan(self, text: str, analyzer: str = None) -> list:
+        """
+        Evaluate rules against a document in one pass
+
+        Args:
+            text: Document text
+            analyzer: Only evaluate rules for this analyzer ("compliance"/"fraud")
+
+        Returns:
+            List of findings, highest severity first, each with rule_id, analyzer,
+            severity, message, source and evidence spans of the matched terms
+        """
+        found = self.match_terms(text, analyzer)
+        findings = []
+        for rule in self.rules:
+            if analyzer and rule['analyzer'] != analyzer:
+                continue
+            if all(term in found for term in rule['terms']):
+                findings.append({
+                    "rule_id": rule['id'],
+                    "analyzer": rule['analyzer'],
+                    "severity": rule['severity'],
+                    "message": rule['message'],
+                    "source": "rules",
+                    "evidence": [{"term": term, "start": found[term][0], "end": found[term][1]}
+                                 for term in rule['terms']]
+                })
+        findings.sort(key=lambda finding: SEVERITIES.index(finding['severity']))
+        return findings
+
+
+def prescreen_chunks(rule_engine, mode: str, document_text: str, chunks: list, analyzer: str) -> list:
+    """
+    Chunks that still need a model call under the configured pre-screen mode
+
+    Args:
+        rule_engine: RuleEngine, or None when pre-screening is disabled
+        mode: One of PRESCREEN_MODES
+        document_text: Full document text
+        chunks: All chunks of the document
+        analyzer: "compliance" or "fraud"
+
+    Returns:
+        The chunks to send to the model (possibly none)
+    """
+    if rule_engine is None or mode == "annotate":
+        return chunks
+    if mode == "skip_clean":
+        return chunks if rule_engine.has_hits(document_text, analyzer) else []
+    if mode == "flagged_chunks":
+        return [chunk for chunk in chunks if rule_engine.has_hits(chunk.text, analyzer)]
+    raise ValueError(f"Unknown pre-screen mode: {mode}")
@@ -0,0 +1,276 @@
+import os
+import re
+import time
+import random
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+from src.metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+# Modulus of the MinHash permutations, a Mersenne prime above 2**60
+_PRIME = (1 << 61) - 1
+
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+
+# Values that differ between documents rendered from the same template. Order
+# matters: the first alternative that matches at a position wins.
+_VOLATILE = re.compile(
+    r"(?P<date>\b\d{4}-\d{1,2}-\d{1,2}\b"
+    r"|\b\d{1,2}[/.-]\d{1,2}[/.-]\d{2,4}\b"
+    rf"|\b{_MONTH} \d{{1,2}},? \d{{4}}\b"
+    rf"|\b\d{{1,2}} {_MONTH} \d{{4}}\b)"
+    r"|(?P<account>\b[A-Z]{2}\d{2}[A-Z0-9]{10,30}\b"
+    r"|(?:\*{2,}|\b[xX]{2,})\d{4}\b"
+    r"|\b\d{2,}(?:-\d{2,}){2,}\b"
+    r"|\b\d{6,}\b)"
+    r"|(?P<amount>[$€£]\s?\d[\d,]*(?:\.\d+)?"
+    r"|\b\d{1,3}(?:,\d{3})+(?:\.\d+)?\b"
+    r"|\b\d+\.\d+\b)"
+    r"|(?P<number>\b\d+\b)",
+    re.IGNORECASE
+)
+
+_WORD = re.compile(r"\w+")
+
+
+class ChunkSignature(NamedTuple):
+    """Similarity signature of one chunk of text"""
+    minhash: tuple
+    values: tuple
+    words: frozenset
+
+
+class _Entry(NamedTuple):
+    namespace: str
+    signature: ChunkSignature
+    reply: str
+    created_at: float
+
+
+def _words(text: str) -> frozenset:
+    """
+    Lowercase words of a text, numbers included
+
+    A value the reply still quotes from the earlier chunk (an SSN or account number
+    _adapt could not map) is then caught by the same check as a name.
+    """
+    return frozenset(_WORD.findall(text.lower()))
+
+
+def normalize(text: str) -> tuple:
+    """
+    Replace volatile values (dates, account numbers, amounts, other numbers) with placeholders
+
+    Returns:
+        (normalized lowercase tokens, the replaced values in document order)
+    """
+    values = []
+
+    def placeholder(match):
+        values.append(match.group(0))
+        return f" _{match.lastgroup}_ "
+
+    return _WORD.findall(_VOLATILE.sub(placeholder, text).lower()), tuple(values)
+
+
+class SemanticCache:
+    def __init__(self, threshold: float = 0.9,
+                 num_perm: int = 64,
+                 bands: int = 16,
+                 shingle_size: int = 3,
+                 max_entries: int = 5000,
+                 ttl_hours: float = 24,
+                 seed: int = 1):
+        """
+        In-memory similarity cache of model replies for near-duplicate chunks
+
+        Chunks are compared by MinHash signatures of their word shingles after
+        volatile values are normalized away, so monthly statements or standard
+        contracts that differ only in dates, amounts and account numbers share
+        a cached reply. The reply is adapted to the new chunk by swapping in its
+        own values, and is not reused if it still mentions words or numbers that
+        appear only in the earlier document (names, quoted text, account numbers
+        left unmapped), so one customer's details never show up in another
+        customer's report.
+
+        Args:
+            threshold: Minimum estimated Jaccard similarity of normalized shingles for a hit
+            num_perm: MinHash permutations; more gives a finer similarity estimate
+            bands: LSH bands used to find candidates; num_perm must divide evenly
+            shingle_size: Words per shingle
+            max_entries: Least recently used entries are evicted above this count
+            ttl_hours: Entries older than this are treated as misses and evicted
+            seed: Seed of the MinHash permutations
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_hours * 3600
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(_PRIME)) for _ in range(num_perm)]
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """Build the cache from the `semantic_cache` section of config.yaml, or None if disabled"""
+        settings = (config or {}).get('semantic_cache', {})
+        if not settings.get('enabled', False):
+            return None
+        return cls(threshold=settings.get('threshold', 0.9),
+                   num_perm=settings.get('num_perm', 64),
+                   bands=settings.get('bands', 16),
+                   shingle_size=settings.get('shingle_size', 3),
+                   max_entries=settings.get('max_entries', 5000),
+                   ttl_hours=settings.get('ttl_hours', 24))
+
+    def signature(self, text: str):
+        """MinHash signature of a chunk, or None if it has no words to compare"""
+        tokens, values = normalize(text)
+        if not tokens:
+            return None
+        size = min(self.shingle_size, len(tokens))
+        hashes = {int.from_bytes(hashlib.blake2b(" ".join(tokens[i:i + size]).encode("utf-8"),
+                                                 digest_size=8).digest(), "big")
+                  for i in range(len(tokens) - size + 1)}
+        minhash = tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+        return ChunkSignature(minhash, values, _words(text))
+
+    def similarity(self, first: ChunkSignature, second: ChunkSignature) -> float:
+        """Estimated Jaccard similarity of the normalized shingles of two chunks"""
+        return sum(a == b for a, b in zip(first.minhash, second.minhash)) / self.num_perm
+
+    def lookup(self, namespace: str, signature: ChunkSignature):
+        """
+        Reply cached for the most similar chunk in `namespace`, adapted to this chunk
+
+        Args:
+            namespace: Identifies the prompt, model and parameters the reply came from
+            signature: signature() of the chunk about to be analyzed
+
+        Returns:
+            The adapted reply, or None on a miss
+        """
+        now = time.time()
+        matches = []
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(namespace, signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            for entry_id in candidates:
+                entry = self._entries[entry_id]
+                if now - entry.created_at > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                score = self.similarity(signature, entry.signature)
+                if score >= self.threshold:
+                    matches.append((score, entry_id, entry))
+
+        # Most similar first, newest first among equals
+        for score, entry_id, entry in sorted(matches, key=lambda match: match[:2], reverse=True):
+            reply = self._adapt(entry.reply, entry.signature.values, signature.values)
+            # Words the reply shares only with the earlier document would leak its details into this one
+            if (_words(reply) & entry.signature.words) - signature.words:
+                continue
+            with self._lock:
+                if entry_id in self._entries:
+                    self._entries.move_to_end(entry_id)
+            logger.debug(f"Semantic cache hit, similarity {score:.2f}")
+            self._count("hit")
+            return reply
+        if matches:
+            logger.debug(f"{len(matches)} similar chunks cached, but their replies mention details "
+                         f"absent from this chunk; not reusing them")
+        return self._count("stale" if matches else "miss")
+
+    def store(self, namespace: str, signature: ChunkSignature, reply: str):
+        """Remember the model's reply for a chunk, evicting the least recently used entries above max_entries"""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(namespace, signature, reply, time.time())
+            for band_key in self._band_keys(namespace, signature):
+                self._buckets.setdefault(band_key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.stale
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses, "stale": self.stale,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0}
+
+    def _band_keys(self, namespace: str, signature: ChunkSignature) -> list:
+        return [(namespace, band, signature.minhash[band * self.rows:(band + 1) * self.rows])
+                for band in range(self.bands)]
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        for band_key in self._band_keys(entry.namespace, entry.signature):
+            bucket = self._buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band_key]
+
+    def _count(self, result: str):
+        with self._lock:
+            if result == "hit":
+                self.hits += 1
+            elif result == "stale":
+                self.stale += 1
+            else:
+                self.misses += 1
+        CACHE_LOOKUPS.inc(kind="semantic", result=result)
+        return None
+
+    @staticmethod
+    def _adapt(reply: str, old_values: tuple, new_values: tuple) -> str:
+        """Swap the earlier chunk's volatile values in the reply for this chunk's, matched by position"""
+        if len(old_values) != len(new_values):
+            return reply
+        mapping = {}
+        for old, new in zip(old_values, new_values):
+            # A value mapping to two different replacements is ambiguous; leave it for the leak check
+            mapping[old] = new if mapping.get(old, new) == new else None
+        mapping = {old: new for old, new in mapping.items() if new is not None and old != new and old in reply}
+        if not mapping:
+            return reply
+        pattern = re.compile("|".join(re.escape(old) for old in sorted(mapping, key=len, reverse=True)))
+        return pattern.sub(lambda match: mapping[match.group(0)], reply)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache(config: dict):
+    """Return the process-wide semantic cache, creating it on first use; None if disabled"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticCache.from_config(config) or False
+        return _cache or None
+
+
+def _forget_cache_after_fork():
+    """Forked children start with an empty cache and fresh locks"""
+    global _cache, _cache_lock
+    _cache = None
+    _cache_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_cache_after_fork)
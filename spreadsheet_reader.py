@@ -0,0 +1,113 @@
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SpreadsheetReader:
+    def __init__(self, max_rows: int = None, max_cells: int = None, batch_size: int = 1000):
+        """
+        Lazy, memory-bounded reader for .xlsx and .xls workbooks
+
+        Args:
+            max_rows: Stop after this many rows across all sheets
+            max_cells: Stop after this many non-empty cells across all sheets
+            batch_size: Rows per batch yielded by iter_batches
+        """
+        self.max_rows = max_rows
+        self.max_cells = max_cells
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_config(cls, config: dict) -> "SpreadsheetReader":
+        """Build a reader from the `extraction` section of config.yaml"""
+        extraction = (config or {}).get('extraction', {})
+        return cls(max_rows=extraction.get('max_rows'),
+                   max_cells=extraction.get('max_cells'),
+                   batch_size=extraction.get('row_batch_size', 1000))
+
+    def iter_rows(self, file_path):
+        """
+        Yield rows one at a time, sheet by sheet, without loading the workbook
+
+        Args:
+            file_path: Path to the workbook, or a seekable binary stream of it
+
+        Yields:
+            (sheet_name, row) tuples where row is a tuple of cell values
+        """
+        rows = cells = 0
+        for sheet_name, row in self._iter_workbook(file_path):
+            if self.max_rows and rows >= self.max_rows:
+                logger.info(f"Row cap of {self.max_rows} reached, stopping spreadsheet read early")
+                return
+            if self.max_cells and cells >= self.max_cells:
+                logger.info(f"Cell cap of {self.max_cells} reached, stopping spreadsheet read early")
+                return
+            rows += 1
+            cells += sum(1 for value in row if value is not None)
+            yield sheet_name, row
+
+    def iter_batches(self, file_path):
+        """
+        Yield rows in lists of at most batch_size, never spanning two sheets
+
+        Yields:
+            (sheet_name, rows) tuples
+        """
+        batch = []
+        current = None
+        for sheet_name, row in self.iter_rows(file_path):
+            if batch and (sheet_name != current or len(batch) >= self.batch_size):
+                yield current, batch
+                batch = []
+            current = sheet_name
+            batch.append(row)
+        if batch:
+            yield current, batch
+
+    @staticmethod
+    def _iter_workbook(file_path):
+        opened = isinstance(file_path, (str, os.PathLike))
+        f = open(file_path, 'rb') if opened else file_path
+        try:
+            f.seek(0)
+            # Decided by content, not extension: .xlsx workbooks are zip archives
+            is_xlsx = f.read(4) == b"PK\x03\x04"
+            f.seek(0)
+            if not is_xlsx:
+                yield from SpreadsheetReader._iter_xls(file_path if opened else f.read())
+                return
+            from openpyxl import load_workbook
+            # read_only streams rows from the XML instead of building every cell object
+            wb = load_workbook(f, read_only=True, data_only=True)
+            try:
+                for sheet_name in wb.sheetnames:
+                    for row in wb[sheet_name].iter_rows(values_only=True):
+                        yield sheet_name, row
+            finally:
+                wb.close()
+        finally:
+            if opened:
+                f.close()
+
+    @staticmethod
+    def _iter_xls(file_path):
+        """Legacy .xls workbooks via xlrd (given a path or the file's bytes), loading one sheet at a time"""
+        try:
+            import xlrd
+        except ImportError:
+            raise ValueError("Reading .xls files requires the xlrd package")
+        if isinstance(file_path, bytes):
+            wb = xlrd.open_workbook(file_contents=file_path, on_demand=True)
+        else:
+            # xlrd memory-maps the file itself
+            wb = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            for index, sheet_name in enumerate(wb.sheet_names()):
+                sheet = wb.sheet_by_index(index)
+                for i in range(sheet.nrows):
+                    yield sheet_name, tuple(None if value == "" else value for value in sheet.row_values(i))
+                wb.unload_sheet(index)
+        finally:
+            wb.release_resources()
@@ -0,0 +1,310 @@
+import os
+import re
+import logging
+import numpy as np
+import pandas as pd
+from src.rules import SEVERITIES
+from src.findings import Finding
+from src.spreadsheet_reader import SpreadsheetReader
+from src.document_processing import handler_for, rewind
+
+logger = logging.getLogger(__name__)
+
+TABULAR_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+# Column name patterns used when columns are not configured explicitly
+_AMOUNT_NAMES = re.compile(r"amount|amt|total|value|sum|debit|credit|price|paid", re.IGNORECASE)
+_COUNTERPARTY_NAMES = re.compile(r"vendor|payee|counterparty|beneficiary|supplier|merchant|customer|recipient|name", re.IGNORECASE)
+_INVOICE_NAMES = re.compile(r"invoice|inv_?no|bill_?no|reference|ref", re.IGNORECASE)
+
+# Expected first-digit frequencies under Benford's law
+_BENFORD = np.log10(1 + 1 / np.arange(1, 10))
+
+# Nigrini's mean absolute deviation thresholds for first-digit conformity
+_BENFORD_MARGINAL = 0.012
+_BENFORD_NONCONFORMING = 0.015
+
+# Row indexes reported per finding
+_SAMPLE_ROWS = 20
+
+
+class TabularFraudAnalyzer:
+    def __init__(self, amount_column: str = None,
+                 counterparty_column: str = None,
+                 invoice_column: str = None,
+                 thresholds=(10000,),
+                 threshold_margin: float = 0.05,
+                 zscore: float = 3.5,
+                 min_group_size: int = 5,
+                 round_share: float = 0.15,
+                 benford_min_rows: int = 300,
+                 reader: SpreadsheetReader = None):
+        """
+        Vectorized fraud checks over transaction tables, run before any text conversion
+
+        Args:
+            amount_column: Amount column (auto-detected when None)
+            counterparty_column: Vendor/payee column (auto-detected when None)
+            invoice_column: Invoice number column (auto-detected when None)
+            thresholds: Approval/reporting limits checked for just-below clustering
+            threshold_margin: Width of the bands below/above each threshold, as a fraction of it
+            zscore: Absolute z-score above which an amount is an outlier for its counterparty
+            min_group_size: Minimum transactions per counterparty for z-scores
+            round_share: Share of round amounts (multiples of 100) that is flagged
+            benford_min_rows: Minimum positive amounts before testing Benford's law
+            reader: SpreadsheetReader used for XLSX/XLS files (row caps, batch size)
+        """
+        self.amount_column = amount_column
+        self.counterparty_column = counterparty_column
+        self.invoice_column = invoice_column
+        self.thresholds = list(thresholds)
+        self.threshold_margin = threshold_margin
+        self.zscore = zscore
+        self.min_group_size = min_group_size
+        self.round_share = round_share
+        self.benford_min_rows = benford_min_rows
+        self.reader = reader or SpreadsheetReader()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """Build the analyzer from the `tabular` section of config.yaml, or None if disabled"""
+        settings = (config or {}).get('tabular', {})
+        if not settings.get('enabled', False):
+            return None
+        return cls(amount_column=settings.get('amount_column'),
+                   counterparty_column=settings.get('counterparty_column'),
+                   invoice_column=settings.get('invoice_column'),
+                   thresholds=settings.get('thresholds', [10000]),
+                   threshold_margin=settings.get('threshold_margin', 0.05),
+                   zscore=settings.get('zscore', 3.5),
+                   min_group_size=settings.get('min_group_size', 5),
+                   round_share=settings.get('round_share', 0.15),
+                   benford_min_rows=settings.get('benford_min_rows', 300),
+                   reader=SpreadsheetReader.from_config(config))
+
+    @staticmethod
+    def supports(file_path) -> bool:
+        return os.fspath(file_path).lower().endswith(TABULAR_EXTENSIONS)
+
+    def analyze_file(self, file_path, name: str = None) -> list:
+        """
+        Load a CSV/XLSX file as a DataFrame and run every check on it
+
+        Args:
+            file_path: Path, or a seekable binary stream of the file
+            name: File name deciding CSV vs. spreadsheet when the content does not;
+                defaults to the path, or the stream's name
+
+        Raises:
+            ValueError: If the file is neither a CSV nor a spreadsheet
+        """
+        format_name = handler_for(file_path, name).name
+        rewind(file_path)
+        if format_name == 'csv':
+            df = pd.read_csv(file_path, low_memory=False)
+        elif format_name in ('xlsx', 'xls'):
+            df = self._read_spreadsheet(file_path)
+        else:
+            raise ValueError(f"Not a transaction table: {name or file_path}")
+        return self.analyze(df)
+
+    def _read_spreadsheet(self, file_path) -> pd.DataFrame:
+        """Build a DataFrame from the first sheet, one row batch at a time"""
+        frames = []
+        header = None
+        first_sheet = None
+        for sheet_name, rows in self.reader.iter_batches(file_path):
+            if first_sheet is None:
+                first_sheet = sheet_name
+            elif sheet_name != first_sheet:
+                break
+            if header is None:
+                header = [str(c) if c is not None else f"column_{i}" for i, c in enumerate(rows[0])]
+                rows = rows[1:]
+            width = len(header)
+            # Read-only rows can be ragged; pad/trim them to the header width
+            rows = [tuple(row[:width]) + (None,) * (width - len(row)) for row in rows]
+            if rows:
+                frames.append(pd.DataFrame.from_records(rows, columns=header))
+        if not frames:
+            return pd.DataFrame(columns=header or [])
+        return pd.concat(frames, ignore_index=True)
+
+    def analyze(self, df: pd.DataFrame) -> list:
+        """
+        Run the vectorized checks on a transaction table
+
+        Args:
+            df: Transactions, one row per transaction
+
+        Returns:
+            List of findings with check, severity, message, source, rows and metrics
+        """
+        amount_col = self.amount_column or self._detect_amount_column(df)
+        if amount_col is None or amount_col not in df:
+            logger.info("No amount column found, skipping tabular fraud checks")
+            return []
+        counterparty_col = self.counterparty_column or self._detect_column(df, _COUNTERPARTY_NAMES, exclude={amount_col})
+        invoice_col = self.invoice_column or self._detect_column(df, _INVOICE_NAMES, exclude={amount_col, counterparty_col})
+
+        amounts = pd.to_numeric(df[amount_col], errors='coerce').to_numpy(dtype=np.float64)
+        findings = []
+        findings.extend(self._benford(amounts))
+        findings.extend(self._round_amounts(amounts))
+        findings.extend(self._just_below_thresholds(amounts))
+        findings.extend(self._duplicates(df, amount_col, counterparty_col, invoice_col))
+        if counterparty_col:
+            findings.extend(self._counterparty_outliers(df[counterparty_col], amounts))
+        return findings
+
+    @staticmethod
+    def _detect_amount_column(df: pd.DataFrame):
+        named = [c for c in df.columns if _AMOUNT_NAMES.search(str(c))]
+        for column in named:
+            if pd.api.types.is_numeric_dtype(df[column]) or pd.to_numeric(df[column].head(100), errors='coerce').notna().any():
+                return column
+        numeric = df.select_dtypes(include='number').columns
+        return numeric[0] if len(numeric) else None
+
+    @staticmethod
+    def _detect_column(df: pd.DataFrame, pattern, exclude: set):
+        for column in df.columns:
+            if column not in exclude and pattern.search(str(column)):
+                return column
+        return None
+
+    def _benford(self, amounts: np.ndarray) -> list:
+        positive = np.abs(amounts[np.isfinite(amounts)])
+        positive = positive[positive >= 1]
+        if len(positive) < self.benford_min_rows:
+            return []
+        first_digits = (positive / 10 ** np.floor(np.log10(positive))).astype(np.int64)
+        # Guard against float rounding at powers of ten (e.g. 99.99999 -> 0 or 10)
+        first_digits = np.clip(first_digits, 1, 9)
+        observed = np.bincount(first_digits, minlength=10)[1:10] / len(first_digits)
+        mad = float(np.mean(np.abs(observed - _BENFORD)))
+        if mad <= _BENFORD_MARGINAL:
+            return []
+        most_over = int(np.argmax(observed - _BENFORD)) + 1
+        return [self._finding(
+            "benford",
+            "high" if mad > _BENFORD_NONCONFORMING else "medium",
+            f"Amounts deviate from Benford's law (MAD {mad:.4f}); leading digit {most_over} is "
+            f"over-represented ({observed[most_over - 1]:.1%} vs {_BENFORD[most_over - 1]:.1%} expected). "
+            "Review for fabricated or manipulated amounts.",
+            metrics={"mad": mad, "observed": observed.round(4).tolist(), "rows_tested": int(len(positive))}
+        )]
+
+    def _round_amounts(self, amounts: np.ndarray) -> list:
+        valid = amounts[np.isfinite(amounts) & (np.abs(amounts) >= 1000)]
+        if len(valid) < 20:
+            return []
+        round_mask = np.mod(valid, 100) == 0
+        share = float(round_mask.mean())
+        if share < self.round_share:
+            return []
+        return [self._finding(
+            "round_amounts",
+            "medium",
+            f"{share:.1%} of transactions of 1,000 or more are round amounts (multiples of 100). "
+            "Round-number clustering can indicate estimated or fictitious payments.",
+            metrics={"share": share, "count": int(round_mask.sum())}
+        )]
+
+    def _just_below_thresholds(self, amounts: np.ndarray) -> list:
+        findings = []
+        finite = np.isfinite(amounts)
+        for threshold in self.thresholds:
+            band = threshold * self.threshold_margin
+            below_mask = finite & (amounts >= threshold - band) & (amounts < threshold)
+            above = int((finite & (amounts >= threshold) & (amounts < threshold + band)).sum())
+            below = int(below_mask.sum())
+            # Flag when the band just under the limit is much busier than the band just over it
+            if below >= 5 and below > 2 * max(above, 1):
+                findings.append(self._finding(
+                    "just_below_threshold",
+                    "high",
+                    f"{below} transactions fall just below the {threshold:,.0f} threshold versus {above} just above it. "
+                    "Possible structuring to avoid approval or reporting limits.",
+                    rows=np.flatnonzero(below_mask),
+                    metrics={"threshold": threshold, "below": below, "above": above}
+                ))
+        return findings
+
+    def _duplicates(self, df: pd.DataFrame, amount_col, counterparty_col, invoice_col) -> list:
+        findings = []
+        if invoice_col:
+            invoices = df[invoice_col]
+            mask = (invoices.duplicated(keep=False) & invoices.notna()).to_numpy()
+            if mask.any():
+                findings.append(self._finding(
+                    "duplicate_invoice",
+                    "high",
+                    f"{int(invoices[mask].nunique())} invoice numbers appear more than once ({int(mask.sum())} rows). "
+                    "Review for duplicate billing.",
+                    rows=np.flatnonzero(mask)
+                ))
+        subset = [c for c in (counterparty_col, amount_col) if c]
+        if len(subset) == 2:
+            mask = df.duplicated(subset=subset, keep=False).to_numpy() & df[amount_col].notna().to_numpy()
+            if mask.any():
+                findings.append(self._finding(
+                    "duplicate_amount",
+                    "medium",
+                    f"{int(mask.sum())} transactions repeat the same amount to the same counterparty. "
+                    "Review for duplicate payments.",
+                    rows=np.flatnonzero(mask)
+                ))
+        return findings
+
+    def _counterparty_outliers(self, counterparties: pd.Series, amounts: np.ndarray) -> list:
+        amount_series = pd.Series(amounts, index=counterparties.index)
+        groups = amount_series.groupby(counterparties, sort=False)
+        size = groups.transform('size').to_numpy()
+        mean = groups.transform('mean').to_numpy()
+        std = groups.transform('std').to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            z = (amounts - mean) / std
+        mask = (size >= self.min_group_size) & np.isfinite(z) & (np.abs(z) > self.zscore)
+        if not mask.any():
+            return []
+        flagged = counterparties.to_numpy()[mask]
+        return [self._finding(
+            "counterparty_outlier",
+            "medium",
+            f"{int(mask.sum())} transactions are unusually large or small for their counterparty "
+            f"(|z| > {self.zscore}) across {len(pd.unique(flagged))} counterparties.",
+            rows=np.flatnonzero(mask),
+            metrics={"max_abs_z": float(np.nanmax(np.abs(z[mask])))}
+        )]
+
+    @staticmethod
+    def _finding(check: str, severity: str, message: str, rows=None, metrics: dict = None) -> dict:
+        finding = {
+            "check": check,
+            "severity": severity,
+            "message": message,
+            "source": "tabular"
+        }
+        if rows is not None:
+            finding["row_count"] = int(len(rows))
+            finding["rows"] = [int(r) for r in rows[:_SAMPLE_ROWS]]
+        if metrics:
+            finding["metrics"] = metrics
+        return finding
+
+
+def add_tabular_findings(fraud_results: dict, findings: list) -> dict:
+    """Merge tabular findings into FraudDetector results, highest severity first"""
+    if not findings:
+        return fraud_results
+    findings = sorted(findings, key=lambda finding: SEVERITIES.index(finding['severity']))
+    structured = [Finding.from_tabular(f) for f in findings]
+    indicators = fraud_results.get('fraud_indicators', [])
+    if 'findings' in fraud_results and not fraud_results['findings'] and not fraud_results.get('section_errors'):
+        # Drop the "no indicators found" placeholder now that there are findings
+        indicators = []
+    fraud_results['tabular_findings'] = findings
+    fraud_results['findings'] = [f.to_dict() for f in structured] + fraud_results.get('findings', [])
+    fraud_results['fraud_indicators'] = [str(f) for f in structured] + indicators
+    return fraud_results
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the Flask endpoints
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+import io
+import json
+import os
+import pytest
+import yaml
+import src.app as app_module
+
+
+@pytest.fixture
+def config(config):
+    return dict(config, fake_backend={"response": 'FINDING | high | SEC | "fees" | Fee terms are not disclosed | 0.9'})
+
+
+@pytest.fixture
+def client(config, tmp_path, monkeypatch):
+    """Test client of an app built from the offline config, working in tmp_path"""
+    monkeypatch.chdir(tmp_path)
+    settings = dict(config,
+                    app={"max_file_size": 16, "upload_folder": "uploads", "report_folder": "reports",
+                         "allowed_extensions": [".pdf", ".docx", ".xlsx", ".xls", ".csv"]},
+                    bulk={"extract_workers": 1, "generate_reports": False, "max_sync_documents": 2})
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(settings), encoding="utf-8")
+    monkeypatch.setattr(app_module, "_components_pid", None)
+    app_module.create_app(str(path))
+    app_module.ensure_ai_components()
+    yield app_module.app.test_client()
+    app_module.orchestrator.shutdown()
+    app_module.stream_executor.shutdown()
+
+
+def _csv(rows: int) -> io.BytesIO:
+    return io.BytesIO(("vendor,amount\n" + "".join(f"Acme,{i}00.00\n" for i in range(rows))).encode("utf-8"))
+
+
+def _events(body: str) -> list:
+    """(event, data) pairs of a server-sent event stream; keep-alive comments are skipped"""
+    events = []
+    for frame in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines() if not line.startswith(":"))
+        if lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_upload_stream_sends_findings_then_the_result(client):
+    response = client.post("/upload/stream", data={"file": (_csv(3), "ledger.csv")})
+    assert response.status_code == 200 and response.mimetype == "text/event-stream"
+    events = _events(response.get_data(as_text=True))
+    names = [event for event, _ in events]
+    assert "progress" in names and "fraud_finding" in names and names.count("done") == 1
+    finding = next(data for event, data in events if event == "fraud_finding")
+    assert finding["message"] == "Fee terms are not disclosed" and finding["severity"] == "high"
+    event, result = events[-1]
+    assert event == "done" and result["success"] and result["report_path"]
+    assert any(f["message"] == "Fee terms are not disclosed" for f in result["fraud_results"]["findings"])
+
+
+def test_upload_stream_refuses_uploads_beyond_max_streams(client):
+    held = 0
+    while app_module.stream_slots.acquire(blocking=False):
+        held += 1
+    try:
+        response = client.post("/upload/stream", data={"file": (_csv(1), "ledger.csv")})
+    finally:
+        for _ in range(held):
+            app_module.stream_slots.release()
+    assert held == 4
+    assert response.status_code == 429 and response.headers["Retry-After"] == "30"
+    assert client.post("/upload/stream", data={"file": (_csv(1), "ledger.csv")}).status_code == 200
+
+
+def test_bulk_upload_keeps_same_named_files_and_cleans_up(client):
+    response = client.post("/bulk", data={"files": [(_csv(2), "ledger.csv"), (_csv(3), "ledger.csv")]})
+    body = response.get_json()
+    assert body["success"] and body["total"] == body["completed"] == 2
+    with open(os.path.join(os.path.dirname(body["results_path"]), "results.jsonl"), encoding="utf-8") as f:
+        assert sorted(json.loads(line)["document"] for line in f) == ["ledger.csv", "ledger_2.csv"]
+    assert os.listdir("uploads") == []
+
+
+def test_bulk_upload_rejects_empty_and_oversized_synchronous_batches(client):
+    response = client.post("/bulk", data={"files": [(io.BytesIO(b"MZ"), "setup.exe")]})
+    assert response.status_code == 400
+    # The job queue is off, so a batch above bulk.max_sync_documents would run inside the request
+    response = client.post("/bulk", data={"files": [(_csv(1), f"ledger_{i}.csv") for i in range(3)]})
+    assert response.status_code == 413
+    assert os.listdir("uploads") == []
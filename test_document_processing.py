@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Offline tests for format detection and the extractor registry
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+import io
+import subprocess
+import sys
+import pytest
+import pandas as pd
+from src.document_processing import DocumentProcessor, register_format, handler_for, _FORMATS, _EXTENSIONS
+from src.pdf_renderer import PDFRenderer
+from src.result_cache import ResultCache
+from src.tabular_analysis import TabularFraudAnalyzer
+
+
+def test_processor_import_defers_heavy_dependencies():
+    code = ("import sys, src.document_processing; "
+            "print([m for m in ('pdfplumber', 'docx', 'openpyxl', 'pandas') if m in sys.modules])")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_content_wins_over_extension(tmp_path):
+    path = str(tmp_path / "statement.docx")
+    PDFRenderer().render("statement", [("Findings", [("high", "Wire transfer to shell company")])], path)
+    assert handler_for(path).name == "pdf"
+    assert "Wire transfer to shell company" in DocumentProcessor.extract_text(path)
+
+
+def test_registered_format_is_used_without_editing_extract_text(tmp_path):
+    path = tmp_path / "memo.txt"
+    path.write_text("Invoice approved by the requester", encoding="utf-8")
+    try:
+        register_format("txt", (".txt",), lambda file_path, **limits: open(file_path, encoding="utf-8").read())
+        assert DocumentProcessor.extract_text(str(path)) == "Invoice approved by the requester"
+    finally:
+        _FORMATS.pop("txt", None)
+        _EXTENSIONS.pop(".txt", None)
+    with pytest.raises(ValueError):
+        DocumentProcessor.extract_text(str(path))
+
+
+def test_bytes_and_streams_match_the_file(tmp_path):
+    path = str(tmp_path / "statement.pdf")
+    PDFRenderer().render("statement", [(f"Section {i}", [("low", f"Late filing {i}")]) for i in range(3)], path)
+    data = open(path, "rb").read()
+    expected = DocumentProcessor.extract_text(path)
+    assert DocumentProcessor.extract_text(data) == expected
+    assert DocumentProcessor.extract_text(memoryview(data), name="statement.pdf") == expected
+    with open(path, "rb") as stream:
+        assert DocumentProcessor.extract_text(stream, workers=2, pages_per_task=1) == expected
+
+
+def test_path_objects_and_unnamed_streams_are_accepted(tmp_path):
+    table = pd.DataFrame({"vendor": ["Acme"] * 6 + ["Globex"], "amount": [100.0] * 6 + [9950.0]})
+    csv_path = tmp_path / "ledger.csv"
+    table.to_csv(csv_path, index=False)
+    xlsx_path = tmp_path / "ledger.xlsx"
+    table.to_excel(xlsx_path, index=False)
+
+    assert ResultCache.hash_file(csv_path) == ResultCache.hash_file(str(csv_path))
+    analyzer = TabularFraudAnalyzer()
+    assert analyzer.supports(xlsx_path)
+    expected = analyzer.analyze_file(str(csv_path))
+    assert analyzer.analyze_file(csv_path) == expected
+    # A spreadsheet is recognized by its content; an unnamed CSV stream cannot be
+    assert analyzer.analyze_file(io.BytesIO(xlsx_path.read_bytes())) == expected
+    with pytest.raises(ValueError):
+        analyzer.analyze_file(io.BytesIO(csv_path.read_bytes()))
+
+
+def test_csv_text_is_compact_and_capped():
+    data = ("date,vendor,amount\n" + "".join(f"2024-01-{i % 28 + 1:02d},Acme,{i}.00\n" for i in range(50))).encode()
+    text = DocumentProcessor.extract_text(data, name="ledger.csv")
+    lines = text.splitlines()
+    assert lines[:2] == ["date vendor amount", "2024-01-01 Acme 0.00"] and len(lines) == 51
+    assert len(DocumentProcessor.extract_text(data, name="ledger.csv", max_rows=10).splitlines()) == 11
+    # Cells are counted like spreadsheet cells: 3 per row
+    assert len(DocumentProcessor.extract_text(data, name="ledger.csv", max_cells=6).splitlines()) == 3
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the cross-document entity index
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+import pytest
+from src.fraud_detector import FraudDetector
+from src.orchestrator import AnalysisOrchestrator
+from src.compliance_checker import ComplianceChecker
+from src.entity_index import EntityIndex
+from src.findings import Finding
+from src.pii import PIIScanner
+
+
+@pytest.fixture
+def config(config):
+    return dict(config, fake_backend={"response": "NO FRAUD INDICATORS FOUND"})
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = EntityIndex(path=str(tmp_path / "entities.sqlite3"))
+    yield index
+    index.close()
+
+
+INVOICE = ("Vendor: {vendor}\nInvoice no. {number} dated 2024-03-31\n"
+           "Pay to account number: 12345678901 the total of {total} USD.")
+
+
+def test_entity_index_flags_documents_seen_before(config, index):
+    detector = FraudDetector(config=config, entity_index=index)
+
+    def index_findings(text):
+        return [f["regulation"] for f in detector.detect_fraud_indicators(text)["findings"] if f["source"] == "index"]
+
+    first = INVOICE.format(vendor="Acme Corp.", number="INV-2024-0042", total="9,950.00")
+    assert index_findings(first) == []
+    assert detector.detect_fraud_indicators(first)["fraud_indicators"][0].startswith("MEDIUM RISK: Duplicate submission")
+    # Same invoice and total with a reworded header; then the account under another vendor's name
+    assert index_findings(INVOICE.replace("dated", "issued").format(
+        vendor="ACME Corporation", number="INV 2024 0042", total="9,950.00")) == ["Duplicate invoice"]
+    assert index_findings(INVOICE.format(vendor="Globex Ltd", number="INV-2024-0107", total="120.00")) == \
+        ["Beneficiary account reuse"]
+    assert index.stats() == {"documents": 4}
+
+    # Cached results of an identical upload get fresh "seen before" findings
+    cached = detector.detect_fraud_indicators("Nothing to index here.")
+    refreshed = detector.refresh_cross_document_findings(cached, "Nothing to index here.")
+    assert [f["regulation"] for f in refreshed["findings"]] == ["Duplicate submission"]
+    assert refreshed["fraud_indicators"] == [str(f) for f in map(Finding.from_dict, refreshed["findings"])]
+
+
+def test_earlier_versions_of_the_same_document_are_not_flagged(config, index):
+    detector = FraudDetector(config=config, entity_index=index)
+
+    def index_findings(text, document_id):
+        results = detector.detect_fraud_indicators(text, document_id=document_id)
+        return [f["regulation"] for f in results["findings"] if f["source"] == "index"]
+
+    original = INVOICE.format(vendor="Acme Corp.", number="INV-2024-0042", total="9,950.00")
+    amended = INVOICE.format(vendor="Acme Corp.", number="INV-2024-0042", total="9,990.00")
+    assert index_findings(original, "acme-0042") == []
+    # An amended invoice repeats its number and account; it is another version, not a duplicate
+    assert index_findings(amended, "acme-0042") == []
+    assert index_findings(original, "acme-0042") == []
+    assert "Duplicate invoice" in index_findings(amended, "other-upload")
+
+
+class _CountingScanner(PIIScanner):
+    scans = 0
+
+    def scan(self, text):
+        _CountingScanner.scans += 1
+        return super().scan(text)
+
+
+def test_pii_is_scanned_once_per_analysis(config, index):
+    index._scanner = _CountingScanner(types=("iban", "account"))
+    orchestrator = AnalysisOrchestrator(
+        ComplianceChecker(config=config, pii_scanner=_CountingScanner()),
+        FraudDetector(config=config, pii_scanner=_CountingScanner(), entity_index=index))
+    _CountingScanner.scans = 0
+
+    text = INVOICE.format(vendor="Acme Corp.", number="INV-2024-0042", total="9,950.00")
+    compliance = orchestrator.analyze(text)[0]
+    assert _CountingScanner.scans == 1
+    assert compliance["pii"]["counts"] == {"account": 1}
+    second = orchestrator.analyze(INVOICE.format(vendor="Globex Ltd", number="INV-2024-0107", total="120.00"))[1]
+    assert [f["regulation"] for f in second["findings"] if f["source"] == "index"] == ["Beneficiary account reuse"]
+    assert _CountingScanner.scans == 2
+    orchestrator.shutdown()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Offline tests for structured findings
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+from src.chunking import Chunk
+from src.findings import Finding, FindingStream, dedupe_findings, parse_model_findings
+
+
+def test_dedupe_merges_only_overlapping_repeats():
+    def finding(evidence, start, chunk):
+        return Finding(message="Missing required disclosure", regulation="SEC", evidence=evidence,
+                       start=start, end=None if start is None else start + len(evidence), chunk=chunk)
+
+    findings = [
+        finding("fees apply", 120, 0),
+        finding("fees apply", 120, 1),        # the same quote seen again by the overlapping chunk
+        finding("fees may change", 4100, 4),  # same message, different quote
+        finding("fees apply", 9800, 9),       # same quote, elsewhere in the document
+        finding("fees apply", None, 9),       # quote the model changed; not located
+    ]
+    assert [(f.evidence, f.chunk) for f in dedupe_findings(findings)] == \
+        [("fees apply", 0), ("fees may change", 4), ("fees apply", 9)]
+
+
+def test_parse_tolerates_loose_and_partial_lines():
+    chunk = Chunk(index=2, offset=500, text="Preamble. Fees are  subject to change without notice.")
+    response = "\n".join([
+        "| Finding | Severity | Regulation | Evidence | Explanation |",
+        "|---|:--|---|---|---|",
+        '1. **FINDING** | High | TILA | "fees are subject to change" | Fee terms are not disclosed | 80%',
+        "- FINDING | moderate | N/A | Vague wording",
+        "FINDING | HIGH",
+        "FINDING | low | GDPR | \"not in this chunk\" | Quote the model invented | 0.4",
+        "Some commentary without a separator",
+    ])
+    findings = parse_model_findings(response, "compliance", chunk)
+    assert [(f.severity, f.regulation, f.message, f.confidence) for f in findings] == [
+        ("high", "TILA", "Fee terms are not disclosed", 0.8),
+        ("medium", None, "Vague wording", None),
+        ("low", "GDPR", "Quote the model invented", 0.4),
+    ]
+    # Evidence is found despite changed case and whitespace; unlocatable quotes keep no span
+    assert (findings[0].start, findings[0].end) == (510, 510 + len("Fees are  subject to change"))
+    assert findings[2].evidence == "not in this chunk" and findings[2].start is None
+    assert {f.chunk for f in findings} == {2}
+
+
+def test_parse_replies_without_finding_lines():
+    assert parse_model_findings("", "fraud") is None
+    assert parse_model_findings("  \n", "fraud") is None
+    assert parse_model_findings("No fraud indicators found.", "fraud",
+                                clean_markers=("NO FRAUD INDICATORS FOUND",)) == []
+    [finding] = parse_model_findings("HIGH RISK: Invoice amounts are split below the approval limit", "fraud")
+    assert (finding.severity, finding.message) == ("high", "Invoice amounts are split below the approval limit")
+
+
+def test_stream_emits_each_line_once_complete():
+    found = []
+    stream = FindingStream("fraud", on_finding=found.append)
+    stream.feed("FINDING | high | Structuring | \"9,900\" | Just below the reporting thr")
+    assert found == []
+    stream.feed("eshold\nFINDING | low | Round amounts")
+    assert [f.message for f in found] == ["Just below the reporting threshold"]
+    stream.close()
+    assert [f.message for f in found] == ["Just below the reporting threshold", "Round amounts"]
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Offline tests for incremental re-analysis of amended documents
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+import io
+import pytest
+from src.compliance_checker import ComplianceChecker
+from src.fraud_detector import FraudDetector
+from src.orchestrator import AnalysisOrchestrator
+from src.pipeline import AnalysisPipeline
+from src.result_cache import ResultCache
+from src.incremental import PreviousVersion
+
+REPLY = 'FINDING | MEDIUM | SOX | "section 3 of the agreement" | Review the section. | 0.7'
+PARAGRAPHS = [f"This is section {i} of the agreement. " + "The parties agree to the standard terms. " * 6
+              for i in range(12)]
+
+
+@pytest.fixture
+def config(config):
+    return dict(config, fake_backend={"response": REPLY}, incremental={"enabled": True})
+
+
+class _TextProcessor:
+    @staticmethod
+    def extract_text(source, name=None, **limits):
+        return source.read().decode("utf-8")
+
+
+def test_amended_document_only_reanalyzes_changed_chunks(config):
+    checker = ComplianceChecker(config=config)
+    original = "\n\n".join(PARAGRAPHS)
+    first = checker.check_compliance(original)
+    record = {"text": original, "analyzed_at": first["timestamp"],
+              "compliance": {"chunks": first["chunk_digests"], "findings": first["findings"]}}
+    calls = len(checker.model.backend.calls)
+
+    amended = "\n\n".join(["An amendment adds a late payment fee."] + PARAGRAPHS)
+    previous = PreviousVersion(record, amended)
+    second = checker.check_compliance(amended, previous=previous)
+    assert len(checker.model.backend.calls) - calls == second["chunks_analyzed"] == 1
+    assert second["chunks_reused"] == len(first["chunk_digests"])
+    # The finding of the old first chunk is carried over, renumbered after the inserted one
+    assert [(f["evidence"], f["chunk"]) for f in second["findings"]] == [("section 3 of the agreement", 1)]
+
+    changes = previous.summary({"compliance": second})
+    assert changes["characters_added"] == len("An amendment adds a late payment fee.\n\n")
+    assert changes["characters_removed"] == 0
+    assert changes["compliance"]["added"] == changes["compliance"]["resolved"] == []
+
+
+@pytest.fixture
+def pipeline(config, tmp_path):
+    pipeline = AnalysisPipeline(
+        config, _TextProcessor(),
+        AnalysisOrchestrator(ComplianceChecker(config=config), FraudDetector(config=config)),
+        result_cache=ResultCache(path=str(tmp_path / "results.sqlite3")))
+    yield pipeline
+    pipeline.orchestrator.shutdown()
+
+
+def test_only_uploads_with_the_same_document_id_are_versions(pipeline):
+    def upload(text, document_id=None):
+        return pipeline.analyze_file(io.BytesIO(text.encode("utf-8")), name="invoice.txt", document_id=document_id)
+
+    original = "\n\n".join(PARAGRAPHS)
+    amended = "\n\n".join(["An amendment adds a late payment fee."] + PARAGRAPHS)
+    # Unrelated uploads sharing a file name are analyzed in full
+    assert "changes" not in upload(original)
+    assert "changes" not in upload(amended)
+    assert "changes" not in upload(original + "\n\nSigned.", "contract-7")
+    second = upload(amended + "\n\nSigned.", "contract-7")
+    assert second["changes"]["characters_added"] > 0
+    assert second["compliance_results"]["chunks_reused"] > 0
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the SQLite-backed background job queue
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import pytest
+from src.jobs import JobQueue, QueueFullError
+
+
+def test_depth_limit_and_resumption_span_processes(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite3")
+    release = threading.Event()
+
+    def handler(payload, progress):
+        release.wait(10)
+        return payload
+
+    # Queues sharing one database stand in for gunicorn workers
+    queues = [JobQueue(handler, db_path, workers=4, max_queue_depth=2) for _ in range(3)]
+    try:
+        first = queues[0].submit({"n": 1})
+        queues[1].submit({"n": 2})
+        for queue in queues[:2]:
+            with pytest.raises(QueueFullError):
+                queue.submit({"n": 3})
+        assert queues[0].depth() == queues[1].depth() == 2
+        release.set()
+        deadline = time.monotonic() + 10
+        while queues[0].depth() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert queues[0].get(first)["result"] == {"n": 1}
+
+        # Three jobs of a process that died; a new one resumes only as many as the depth allows
+        release.clear()
+        with sqlite3.connect(db_path) as conn:
+            conn.executemany("INSERT INTO jobs (id, state, payload, created_at, updated_at) VALUES (?, ?, ?, 0, 0)",
+                             [(f"orphan-{i}", "running", json.dumps({"n": i})) for i in range(3)])
+        queues[2].start()
+        with sqlite3.connect(db_path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM jobs WHERE id LIKE 'orphan-%' AND updated_at > 0").fetchone()[0] == 2
+    finally:
+        release.set()
+        for queue in queues:
+            queue.shutdown()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the shared model client layer
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+from src.model_client import IAMTokenManager, get_model_client
+from src.compliance_checker import ComplianceChecker
+from src.fraud_detector import FraudDetector
+
+class _FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class _FakeSession:
+    def __init__(self):
+        self.posts = 0
+
+    def post(self, url, **kwargs):
+        self.posts += 1
+        return _FakeResponse({"access_token": f"token-{self.posts}", "expires_in": 3600})
+
+
+def test_one_client_per_model(config):
+    client = get_model_client(config)
+    assert get_model_client(config) is client
+    assert get_model_client(config, model_id="ibm/granite-8b-instruct-v2") is not client
+
+
+def test_token_is_cached_and_refreshed_before_expiry():
+    now = [1000.0]
+    session = _FakeSession()
+    tokens = IAMTokenManager("key", session, refresh_margin=300, clock=lambda: now[0])
+
+    assert tokens.get_token() == "token-1"
+    now[0] += 3000
+    assert tokens.get_token() == "token-1"
+    now[0] += 400  # inside the refresh margin
+    assert tokens.get_token() == "token-2"
+    assert session.posts == 2
+
+
+def test_analyzers_share_injected_client(config):
+    client = get_model_client(config)
+    checker = ComplianceChecker(config=config, model_client=client)
+    detector = FraudDetector(config=config)
+    assert checker.model is detector.model is client
+
+    results = checker.check_compliance("Quarterly statement. " * 200)
+    assert results["compliance_issues"] == ["✅ No compliance issues found in this document."]
+    assert results["chunks_analyzed"] == len(client.backend.calls) > 1
+
+
+def test_profile_params_budget_and_usage(config):
+    config = dict(config,
+                  model=dict(config["model"], context_window=2600),
+                  generation={"profiles": {"compliance": {"max_new_tokens": 2048, "temperature": 0.1,
+                                                          "stop_sequences": ["\n\n\n"]}}})
+    checker = ComplianceChecker(config=config)
+    # 2600 * 0.9 - 2048 output tokens leaves under 300 prompt tokens, so chunks shrink
+    assert checker.chunker.chunk_size < config["analysis"]["chunk_size"]
+
+    results = checker.check_compliance("Quarterly statement. " * 200)
+    prompt, params = checker.model.backend.calls[0]
+    assert params == {"decoding_method": "sample", "max_new_tokens": 2048,
+                      "temperature": 0.1, "stop_sequences": ["\n\n\n"]}
+    usage = results["token_usage"]
+    assert usage["calls"] == results["chunks_analyzed"] == len(usage["per_call"])
+    assert usage["input_tokens"] > 0
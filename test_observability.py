@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the metrics registry and sampled payload tracing
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+import logging
+import random
+from src.metrics import MetricsRegistry, Counter, Histogram
+from src.tracing import PayloadTracer
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    lookups = registry.register(Counter("lookups_total", "Cache lookups", ("result",)))
+    latency = registry.register(Histogram("call_seconds", "Call latency", buckets=(0.1, 1.0)))
+    lookups.inc(result="hit")
+    lookups.inc(2, result='mi"ss')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5.0)
+
+    text = registry.render()
+    assert "# TYPE lookups_total counter" in text
+    assert 'lookups_total{result="hit"} 1.0' in text
+    assert 'lookups_total{result="mi\\"ss"} 2.0' in text
+    assert 'call_seconds_bucket{le="0.1"} 1' in text
+    assert 'call_seconds_bucket{le="1.0"} 2' in text
+    assert 'call_seconds_bucket{le="+Inf"} 3' in text
+    assert "call_seconds_count 3" in text
+    # Registering a metric name twice returns the existing metric
+    assert registry.register(Counter("lookups_total", "again")) is lookups
+
+
+def test_tracer_is_silent_when_off_and_truncates_when_sampled(caplog):
+    tracer = PayloadTracer(sample_rate=0.0, max_chars=5, rng=random.Random(1))
+    with caplog.at_level(logging.DEBUG, logger="src.tracing"):
+        tracer.trace("model_output", "confidential reply", chunk=0)
+        assert not [record for record in caplog.records if record.levelno == logging.DEBUG]
+
+        tracer.configure(sample_rate=1.0)
+        tracer.trace("model_output", "confidential reply", chunk=0)
+    traced = [record.getMessage() for record in caplog.records if record.levelno == logging.DEBUG]
+    assert traced == ["model_output chunk=0 (18 chars): 'confi'"]
+    tracer.configure(sample_rate=0.0)
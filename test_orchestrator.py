@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Offline tests for concurrent compliance and fraud analysis
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+import threading
+import pytest
+from src.orchestrator import AnalysisOrchestrator
+
+
+class _Analyzer:
+    """Stands in for both analyzers; each call runs `behavior` first"""
+
+    def __init__(self, behavior=lambda: None):
+        self.behavior = behavior
+
+    def check_compliance(self, document_text, **kwargs):
+        self.behavior()
+        return {"compliance_issues": ["ok"]}
+
+    def detect_fraud_indicators(self, document_text, **kwargs):
+        self.behavior()
+        return {"fraud_indicators": ["ok"]}
+
+
+@pytest.fixture
+def orchestrators():
+    created = []
+
+    def build(compliance, fraud, **timeouts):
+        created.append(AnalysisOrchestrator(compliance, fraud, **timeouts))
+        return created[-1]
+
+    yield build
+    for orchestrator in created:
+        orchestrator.shutdown()
+
+
+def test_analyzers_run_concurrently(orchestrators):
+    # Each analyzer waits for the other to start, which only works if they run at the same time
+    barrier = threading.Barrier(2, timeout=5)
+    orchestrator = orchestrators(_Analyzer(barrier.wait), _Analyzer(barrier.wait))
+    compliance, fraud = orchestrator.analyze("text")
+    assert compliance == {"compliance_issues": ["ok"]} and fraud == {"fraud_indicators": ["ok"]}
+
+
+def test_timeout_and_error_only_affect_their_analyzer(orchestrators):
+    release = threading.Event()
+
+    def fail():
+        raise RuntimeError("model unavailable")
+
+    try:
+        orchestrator = orchestrators(_Analyzer(lambda: release.wait(5)), _Analyzer(), compliance_timeout=0.05)
+        compliance, fraud = orchestrator.analyze("text")
+        assert compliance == {"compliance_issues": ["Analysis timed out after 0.05 seconds."],
+                              "error": True, "timed_out": True}
+        assert fraud == {"fraud_indicators": ["ok"]}
+    finally:
+        release.set()
+
+    compliance, fraud = orchestrators(_Analyzer(), _Analyzer(fail)).analyze("text")
+    assert compliance == {"compliance_issues": ["ok"]}
+    assert fraud == {"fraud_indicators": ["Error during analysis: model unavailable"], "error": True}
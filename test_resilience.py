@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Offline tests for retries, rate limiting, circuit breaking and hedging
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+import time
+import itertools
+import pytest
+import requests
+from src.fake_watsonx import FakeWatsonxServer
+from src.findings import FindingStream
+from src.model_client import WatsonxBackend
+from src.resilience import ResilientBackend, CircuitBreaker, TokenBucket, SharedTokenBucket, Backoff, CircuitOpenError
+
+MODEL_ID = "ibm/granite-3-8b-instruct"
+
+
+def _backend(server, **kwargs):
+    watsonx = WatsonxBackend({"watsonx": server.config(timeout=5)}, MODEL_ID)
+    return ResilientBackend(watsonx, backoff=Backoff(0.01, 0.05), **kwargs)
+
+
+def test_retries_transient_errors_and_honors_retry_after():
+    with FakeWatsonxServer(response="ok") as server:
+        server.fail_next(2, status=429, retry_after=0)
+        backend = _backend(server, max_retries=3)
+        assert backend.generate_text("prompt") == "ok"
+        assert server.requests == 3
+        backend.close()
+
+
+def test_client_errors_are_not_retried():
+    with FakeWatsonxServer() as server:
+        server.fail_next(1, status=400)
+        backend = _backend(server, max_retries=3)
+        with pytest.raises(requests.HTTPError):
+            backend.generate_text("prompt")
+        assert server.requests == 1
+        backend.close()
+
+
+def test_circuit_opens_and_fails_fast_until_reset():
+    now = [0.0]
+    with FakeWatsonxServer(response="ok", error_rate=1.0, error_status=503) as server:
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=lambda: now[0])
+        backend = _backend(server, breaker=breaker, max_retries=5)
+        with pytest.raises(CircuitOpenError):
+            backend.generate_text("prompt")
+        assert server.requests == 3
+
+        with pytest.raises(CircuitOpenError):
+            backend.generate_text("prompt")
+        assert server.requests == 3  # rejected without a request
+
+        server.error_rate = 0.0
+        now[0] += 31  # half-open: one trial call closes the circuit again
+        assert backend.generate_text("prompt") == "ok"
+        assert breaker.state == "closed"
+        backend.close()
+
+
+def test_token_bucket_limits_sustained_rate():
+    now = [0.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    bucket = TokenBucket(rate=4, burst=2, clock=lambda: now[0], sleep=sleep)
+    for _ in range(10):
+        bucket.acquire()
+    # 2 calls from the burst, then 8 more at 4 per second
+    assert now[0] == pytest.approx(2.0)
+
+
+def test_shared_token_bucket_limits_all_processes_together(tmp_path):
+    now = [1000.0]
+
+    def sleep(seconds):
+        now[0] += seconds
+
+    # Two buckets on one file stand in for two gunicorn workers
+    buckets = [SharedTokenBucket(str(tmp_path / "rate.sqlite3"), rate=4, burst=2, clock=lambda: now[0], sleep=sleep)
+               for _ in range(2)]
+    for i in range(10):
+        buckets[i % 2].acquire()
+    assert now[0] == pytest.approx(1002.0)
+
+
+def test_hedged_request_cuts_tail_latency():
+    class SlowFirstBackend:
+        model_id = MODEL_ID
+        calls = itertools.count()
+
+        def generate_text(self, prompt, params=None):
+            if next(self.calls) == 0:
+                time.sleep(2)
+            return "ok"
+
+        def close(self):
+            pass
+
+    backend = ResilientBackend(SlowFirstBackend(), hedge_delay=0.05)
+    start = time.perf_counter()
+    assert backend.generate_text("prompt") == "ok"
+    assert time.perf_counter() - start < 1
+    backend.close()
+
+
+def test_stream_retries_before_first_token_and_previews_findings():
+    reply = 'FINDING | HIGH | SOX | "cash" | Unrecorded cash | 0.9\nFINDING | LOW | GDPR | "names" | Personal data'
+    with FakeWatsonxServer(response=reply) as server:
+        server.fail_next(1, status=503, retry_after=0)
+        backend = _backend(server, max_retries=2)
+        previews = []
+        stream = FindingStream("compliance", on_finding=previews.append)
+        generation = backend.generate_stream("prompt", {"max_new_tokens": 200}, stream.feed)
+        assert len(previews) == 1  # first line complete, last line still pending
+        stream.close()
+        assert generation.text == reply
+        assert generation.generated_tokens and generation.stop_reason == "eos_token"
+        assert [(f.severity, f.regulation) for f in previews] == [("high", "SOX"), ("low", "GDPR")]
+        assert server.requests == 2
+        backend.close()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the persistent result cache
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+import pytest
+from src import result_cache
+from src.result_cache import ResultCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(result_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / "results.sqlite3"), ttl_hours=1)
+    cache.set("key", {"findings": ["a"]})
+    clock[0] += 3599
+    assert cache.get("key") == {"findings": ["a"]}
+    clock[0] += 2
+    assert cache.get("key") is None
+    assert cache.stats() == {"entries": 0, "size_bytes": 0, "hits": 1, "misses": 1}
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    # Room for two 1000-byte entries, not three
+    cache = ResultCache(str(tmp_path / "results.sqlite3"), max_size_mb=2500 / (1024 * 1024))
+    cache.set("old", "x" * 998)
+    clock[0] += 1
+    cache.set("recent", "y" * 998)
+    clock[0] += 1
+    assert cache.get("old") is not None
+    clock[0] += 1
+    cache.set("new", "z" * 998)
+    assert cache.get("recent") is None
+    assert cache.get("old") == "x" * 998 and cache.get("new") == "z" * 998
+    assert cache.stats()["entries"] == 2
+    cache.close()
+
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    cache = ResultCache(path)
+    cache.set("key", [1, 2])
+    cache.close()
+    cache = ResultCache(path)
+    assert cache.get("key") == [1, 2]
+    cache.close()
+
+
+def test_keys_change_with_the_analysis_fingerprint():
+    fingerprint = {"model_id": "granite", "generation": {"temperature": 0}}
+    key = ResultCache.make_key("analysis", "abc", fingerprint)
+    assert key == ResultCache.make_key("analysis", "abc", dict(reversed(list(fingerprint.items()))))
+    assert key != ResultCache.make_key("analysis", "abc", dict(fingerprint, model_id="llama"))
+    assert key != ResultCache.make_key("analysis", "abd", fingerprint)
+    assert key != ResultCache.make_key("text", "abc", fingerprint)
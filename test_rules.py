@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the keyword pre-screening rule engine
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+from src.rules import RuleEngine
+
+
+def test_terms_inside_or_overlapping_a_longer_match_are_found():
+    engine = RuleEngine([
+        {"id": "wire", "analyzer": "fraud", "terms": ["wire"], "message": "Wire mentioned"},
+        {"id": "urgent_wire", "analyzer": "fraud", "terms": ["wire transfer", "urgent"],
+         "message": "Urgent wire transfer"},
+        {"id": "fee", "analyzer": "fraud", "terms": ["transfer fee"], "message": "Transfer fee"},
+    ])
+    text = "An urgent wire transfer fee was sent."
+    assert {finding["rule_id"] for finding in engine.scan(text)} == {"wire", "urgent_wire", "fee"}
+    found = engine.match_terms(text)
+    assert text[slice(*found["wire"])] == "wire"
+    assert text[slice(*found["transfer fee"])] == "transfer fee"
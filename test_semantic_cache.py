@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Offline tests for the near-duplicate chunk reply cache
+GraniteGuard AI - IBM TechXchange Dev Day Hackathon
+"""
+
+from src.compliance_checker import ComplianceChecker
+from src.semantic_cache import SemanticCache
+
+
+def _checker(config: dict, reply: str, cache: SemanticCache) -> ComplianceChecker:
+    return ComplianceChecker(config=dict(config, fake_backend={"response": reply}), semantic_cache=cache)
+
+
+def test_semantic_cache_reuses_replies_for_templated_documents(config):
+    reply = 'FINDING | HIGH | AML | "Wire of $9,950.00 on 2024-01-31" | Just below the reporting threshold. | 0.8'
+    cache = SemanticCache()
+    checker = _checker(config, reply, cache)
+    template = ("Statement of {name} for account {account}. Wire of {amount} on {date}. " +
+                " ".join(f"Clause {word} of the standard terms applies." for word in "abcdefghijklmnop"))
+    first = checker.check_compliance(template.format(name="John Doe", account="12345678",
+                                                     amount="$9,950.00", date="2024-01-31"))
+    second = checker.check_compliance(template.format(name="John Doe", account="87654321",
+                                                      amount="$4,100.00", date="2024-02-29"))
+    assert len(checker.model.backend.calls) == first["chunks_analyzed"] == 1
+    assert second["token_usage"]["cached_chunks"] == 1
+    evidence = [finding["evidence"] for finding in second["findings"] if finding["source"] == "model"]
+    assert evidence == ["Wire of $4,100.00 on 2024-02-29"]
+    assert cache.stats()["hit_ratio"] == 0.5
+
+    # Similar enough, but a reply quoting the first customer's name is not reused for another customer
+    # (a short chunk, so two changed words weigh more than in a real statement)
+    checker.semantic_cache = SemanticCache(threshold=0.8)
+    checker.model.backend.response = 'FINDING | HIGH | Sanctions | "Statement of John Doe" | Listed party. | 0.8'
+    for name in ("John Doe", "Jane Roe"):
+        checker.check_compliance(template.format(name=name, account="11112222", amount="$70.00", date="2024-03-31"))
+    assert len(checker.model.backend.calls) == 3
+    assert checker.semantic_cache.stats()["stale"] == 1
+
+
+def test_reply_quoting_the_earlier_documents_numbers_is_not_reused(config):
+    reply = 'FINDING | HIGH | GLBA | "SSN 123-45-6789 on file" | Social Security number kept in clear. | 0.9'
+    checker = _checker(config, reply, SemanticCache(threshold=0.8))
+    statement = ("Customer record. SSN {ssn} on file. Reviewed {dates}. " +
+                 " ".join(f"Clause {word} of the standard terms applies." for word in "abcdefghijklmnop"))
+    checker.check_compliance(statement.format(ssn="123-45-6789", dates="2024-01-31"))
+    # One more date than the first document, so the values cannot be swapped by position
+    checker.check_compliance(statement.format(ssn="987-65-4321", dates="2024-02-29 and 2024-03-01"))
+    assert len(checker.model.backend.calls) == 2
+    assert checker.semantic_cache.stats()["stale"] == 1
@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PayloadTracer:
+    def __init__(self, sample_rate: float = 0.0, max_chars: int = 200, rng: random.Random = None):
+        """
+        Sampled debug logging of document and model payloads
+
+        Off by default: document text and model output can contain customer
+        data, so only a sampled fraction of payloads is logged, truncated, at
+        DEBUG level. Sampling can be changed at runtime with configure().
+
+        Args:
+            sample_rate: Fraction of payloads logged, 0 disables tracing
+            max_chars: Characters of each payload included in the log line
+            rng: Random source, injectable for tests
+        """
+        self.sample_rate = 0.0
+        self.max_chars = max_chars
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._shared_path = None
+        self._shared_mtime = None
+        self._next_sync = 0.0
+        self.configure(sample_rate, max_chars)
+
+    def configure(self, sample_rate: float = None, max_chars: int = None):
+        self._apply(sample_rate, max_chars)
+        if self._shared_path:
+            self._write_shared()
+
+    def _apply(self, sample_rate: float = None, max_chars: int = None):
+        with self._lock:
+            if sample_rate is not None:
+                self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+            if max_chars is not None:
+                self.max_chars = int(max_chars)
+            # The app logs at INFO; traced lines must pass this logger's own level
+            logger.setLevel(logging.DEBUG if self.sample_rate else logging.NOTSET)
+        logger.info(f"Payload tracing sample rate set to {self.sample_rate}")
+
+    def share(self, path: str):
+        """
+        Keep the settings in a file shared by all processes (e.g. gunicorn workers)
+
+        configure() in one process then applies to every process within a second.
+        The first process to share writes its current settings; later ones adopt the file.
+        """
+        self._shared_path = path
+        if os.path.exists(path):
+            self._sync()
+        else:
+            self._write_shared()
+
+    def _write_shared(self):
+        try:
+            with open(self._shared_path + f".{os.getpid()}.tmp", "w") as f:
+                json.dump(self.settings(), f)
+            os.replace(self._shared_path + f".{os.getpid()}.tmp", self._shared_path)
+            self._shared_mtime = os.stat(self._shared_path).st_mtime_ns
+        except OSError as e:
+            logger.error(f"Writing shared trace settings failed: {e}")
+
+    def _sync(self):
+        """Adopt settings another process wrote since the last check"""
+        self._next_sync = time.monotonic() + 1.0
+        try:
+            mtime = os.stat(self._shared_path).st_mtime_ns
+            if mtime == self._shared_mtime:
+                return
+            with open(self._shared_path) as f:
+                settings = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._shared_mtime = mtime
+        self._apply(settings.get('sample_rate'), settings.get('max_chars'))
+
+    def trace(self, event: str, payload: str, **context):
+        """Log a truncated payload for a sampled fraction of calls; near free when tracing is off"""
+        if self._shared_path and time.monotonic() >= self._next_sync:
+            self._sync()
+        if not self.sample_rate or self._rng.random() >= self.sample_rate:
+            return
+        details = " ".join(f"{name}={value}" for name, value in context.items())
+        payload = payload or ""
+        logger.debug(f"{event} {details} ({len(payload)} chars): {payload[:self.max_chars]!r}")
+
+    def settings(self) -> dict:
+        return {"sample_rate": self.sample_rate, "max_chars": self.max_chars}
+
+    def shared_settings(self) -> dict:
+        """Current settings, after adopting any change made by another process"""
+        if self._shared_path:
+            self._sync()
+        return self.settings()
+
+
+tracer = PayloadTracer()
+
+
+def trace(event: str, payload: str, **context):
+    tracer.trace(event, payload, **context)